@@ -1,19 +1,47 @@
 import os
 import json
 import gzip
+import zlib
 import shutil
 import time
 import re
+import hashlib
+import heapq
+import sqlite3
+from collections import namedtuple, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 t0 = time.time()
 
 CONFIG_FILE = "mt_config.json"
+BUILD_MANIFEST_FILE = "mt_build_manifest.json"
+METADATA_STORE_FILE = "mt_metadata.sqlite"
+INDEX_SHARD_DIR = "index"
+COMPACT_INDEX_FILE = "index.compact.json.gz"
+SEARCH_INDEX_FILE = "search.json.gz"
+CONTENT_MANIFEST_FILE = "manifest.json"
+CONTENT_MANIFEST_DIR = "manifest"
+INDEX_PATCH_DIR = "patches/index"
+INDEX_FILE = "index.json.gz"
 
 config = {}
 if os.path.exists(CONFIG_FILE):
     with open(CONFIG_FILE, "r") as f:
         config = json.load(f)
 
+# where the data folders go - next to this script unless output_dir says otherwise
+OUTPUT_DIR = config.get("output_dir", os.path.dirname(os.path.abspath(__file__)))
+
 def get_exports_dir():
     if "fmodel_exports_dir" in config:
         return config["fmodel_exports_dir"]
@@ -24,33 +52,32 @@ def get_exports_dir():
 
 BASE_DIR = os.path.join(get_exports_dir(), "FortniteGame")
 
-BR_COSMETICS_DIR = os.path.join(
-    BASE_DIR,
+# the folders below are written the way FModel shows them on Windows, so they
+# are split up to resolve on any OS
+def export_path(relative_path):
+    return os.path.join(BASE_DIR, *re.split(r"[\\/]", relative_path))
+
+BR_COSMETICS_DIR = export_path(
     r"Plugins\GameFeatures\BRCosmetics\Content\Athena\Items\Cosmetics"
 )
 
-OLD_BR_COSMETICS_DIR = os.path.join(
-    BASE_DIR,
+OLD_BR_COSMETICS_DIR = export_path(
     r"Content\Athena\Items\Cosmetics"
 )
 
-KICKS_DIR = os.path.join(
-    BASE_DIR,
+KICKS_DIR = export_path(
     r"Plugins\GameFeatures\CosmeticShoes\Content\Assets\Items\Cosmetics"
 )
 
-FESTIVAL_COSMETICS_DIR = os.path.join(
-    BASE_DIR,
+FESTIVAL_COSMETICS_DIR = export_path(
     r"Plugins\GameFeatures\FM\SparksCosmetics\Content"
 )
 
-RACING_COSMETICS_DIR = os.path.join(
-    BASE_DIR,
+RACING_COSMETICS_DIR = export_path(
     r"Plugins\GameFeatures\VehicleCosmetics\Content\Mutable"
 )
 
-COMPANIONS_DIR = os.path.join(
-    BASE_DIR,
+COMPANIONS_DIR = export_path(
     r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Items"
 )
 
@@ -63,74 +90,62 @@ COSMETICS_DIRS = [
     COMPANIONS_DIR
 ]
 
-LOC_DIRECTORY = os.path.join(
-    BASE_DIR,
+LOC_DIRECTORY = export_path(
     r"Content\Localization"
 )
 
-SPARKS_LOC_DIRECTORY = os.path.join(
-    BASE_DIR,
+SPARKS_LOC_DIRECTORY = export_path(
     r"Plugins\GameFeatures\FM\SparksCosmetics\Content\Localization\SparksCosmetics"
 )
-RACING_LOC_DIRECTORY = os.path.join(
-    BASE_DIR,
+RACING_LOC_DIRECTORY = export_path(
     r"Plugins\GameFeatures\VehicleCosmetics\Content\Localization\VehicleCosmetics"
 )
 
-FIGURE_COSMETICS_DIR = os.path.join(
-    BASE_DIR,
+FIGURE_COSMETICS_DIR = export_path(
     r"Plugins\GameFeatures\Juno\FigureCosmetics\Content\Items"
 )
-DT_BEAN_MAP_FILE = os.path.join(
-    BASE_DIR,
+JUNO_DIR = export_path(
+    r"Plugins\GameFeatures\Juno"
+)
+DT_BEAN_MAP_FILE = export_path(
     r"Plugins\GameFeatures\FNE\Beanstalk\BeanstalkCosmetics\Content\Cosmetics\DataTables\DT_BeanCosmeticsMap.json"
 )
-NEW_BEANSTALK_DEF_DIR = os.path.join(
-    BASE_DIR,
+NEW_BEANSTALK_DEF_DIR = export_path(
     r"Plugins\GameFeatures\FNE\Beanstalk\BeanstalkCosmetics\Content\Cosmetics\Def"
 )
 
-SETS_JSON_FILE = os.path.join(
-    BASE_DIR,
+SETS_JSON_FILE = export_path(
     r"Content\Athena\Items\Cosmetics\Metadata\CosmeticSets.json"
 )
 
-SEARCH_TAGS_JSON_FILE = os.path.join(
-    BASE_DIR,
+SEARCH_TAGS_JSON_FILE = export_path(
     r"Content\Balance\DataTables\GeneratedSearchTagData.json"
 )
 
-DISPLAY_ASSETS_DIR = os.path.join(
-    BASE_DIR,
+DISPLAY_ASSETS_DIR = export_path(
     r"Plugins\GameFeatures\OfferCatalog\Content\NewDisplayAssets"
 )
-BUNDLE_DISPLAY_ASSETS_DIR = os.path.join(
-    BASE_DIR,
+BUNDLE_DISPLAY_ASSETS_DIR = export_path(
     r"Plugins\GameFeatures\OfferCatalog\Content\DisplayAssets"
 )
 
-WEAPON_DEFINITIONS_DIR = os.path.join(
-    BASE_DIR,
+WEAPON_DEFINITIONS_DIR = export_path(
     r"Plugins\GameFeatures\BRCosmetics\Content\Athena\Items\Weapons"
 )
 
-BANNER_ICONS_DIR = os.path.join(
-    BASE_DIR,
+BANNER_ICONS_DIR = export_path(
     r"Plugins\GameFeatures\BRCosmetics\Content\Athena\Items\BannerIcons"
 )
 
-COMPANION_VARIANT_TOKENS_DIR = os.path.join(
-    BASE_DIR,
+COMPANION_VARIANT_TOKENS_DIR = export_path(
     r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Items\CosmeticVariantTokens"
 )
 
-COMPANION_FILTER_SET_DIR = os.path.join(
-    BASE_DIR,
+COMPANION_FILTER_SET_DIR = export_path(
     r"Plugins/GameFeatures/CosmeticCompanions/Content/Data/VariantFilterSet"
 )
 
-CHARACTER_COLOR_SWATCHES_DIR = os.path.join(
-    BASE_DIR,
+CHARACTER_COLOR_SWATCHES_DIR = export_path(
     r"Content/Characters/CharacterColorSwatches/Misc"
 )
 
@@ -166,20 +181,387 @@ VALID_TYPES = {
     "FortVariantTokenType", # for companion emotes
 }
 
-_FILE_CACHE = {}
+# Cheap check on the raw bytes before parsing - files without one of these
+# "Type" markers can't hold an item definition, so build_index never parses them
+VALID_TYPE_MARKER = re.compile(rb'"Type":\s*"(?:' + b"|".join(re.escape(t.encode()) for t in sorted(VALID_TYPES)) + rb')"')
+
+# Directory names that are never exported - matched anywhere in the folder name,
+# and the whole folder is pruned so nothing underneath gets scanned either
+EXCLUDED_DIR_NAMES = ("Archive", "Tandem", "Localization", "Datatables", "CosmeticVariantTokens", "QuestAssets", "TestItems", "Abilities", "Prototype")
+
+CatalogFile = namedtuple("CatalogFile", ["path", "name", "size", "mtime", "parent"])
 
-def load_json(filepath):
+_FILE_CATALOG = {}
+_CATALOG_INDEX = {}
+
+def is_excluded_dir(name):
+    return any(excluded in name for excluded in EXCLUDED_DIR_NAMES)
+
+def scan_directory(root, prune):
+    files = []
+
+    # same order as os.walk: a folder's files first, then its subfolders
+    def scan(directory):
+        subdirs = []
+        try:
+            with os.scandir(directory) as it:
+                for item in it:
+                    if item.is_dir():
+                        if not item.is_symlink():
+                            subdirs.append(item)
+                        continue
+                    st = item.stat()
+                    files.append(CatalogFile(item.path, item.name, st.st_size, st.st_mtime_ns, directory))
+        except OSError:
+            return
+        for subdir in subdirs:
+            if prune and is_excluded_dir(subdir.name):
+                continue
+            scan(subdir.path)
+
+    scan(root)
+    return files
+
+def catalog_files(root, prune=True):
+    key = (root, prune)
+    if key in _FILE_CATALOG:
+        return _FILE_CATALOG[key]
+
+    files = None
+    if not prune:
+        # a full scan of a parent folder already has everything below it
+        for (scanned_root, scanned_prune), scanned in _FILE_CATALOG.items():
+            if not scanned_prune and root.startswith(scanned_root + os.sep):
+                files = [f for f in scanned if f.path.startswith(root + os.sep)]
+                break
+    if files is None:
+        files = scan_directory(root, prune)
+        for f in files:
+            _CATALOG_INDEX[f.path] = f
+    _FILE_CATALOG[key] = files
+    return files
+
+def list_catalog_dir(directory):
+    return [f for f in catalog_files(directory, prune=False) if f.parent == directory]
+
+def build_file_catalog():
+    t = time.time()
+    for root in COSMETICS_DIRS + [LOC_DIRECTORY, DISPLAY_ASSETS_DIR, BUNDLE_DISPLAY_ASSETS_DIR,
+                                  WEAPON_DEFINITIONS_DIR, BANNER_ICONS_DIR, COMPANION_FILTER_SET_DIR]:
+        catalog_files(root)
+    for root in [JUNO_DIR, FIGURE_COSMETICS_DIR, NEW_BEANSTALK_DEF_DIR, COMPANION_VARIANT_TOKENS_DIR,
+                 SPARKS_LOC_DIRECTORY, RACING_LOC_DIRECTORY, CHARACTER_COLOR_SWATCHES_DIR] + COMPANION_COLORS_AND_MATERIALS_DIRS:
+        catalog_files(root, prune=False)
+    print(f"Catalogued {len(_CATALOG_INDEX)} files in {time.time() - t:.2f}s")
+
+# Parsed JSON cache - least recently used files are dropped once the cached files
+# take up about json_cache_mb of memory. A parsed export takes roughly
+# JSON_CACHE_SIZE_FACTOR times its size on disk (measured at 2.5-3.5x on
+# item definitions, display assets and localization). Files that get read
+# again later, like the DataTables, can be pinned so they're never dropped.
+JSON_CACHE_BYTES = int(config.get("json_cache_mb", 256) * 1024 * 1024)
+JSON_CACHE_SIZE_FACTOR = 4
+JSON_CACHE_ENTRY_OVERHEAD = 512
+
+_FILE_CACHE = OrderedDict()
+_PINNED_FILES = {}
+_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0, "prefiltered": 0, "bytes": 0, "peak_bytes": 0}
+
+def parse_json_bytes(raw):
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # orjson refuses a few things json accepts, like integers past 64 bits
+    return json.loads(raw.decode('utf-8'))
+
+def cache_json(filepath, data, pin):
+    if pin:
+        _PINNED_FILES[filepath] = data
+        return
+
+    if filepath in _CATALOG_INDEX:
+        size = _CATALOG_INDEX[filepath].size
+    else:
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            size = 0
+    size = size * JSON_CACHE_SIZE_FACTOR + JSON_CACHE_ENTRY_OVERHEAD
+
+    _FILE_CACHE[filepath] = (data, size)
+    _CACHE_STATS["bytes"] += size
+    _CACHE_STATS["peak_bytes"] = max(_CACHE_STATS["peak_bytes"], _CACHE_STATS["bytes"])
+    while _CACHE_STATS["bytes"] > JSON_CACHE_BYTES and len(_FILE_CACHE) > 1:
+        _, (_, evicted_size) = _FILE_CACHE.popitem(last=False)
+        _CACHE_STATS["bytes"] -= evicted_size
+        _CACHE_STATS["evictions"] += 1
+
+def load_json(filepath, pin=False, prefilter=None):
+    if filepath in _PINNED_FILES:
+        _CACHE_STATS["hits"] += 1
+        return _PINNED_FILES[filepath]
     if filepath in _FILE_CACHE:
-        return _FILE_CACHE[filepath]
+        _CACHE_STATS["hits"] += 1
+        _FILE_CACHE.move_to_end(filepath)
+        data = _FILE_CACHE[filepath][0]
+        if pin:
+            _CACHE_STATS["bytes"] -= _FILE_CACHE.pop(filepath)[1]
+            _PINNED_FILES[filepath] = data
+        return data
+
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            _FILE_CACHE[filepath] = data
-            return data
-    except:
-        _FILE_CACHE[filepath] = None
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+    except OSError:
+        raw = None
+    # rejected files aren't cached, another stage may still want them in full
+    if raw is not None and prefilter is not None and not prefilter.search(raw):
+        _CACHE_STATS["prefiltered"] += 1
         return None
 
+    _CACHE_STATS["misses"] += 1
+    try:
+        data = parse_json_bytes(raw) if raw is not None else None
+    except (OSError, ValueError):
+        data = None
+    cache_json(filepath, data, pin)
+    return data
+
+def print_json_cache_stats():
+    print(f"JSON cache: {_CACHE_STATS['hits']} hits, {_CACHE_STATS['misses']} misses, "
+          f"{_CACHE_STATS['evictions']} evictions, {len(_PINNED_FILES)} pinned, "
+          f"peak {_CACHE_STATS['peak_bytes'] / (1024 * 1024):.1f} MB of {JSON_CACHE_BYTES / (1024 * 1024):.0f} MB budget")
+
+# Writes a JSON output one encoder chunk at a time, straight into the file (or
+# its gzip stream), so the whole document never sits in memory as a string
+def write_json(path, value, compress=False, sort_keys=False, minify=False, codec=None):
+    if minify:
+        encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, sort_keys=sort_keys)
+    else:
+        encoder = json.JSONEncoder(indent=2, ensure_ascii=False, sort_keys=sort_keys)
+    chunks = encoder.iterencode(value)
+    if not compress:
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return
+
+    # by default the same zlib stream gzip.compress(data, mtime=0) produces, fed in pieces
+    codec = codec or DEFAULT_CODEC
+    compress_chunk, finish = get_compressor(codec)
+    timing = {"raw": 0, "compress": 0.0}
+
+    def compress_text(text, final=False):
+        raw = text.encode("utf-8")
+        start = time.perf_counter()
+        compressed = compress_chunk(raw) + (finish() if final else b"")
+        timing["raw"] += len(raw)
+        timing["compress"] += time.perf_counter() - start
+        return compressed
+
+    with open(path, "wb") as f:
+        pending = []
+        pending_size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= 65536:
+                f.write(compress_text("".join(pending)))
+                pending = []
+                pending_size = 0
+        f.write(compress_text("".join(pending), final=True))
+
+    if codec[0] is not None:
+        decompress_time = 0.0
+        if TIME_DECOMPRESSION:
+            with open(path, "rb") as f:
+                compressed = f.read()
+            start = time.perf_counter()
+            decompress_bytes(compressed)
+            decompress_time = time.perf_counter() - start
+        record_compression({"family": codec[0], "raw": timing["raw"], "size": os.path.getsize(path),
+                            "compress": timing["compress"], "decompress": decompress_time})
+
+# Build manifest - remembers every source file's size, mtime and content hash
+# along with the outputs it produced, so a rerun only redoes what changed
+INCREMENTAL_BUILD = config.get("incremental_build", True)
+
+def load_build_manifest():
+    if not os.path.exists(BUILD_MANIFEST_FILE):
+        return {}
+    try:
+        with open(BUILD_MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        _PREVIOUS_CODECS.update(manifest.get("codecs", {}))
+        _PREVIOUS_DICTIONARIES.update(manifest.get("dictionaries", {}))
+        return manifest.get("sources", {})
+    except (OSError, ValueError):
+        print(f"{BUILD_MANIFEST_FILE} is unreadable, doing a full rebuild")
+        return {}
+
+# filled in by main() so worker processes don't each load the manifest
+_PREVIOUS_SOURCES = {}
+_CURRENT_SOURCES = {}
+
+def hash_bytes(raw):
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def source_record(path):
+    record = _CURRENT_SOURCES.get(path)
+    if record is not None:
+        return record
+    if path in _CATALOG_INDEX:
+        size, mtime = _CATALOG_INDEX[path].size, _CATALOG_INDEX[path].mtime
+    else:
+        st = os.stat(path)
+        size, mtime = st.st_size, st.st_mtime_ns
+    previous = _PREVIOUS_SOURCES.get(path)
+    if previous and previous["size"] == size and previous["mtime"] == mtime:
+        file_hash = previous["hash"]
+    else:
+        with open(path, "rb") as f:
+            file_hash = hash_bytes(f.read())
+    record = {"size": size, "mtime": mtime, "hash": file_hash, "outputs": []}
+    _CURRENT_SOURCES[path] = record
+    return record
+
+def is_source_unchanged(path):
+    record = source_record(path)
+    previous = _PREVIOUS_SOURCES.get(path)
+    return INCREMENTAL_BUILD and previous is not None and previous["hash"] == record["hash"]
+
+def output_key(output_path):
+    return os.path.relpath(output_path, OUTPUT_DIR).replace("\\", "/")
+
+def is_output_current(path, output_path, codec=None):
+    # the output must have come from this exact source content and still be on disk
+    if not is_source_unchanged(path) or (codec is not None and is_codec_changed(codec)):
+        return False
+    key = output_key(output_path)
+    return key in _PREVIOUS_SOURCES[path]["outputs"] and (os.path.exists(output_path) or key in _PACKED_OUTPUTS)
+
+def record_output(path, output_path):
+    outputs = source_record(path)["outputs"]
+    key = output_key(output_path)
+    if key not in outputs:
+        outputs.append(key)
+
+def directory_changed(directory, paths):
+    # True when any file directly inside directory was added, removed or edited
+    unchanged = [is_source_unchanged(path) for path in paths]
+    previous = {path for path in _PREVIOUS_SOURCES if os.path.dirname(path) == directory}
+    return not all(unchanged) or previous != set(paths)
+
+def save_build_manifest():
+    produced = {o for record in _CURRENT_SOURCES.values() for o in record["outputs"]}
+    removed = 0
+    for record in _PREVIOUS_SOURCES.values():
+        for output in record["outputs"]:
+            if output in produced:
+                continue
+            output_path = os.path.join(OUTPUT_DIR, output)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+                removed += 1
+
+    codecs = dict(_PREVIOUS_CODECS)
+    codecs.update((family, get_codec_signature(codec)) for family, codec in _CODECS.items())
+    dictionaries = dict(_PREVIOUS_DICTIONARIES)
+    dictionaries.update((key, os.path.basename(path)) for key, path in _DICTIONARY_PATHS.items() if path)
+    with open(BUILD_MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "sources": _CURRENT_SOURCES, "codecs": codecs, "dictionaries": dictionaries},
+                  f, ensure_ascii=False)
+    remove_unused_dictionaries(codecs)
+
+    unchanged = sum(1 for p in _CURRENT_SOURCES if p in _PREVIOUS_SOURCES and _PREVIOUS_SOURCES[p]["hash"] == _CURRENT_SOURCES[p]["hash"])
+    print(f"{BUILD_MANIFEST_FILE} saved with {len(_CURRENT_SOURCES)} sources "
+          f"({unchanged} unchanged, {len(_CURRENT_SOURCES) - unchanged} new or changed), "
+          f"removed {removed} stale outputs")
+
+# Metadata store - the handful of fields each build_* function pulls out of a
+# file, kept in SQLite against the file's size, mtime and hash so unchanged
+# files are answered without even being opened
+_metadata_store = None
+_METADATA_SEEN = set()
+_METADATA_WRITES = {}
+_METADATA_STATS = {"hits": 0, "misses": 0}
+
+def open_metadata_store():
+    global _metadata_store
+    _metadata_store = sqlite3.connect(METADATA_STORE_FILE)
+    _metadata_store.execute(
+        "CREATE TABLE IF NOT EXISTS metadata ("
+        "stage TEXT, path TEXT, size INTEGER, mtime INTEGER, hash TEXT, data TEXT, "
+        "PRIMARY KEY (stage, path))"
+    )
+
+def file_stat(path):
+    if path in _CATALOG_INDEX:
+        return _CATALOG_INDEX[path].size, _CATALOG_INDEX[path].mtime
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+def get_stored_metadata(stage, path):
+    _METADATA_SEEN.add((stage, path))
+    stat = file_stat(path)
+    if not INCREMENTAL_BUILD or _metadata_store is None or stat is None:
+        return None
+    row = _metadata_store.execute(
+        "SELECT size, mtime, hash, data FROM metadata WHERE stage = ? AND path = ?", (stage, path)
+    ).fetchone()
+    if row is None:
+        _METADATA_STATS["misses"] += 1
+        return None
+    if (row[0], row[1]) != stat:
+        # touched but maybe not edited - only then is the file hashed
+        if row[2] != source_record(path)["hash"]:
+            _METADATA_STATS["misses"] += 1
+            return None
+        _METADATA_WRITES[(stage, path)] = (stage, path, stat[0], stat[1], row[2], row[3])
+    elif path not in _CURRENT_SOURCES:
+        # the stored hash is still the file's hash, so the manifest keeps it
+        # without the file being read
+        _CURRENT_SOURCES[path] = {"size": stat[0], "mtime": stat[1], "hash": row[2], "outputs": []}
+    _METADATA_STATS["hits"] += 1
+    return json.loads(row[3])
+
+def store_metadata(stage, path, value):
+    _METADATA_SEEN.add((stage, path))
+    stat = file_stat(path)
+    if stat is None:
+        return
+    # serialized straight away, callers keep modifying their copies
+    _METADATA_WRITES[(stage, path)] = (stage, path, stat[0], stat[1], source_record(path)["hash"], json.dumps(value, ensure_ascii=False))
+
+def get_file_metadata(stage, path, extract, pin=False, prefilter=None):
+    value = get_stored_metadata(stage, path)
+    if value is None:
+        value = extract(load_json(path, pin=pin, prefilter=prefilter))
+        store_metadata(stage, path, value)
+    return value
+
+def get_stored_paths(stage):
+    if _metadata_store is None:
+        return []
+    return [row[0] for row in _metadata_store.execute("SELECT path FROM metadata WHERE stage = ?", (stage,))]
+
+def close_metadata_store():
+    global _metadata_store
+    if _metadata_store is None:
+        return
+    _metadata_store.executemany("INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?, ?, ?)", _METADATA_WRITES.values())
+    stale = [key for key in _metadata_store.execute("SELECT stage, path FROM metadata") if key not in _METADATA_SEEN]
+    _metadata_store.executemany("DELETE FROM metadata WHERE stage = ? AND path = ?", stale)
+    _metadata_store.commit()
+    _metadata_store.close()
+    _metadata_store = None
+    print(f"{METADATA_STORE_FILE}: {_METADATA_STATS['hits']} files answered from the store, "
+          f"{_METADATA_STATS['misses']} re-read, {len(stale)} stale records dropped")
+
 def is_valid_json(data):
     return data and isinstance(data, list) and data[0]
 
@@ -194,264 +576,348 @@ def get_set_id(props):
                 return tag.replace("Cosmetics.Set.", "")
     return None
 
-def build_index(dirs):
-    index = []
+_COMPANION_TOKEN_INDEX = None
 
-    def should_skip_subdir(subdir):
-        return subdir.endswith(("Archive", "Tandem", "Localization", "CosmeticVariantTokens", "QuestAssets", "TestItems", "Abilities", "Prototype"))
+def get_companion_token_index():
+    # reads COMPANION_VARIANT_TOKENS_DIR once - the tokens grouped by the companion
+    # they belong to and their variant tag, plus the list of style tokens
+    global _COMPANION_TOKEN_INDEX
+    if _COMPANION_TOKEN_INDEX is not None:
+        return _COMPANION_TOKEN_INDEX
 
-    def get_entry(data):
-        return next((item for item in data if item.get("Type") in VALID_TYPES), None)
+    by_companion = {}
+    styles = []
+    for info in list_catalog_dir(COMPANION_VARIANT_TOKENS_DIR):
+        if not info.name.endswith('.json'):
+            continue
 
-    def get_car_body_tag(props):
-        restrictions = props.get("RestrictionDefinitions", [])
-        if not restrictions:
-            for item in props.get("DataList", []):
-                for tag in item.get("Tags", []):
-                    if tag.lower().startswith("vehiclecosmetics.body."):
-                        return tag
-        else:
-            tag_dict = restrictions[0].get("RequiredTagQuery", {}).get("TagDictionary", [])
-            if len(tag_dict) > 1:
-                print(f"{entry.get('Name')} has two cars in its restriction tagDictionary???")
-                return None
-            return tag_dict[0].get("TagName") if tag_dict else None
-
-    def get_weapon_definition(entry):
-        if entry.get("Type") != "AthenaPickaxeItemDefinition":
-            return ""
-        weapon_definition = entry.get("Properties", {}) \
-                                 .get("WeaponDefinition", {}) \
-                                 .get("ObjectPath", "") \
-                                 .split(".") \
-                                 [0]
-        return weapon_definition.replace(
-            "/BRCosmetics/Athena/Items",
-            "cosmetics"
-        ) + ".json"
-
-    def get_companion_emotes(data):
-        found_emotes = []
-        for entry in data:
-            if entry.get("Type") == "FortCosmeticContextualAnimSceneEmoteVariant":
-                emoteOptions = entry.get("Properties").get("ContextualAnimSceneEmoteOptions")
-                for emote in emoteOptions:
-                    if emote.get("ContextualAnimSceneEmote").get("AssetPathName") != "":
-                        emoteName = emote.get("VariantName").get("LocalizedString")
-                        variantTag = emote.get("CustomizationVariantTag").get("TagName")
-
-                        found_emotes.append({
-                            "emoteName": emoteName,
-                            "variantTag": variantTag
-                        })
-            elif entry.get("Type") == "CosmeticCompanionItemDefinition":
-                this_companion = entry.get("Name")
-
-        if not this_companion:
-            return []
-
-        found_variant_emotes = []
-        for file in os.listdir(COMPANION_VARIANT_TOKENS_DIR):
-            if not file.endswith('.json'):
-                continue
-            
-            path = os.path.join(COMPANION_VARIANT_TOKENS_DIR, file)
-            data = load_json(path)
-            if not is_valid_json(data):
-                continue
+        data = load_json(info.path)
+        if not is_valid_json(data):
+            continue
 
-            entry = {}
-            for check_entry in data:
-                if check_entry.get("Type") == "FortVariantTokenType":
-                    entry = check_entry
+        entry = {}
+        for check_entry in data:
+            if check_entry.get("Type") == "FortVariantTokenType":
+                entry = check_entry
 
-            props = entry.get("Properties", {})
-          
-            related_companion = (
-                props.get("cosmetic_item", {})
-                .get("ObjectPath", "RAAAAAAAA")
-                .split('/')[-1]
-                .split('.')[0]
-            )
-            
-            if related_companion == this_companion:
-                variantTag = props.get("VariantNameTag").get("TagName")
-                variantID = entry.get("Name")
-                itemNameKey = props.get("ItemName", {}).get("Key", "")
-                
-                found_variant_emotes.append({
-                    "variantTag": variantTag,
-                    "variantID": variantID,
-                    "itemNameKey": itemNameKey
-                })
-
-        matched = []
-        for emote in found_emotes:
-            for variant in found_variant_emotes:
-                if emote["variantTag"] == variant["variantTag"]:
-                    matched.append({
-                        "emoteName": emote["emoteName"],
-                        "variantID": variant["variantID"],
-                        "itemNameKey": variant["itemNameKey"]
+        props = entry.get("Properties", {})
+
+        related_companion = (
+            props.get("cosmetic_item", {})
+            .get("ObjectPath", "RAAAAAAAA")
+            .split('/')[-1]
+            .split('.')[0]
+        )
+        variant = {
+            "variantTag": (props.get("VariantNameTag") or {}).get("TagName"),
+            "variantID": entry.get("Name"),
+            "itemNameKey": props.get("ItemName", {}).get("Key", "")
+        }
+        by_companion.setdefault(related_companion, {}).setdefault(variant["variantTag"], []).append(variant)
+
+        if (props.get("ItemShortDescription") or {}).get("LocalizedString") == "Style":
+            styles.append({
+                "ID": variant["variantID"],
+                "channelTag": (props.get("VariantChannelTag") or {}).get("TagName"),
+                "nameTag": variant["variantTag"]
+            })
+
+    _COMPANION_TOKEN_INDEX = {"by_companion": by_companion, "styles": styles}
+    return _COMPANION_TOKEN_INDEX
+
+def get_entry(data):
+    return next((item for item in data if item.get("Type") in VALID_TYPES), None)
+
+def get_car_body_tag(entry):
+    props = entry.get("Properties", {})
+    restrictions = props.get("RestrictionDefinitions", [])
+    if not restrictions:
+        for item in props.get("DataList", []):
+            for tag in item.get("Tags", []):
+                if tag.lower().startswith("vehiclecosmetics.body."):
+                    return tag
+    else:
+        tag_dict = restrictions[0].get("RequiredTagQuery", {}).get("TagDictionary", [])
+        if len(tag_dict) > 1:
+            print(f"{entry.get('Name')} has two cars in its restriction tagDictionary???")
+            return None
+        return tag_dict[0].get("TagName") if tag_dict else None
+
+def get_weapon_definition(entry):
+    if entry.get("Type") != "AthenaPickaxeItemDefinition":
+        return ""
+    weapon_definition = entry.get("Properties", {}) \
+                             .get("WeaponDefinition", {}) \
+                             .get("ObjectPath", "") \
+                             .split(".") \
+                             [0]
+    return weapon_definition.replace(
+        "/BRCosmetics/Athena/Items",
+        "cosmetics"
+    ) + ".json"
+
+def get_companion_emote_options(data):
+    found_emotes = []
+    this_companion = None
+    for entry in data:
+        if entry.get("Type") == "FortCosmeticContextualAnimSceneEmoteVariant":
+            emoteOptions = entry.get("Properties").get("ContextualAnimSceneEmoteOptions")
+            for emote in emoteOptions:
+                if emote.get("ContextualAnimSceneEmote").get("AssetPathName") != "":
+                    emoteName = emote.get("VariantName").get("LocalizedString")
+                    variantTag = emote.get("CustomizationVariantTag").get("TagName")
+
+                    found_emotes.append({
+                        "emoteName": emoteName,
+                        "variantTag": variantTag
                     })
+        elif entry.get("Type") == "CosmeticCompanionItemDefinition":
+            this_companion = entry.get("Name")
+
+    return this_companion, found_emotes
+
+def get_companion_emotes(this_companion, found_emotes):
+    if not this_companion:
+        return []
+
+    variants_by_tag = get_companion_token_index()["by_companion"].get(this_companion, {})
+
+    matched = []
+    for emote in found_emotes:
+        for variant in variants_by_tag.get(emote["variantTag"], []):
+            matched.append({
+                "emoteName": emote["emoteName"],
+                "variantID": variant["variantID"],
+                "itemNameKey": variant["itemNameKey"]
+            })
+
+    return matched
+
+def is_default_item(props):
+    return any("Cosmetics.Source.DefaultItem" in item.get("Tags", []) for item in props.get("DataList", []))
+
+def adjust_path(path, directory):
+    rel_path = normalize_path(path, directory)
+    if directory == KICKS_DIR:
+        return "Shoes/" + rel_path
+    elif directory == FESTIVAL_COSMETICS_DIR:
+        return "Festival/" + rel_path.replace("Cosmetics/", "")
+    elif directory == RACING_COSMETICS_DIR:
+        return "Racing/" + rel_path
+    elif directory == COMPANIONS_DIR:
+        return "Companions/" + rel_path
+    return rel_path
+
+def get_index_item(path, directory):
+    # Runs in the worker processes, so it only sends back the small index entry
+    # (plus a companion's emote options) and never the parsed file.
+    # Returns (parsed, item_entry, companion_emote_options)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return True, None, None
+    if not VALID_TYPE_MARKER.search(raw):
+        return False, None, None
 
-        return matched
-
-    def is_default_item(props):
-        return any("Cosmetics.Source.DefaultItem" in item.get("Tags", []) for item in props.get("DataList", []))
-
-    def adjust_path(path, directory):
-        rel_path = normalize_path(path, directory)
-        if directory == KICKS_DIR:
-            return "Shoes/" + rel_path
-        elif directory == FESTIVAL_COSMETICS_DIR:
-            return "Festival/" + rel_path.replace("Cosmetics/", "")
-        elif directory == RACING_COSMETICS_DIR:
-            return "Racing/" + rel_path
-        elif directory == COMPANIONS_DIR:
-            return "Companions/" + rel_path
-        return rel_path
+    try:
+        data = parse_json_bytes(raw)
+    except ValueError:
+        return True, None, None
+    if not is_valid_json(data):
+        return True, None, None
+
+    entry = get_entry(data)
+    if not entry:
+        return True, None, None
     
-    for directory in dirs:
-        for subdir, _, files in os.walk(directory):
-            if should_skip_subdir(subdir):
-                continue
-            for file in files:
-                if not file.endswith('.json'):
-                    continue
-                
-                path = os.path.join(subdir, file)
-                data = load_json(path)
-                if not is_valid_json(data):
-                    continue
+    cosmetic_id = entry.get("Name")
+    props = entry.get("Properties", {})
+    item_name = props.get("ItemName", {}).get("LocalizedString") or ""
 
-                entry = get_entry(data)
-                if not entry:
-                    continue
-                
-                cosmetic_id = entry.get("Name")
-                props = entry.get("Properties", {})
-                item_name = props.get("ItemName", {}).get("LocalizedString") or ""
+    if not cosmetic_id or not item_name or is_default_item(props):
+        return True, None, None
+        
+    generated_tags = None
+    for item in props.get("DataList", []):
+        if "GeneratedTagsIndexes" in item:
+            generated_tags = item["GeneratedTagsIndexes"]
+            break
 
-                if not cosmetic_id or not item_name or is_default_item(props):
-                    continue
-                    
-                generated_tags = None
-                for item in props.get("DataList", []):
-                    if "GeneratedTagsIndexes" in item:
-                        generated_tags = item["GeneratedTagsIndexes"]
-                        break
-
-                weapon_definition_path = get_weapon_definition(entry)
-                rel_path = adjust_path(path, directory)
-                car_body_tag = get_car_body_tag(props)
-                set_id = get_set_id(props)
-
-                if rel_path.startswith("Festival") and weapon_definition_path != "":
-                    weapon_definition_path = weapon_definition_path.replace("SparksCosmetics", "cosmetics/Festival")
-
-                companion_emotes = []
-                if entry.get("Type") == "CosmeticCompanionItemDefinition":
-                    companion_emotes = get_companion_emotes(data)
-
-                item_entry = {
-                    "id": cosmetic_id,
-                    "name": item_name,
-                    "path": rel_path
-                }
+    weapon_definition_path = get_weapon_definition(entry)
+    rel_path = adjust_path(path, directory)
+    car_body_tag = get_car_body_tag(entry)
+    set_id = get_set_id(props)
+
+    if rel_path.startswith("Festival") and weapon_definition_path != "":
+        weapon_definition_path = weapon_definition_path.replace("SparksCosmetics", "cosmetics/Festival")
 
-                if car_body_tag:
-                    item_entry["carBodyTag"] = car_body_tag
-                if set_id:
-                    item_entry["setID"] = set_id
-                if weapon_definition_path != "":
-                    item_entry["weaponDefinition"] = weapon_definition_path
-
-                if generated_tags:
-                    item_entry["generatedSearchTagIndexes"] = generated_tags
-
-                if companion_emotes != []:
-                    for companion_emote in companion_emotes:
-                        companion_emote_index = {
-                            "id": companion_emote["variantID"],
-                            "name": companion_emote["emoteName"],
-                            "itemNameKey": companion_emote["itemNameKey"],
-                            "companion_id": cosmetic_id,
-                            "companionEmote": True
-                        }
-
-                        index.append(companion_emote_index)
-                
-                index.append(item_entry)
-                
+    companion_emote_options = None
+    if entry.get("Type") == "CosmeticCompanionItemDefinition":
+        companion_emote_options = get_companion_emote_options(data)
+
+    item_entry = {
+        "id": cosmetic_id,
+        "name": item_name,
+        "path": rel_path
+    }
+
+    if car_body_tag:
+        item_entry["carBodyTag"] = car_body_tag
+    if set_id:
+        item_entry["setID"] = set_id
+    if weapon_definition_path != "":
+        item_entry["weaponDefinition"] = weapon_definition_path
+
+    if generated_tags:
+        item_entry["generatedSearchTagIndexes"] = generated_tags
+
+    return True, item_entry, companion_emote_options
+
+def build_index(dirs):
+    index = []
+
+    # companion emote entries also depend on the variant token files, so a token
+    # change means every companion has to be re-indexed
+    token_paths = [info.path for info in list_catalog_dir(COMPANION_VARIANT_TOKENS_DIR) if info.name.endswith('.json')]
+    tokens_changed = directory_changed(COMPANION_VARIANT_TOKENS_DIR, token_paths)
+
+    index_start = time.time()
+    files = []
+    for directory in dirs:
+        for info in catalog_files(directory):
+            if not info.name.endswith('.json'):
+                continue
+            
+            stored_entries = None
+            if not (tokens_changed and directory == COMPANIONS_DIR):
+                stored_entries = get_stored_metadata("index", info.path)
+            files.append((info.path, directory, stored_entries))
+
+    # results come back in submission order, so the index order never depends
+    # on which worker finished first
+    pending = [(path, directory) for path, directory, stored_entries in files if stored_entries is None]
+    if WORKERS > 1 and len(pending) > WORKER_BATCH_SIZE:
+        results = get_worker_pool().map(get_index_item, *zip(*pending), chunksize=WORKER_BATCH_SIZE)
+    else:
+        results = (get_index_item(path, directory) for path, directory in pending)
+
+    reused = parsed = skipped = 0
+    for path, directory, stored_entries in files:
+        if stored_entries is not None:
+            index.extend(stored_entries)
+            reused += 1
+            continue
+
+        was_parsed, item_entry, companion_emote_options = next(results)
+        if was_parsed:
+            parsed += 1
+        else:
+            skipped += 1
+
+        file_entries = []
+        if item_entry:
+            if companion_emote_options:
+                for companion_emote in get_companion_emotes(*companion_emote_options):
+                    companion_emote_index = {
+                        "id": companion_emote["variantID"],
+                        "name": companion_emote["emoteName"],
+                        "itemNameKey": companion_emote["itemNameKey"],
+                        "companion_id": item_entry["id"],
+                        "companionEmote": True
+                    }
+
+                    file_entries.append(companion_emote_index)
+
+            file_entries.append(item_entry)
+
+        store_metadata("index", path, file_entries)
+        index.extend(file_entries)
+
+    if reused:
+        print(f"Reused index entries from {reused} unchanged files")
+    print(f"build_index parsed {parsed} files and skipped {skipped} non-item files without parsing "
+          f"in {time.time() - index_start:.2f}s ({'orjson' if orjson else 'json'}, "
+          f"{WORKERS if WORKERS > 1 and len(pending) > WORKER_BATCH_SIZE else 1} processes)")
     return index
 
+def get_jido_ids(data):
+    pairs = []
+    if not data or not isinstance(data, list):
+        return pairs
+    for entry in data:
+        if entry.get("Type") == "JunoAthenaCharacterItemOverrideDefinition":
+            jido_id = entry.get("Name")
+            asset_path = entry.get("Properties", {}) \
+                              .get("BaseAthenaCharacterItemDefinition", {}) \
+                              .get("AssetPathName", "")
+            if asset_path:
+                cosmetic_id = asset_path.split("/")[-1].split(".")[0]
+                pairs.append([cosmetic_id, jido_id])
+        elif entry.get("Type") == "JunoAthenaDanceItemOverrideDefinition":
+            jido_id = entry.get("Name")
+            asset_path = entry.get("Properties", {}) \
+                              .get("BaseAthenaDanceItemDefinition", {}) \
+                              .get("AssetPathName", "")
+            if asset_path:
+                cosmetic_id = asset_path.split("/")[-1].split(".")[0]
+                pairs.append([cosmetic_id, jido_id])
+    return pairs
+
 def build_jido_map(fig_dir):
     mapping = {}
-    for root, _, files in os.walk(fig_dir):
-        for file in files:
-            if not file.endswith(".json"):
-                continue
-            file_path = os.path.join(root, file)
-            data = load_json(file_path)
-            if not data or not isinstance(data, list):
-                continue
-            for entry in data:
-                if entry.get("Type") == "JunoAthenaCharacterItemOverrideDefinition":
-                    jido_id = entry.get("Name")
-                    asset_path = entry.get("Properties", {}) \
-                                      .get("BaseAthenaCharacterItemDefinition", {}) \
-                                      .get("AssetPathName", "")
-                    if asset_path:
-                        cosmetic_id = asset_path.split("/")[-1].split(".")[0]
-                        mapping[cosmetic_id] = jido_id
-                elif entry.get("Type") == "JunoAthenaDanceItemOverrideDefinition":
-                    jido_id = entry.get("Name")
-                    asset_path = entry.get("Properties", {}) \
-                                      .get("BaseAthenaDanceItemDefinition", {}) \
-                                      .get("AssetPathName", "")
-                    if asset_path:
-                        cosmetic_id = asset_path.split("/")[-1].split(".")[0]
-                        mapping[cosmetic_id] = jido_id
-                    
+    for info in catalog_files(fig_dir, prune=False):
+        if not info.name.endswith(".json"):
+            continue
+        mapping.update(get_file_metadata("jido", info.path, get_jido_ids))
+
     return mapping
 
-def build_bean_map(bean_file, new_bean_directory):
-    mapping = {}
-    data = load_json(bean_file)
+def get_bean_table_ids(data):
     if not data or not isinstance(data, list):
-        return mapping
+        return None
     table = data[0]
     rows = table.get("Rows", {})
+    pairs = []
     for cid, row in rows.items():
         asset_path = row.get("Definition", {}).get("AssetPathName", "")
         if asset_path:
             bean_id = asset_path.split("/")[-1].split(".")[0]
-            mapping[cid] = bean_id
+            pairs.append([cid, bean_id])
+    return pairs
 
-    for root, _, files in os.walk(new_bean_directory):
-        for file in files:
-            if not file.endswith(".json") or not file.startswith("BIDO"):
-                continue
-            file_path = os.path.join(root, file)
-            data = load_json(file_path)
-            if not data or not isinstance(data, list):
-                continue
-            for entry in data:
-                if entry.get("Type") == "BeanAthenaCharacterItemDefinitionOverride":
-                    props = entry.get("Properties", {})
-                    cid_asset_path = props.get("BaseAthenaCharacterItemDefinition", {}).get("AssetPathName", "")
-                    cid = cid_asset_path.split("/")[-1].split(".")[0]
+def get_bean_override_ids(data):
+    pairs = []
+    if not data or not isinstance(data, list):
+        return pairs
+    for entry in data:
+        if entry.get("Type") == "BeanAthenaCharacterItemDefinitionOverride":
+            props = entry.get("Properties", {})
+            cid_asset_path = props.get("BaseAthenaCharacterItemDefinition", {}).get("AssetPathName", "")
+            cid = cid_asset_path.split("/")[-1].split(".")[0]
 
-                    bean_asset_path = props.get("BeanAthenaCharacterItemDefinitionOverride", {}).get("AssetPathName", "")
-                    bean_id = bean_asset_path.split("/")[-1].split(".")[0]
+            bean_asset_path = props.get("BeanAthenaCharacterItemDefinitionOverride", {}).get("AssetPathName", "")
+            bean_id = bean_asset_path.split("/")[-1].split(".")[0]
 
-                    if bean_id != "" and cid != "":
-                        mapping[cid] = bean_id
+            if bean_id != "" and cid != "":
+                pairs.append([cid, bean_id])
+    return pairs
+
+def build_bean_map(bean_file, new_bean_directory):
+    mapping = {}
+    table_ids = get_file_metadata("bean_table", bean_file, get_bean_table_ids, pin=True)
+    if table_ids is None:
+        return mapping
+    mapping.update(table_ids)
+
+    for info in catalog_files(new_bean_directory, prune=False):
+        if not info.name.endswith(".json") or not info.name.startswith("BIDO"):
+            continue
+        mapping.update(get_file_metadata("bean", info.path, get_bean_override_ids))
     return mapping
 
 def build_sets_maps(sets_file):
-    data = load_json(sets_file)
+    data = load_json(sets_file, pin=True)
     if not data or not isinstance(data, list) or not data[0]:
         return {}, {}
     rows = data[0].get("Rows", {})
@@ -465,7 +931,7 @@ def build_sets_maps(sets_file):
     return names, keys
 
 def get_search_tags(search_tags_file):
-    data = load_json(search_tags_file)
+    data = load_json(search_tags_file, pin=True)
     if not data or not isinstance(data, list) or not data[0]:
         return {}
     
@@ -481,547 +947,2056 @@ def get_search_tags(search_tags_file):
 
     return output
 
+def get_bundle_names(data):
+    names = []
+    if not data or not isinstance(data, list):
+        return names
+    for entry in data:
+        if entry.get("Type") != "FortMtxOfferData":
+            continue
+
+        props = entry.get("Properties", {}) or {}
+        display = (props or {}).get("DisplayName") or {}
+        names.append(display.get("LocalizedString") or display.get("SourceString") or display.get("CultureInvariantString"))
+    return names
+
 bundle_re = re.compile(r"DA_(?:((?:Character|CID)_([^/\n]+))|(([^/\n]+)_(?:Character|CID))|Feature(?:d)?_([^/\n]+?)_Bundle)", re.IGNORECASE)
 def build_bundle_index(index):
     # Build a quick lookup of DAv2 display asset files
     dav2_files = {}
-    for droot, _, dfiles in os.walk(DISPLAY_ASSETS_DIR):
-        for dfile in dfiles:
-            if not dfile.endswith('.json'):
-                continue
-            rel = os.path.relpath(os.path.join(droot, dfile), DISPLAY_ASSETS_DIR).replace("\\", "/")
-            dav2_files[dfile.lower()] = rel
+    for info in catalog_files(DISPLAY_ASSETS_DIR):
+        if not info.name.endswith('.json'):
+            continue
+        rel = os.path.relpath(info.path, DISPLAY_ASSETS_DIR).replace("\\", "/")
+        dav2_files[info.name.lower()] = rel
 
     seen_bundle_ids = set()
 
-    for root, _, files in os.walk(BUNDLE_DISPLAY_ASSETS_DIR):
-        for file in files:
-            if not file.endswith(".json"):
-                continue
-            file_path = os.path.join(root, file)
-            data = load_json(file_path)
-            if not data or not isinstance(data, list):
+    for info in catalog_files(BUNDLE_DISPLAY_ASSETS_DIR):
+        if not info.name.endswith(".json"):
+            continue
+        file_path = info.path
+        filename_no_ext = os.path.splitext(info.name)[0]
+        m = bundle_re.search(filename_no_ext)
+        if not m:
+            continue
+
+        for bundle_name in get_file_metadata("bundle", file_path, get_bundle_names):
+            bundle_id = (
+                (f"DA_{m.group(1)}" if m.group(1) else None)
+                or (f"DA_{m.group(3)}" if m.group(3) else None)
+                or m.group(5)
+            )
+            character_part = m.group(2) or m.group(4)
+            if not bundle_id or bundle_id in seen_bundle_ids:
                 continue
-            for entry in data:
-                if entry.get("Type") != "FortMtxOfferData":
-                    continue
+            seen_bundle_ids.add(bundle_id)
+
+            rel_da_path = os.path.relpath(file_path, BUNDLE_DISPLAY_ASSETS_DIR).replace("\\", "/")
+            da_path = f"DA/{rel_da_path}"
+
+            # Try to find a matching DAv2 file in DISPLAY_ASSETS_DIR
+            dav2_path = None
+            candidates = [
+                f"DAv2_Bundle_Featured_{bundle_id}.json",
+                f"DAv2_Featured_Bundle_{bundle_id}.json",
+                f"DAv2_Bundle_{bundle_id}.json",
+            ]
+            if character_part:
+                character_part_base = character_part.replace("_Athena_Commando", "")
+                candidates.extend([
+                    f"DAv2_Character_{character_part}.json",
+                    f"DAv2_{character_part}_Character.json",
+                    f"DAv2_CID_{character_part}.json",
+                    f"DAv2_CID_{character_part_base}.json",
+                    f"DAv2_{character_part}_CID.json",
+                  f"DAv2_{character_part_base}_CID.json"
+                ])
+            for cand in candidates:
+                cand_lower = cand.lower()
+                if cand_lower in dav2_files:
+                    dav2_path = f"DAv2/{dav2_files[cand_lower]}"
+                    break
+
+            bundle_entry = {
+                "bundle_id": bundle_id,
+                "bundle_name": bundle_name,
+                "da_path": da_path,
+            }
+            if dav2_path:
+                bundle_entry["dav2_path"] = dav2_path
+
+            index.append(bundle_entry)
 
-                props = entry.get("Properties", {}) or {}
-                display = (props or {}).get("DisplayName") or {}
-                bundle_name = display.get("LocalizedString") or display.get("SourceString") or display.get("CultureInvariantString")
+    return index
 
-                filename_no_ext = os.path.splitext(file)[0]
-                m = bundle_re.search(filename_no_ext)
-                if not m:
-                    continue
+def get_banner_entries(data):
+    entries = []
+    if not data or not isinstance(data, list):
+        return entries
+    for entry in data:
+        banner_id = entry.get("Name")
+        if entry.get("Type") == "FortHomebaseBannerIconItemDefinition":
+            props = entry.get("Properties", {})
 
-                bundle_id = (
-                    (f"DA_{m.group(1)}" if m.group(1) else None)
-                    or (f"DA_{m.group(3)}" if m.group(3) else None)
-                    or m.group(5)
-                )
-                character_part = m.group(2) or m.group(4)
-                if not bundle_id or bundle_id in seen_bundle_ids:
-                    continue
-                seen_bundle_ids.add(bundle_id)
-
-                rel_da_path = os.path.relpath(file_path, BUNDLE_DISPLAY_ASSETS_DIR).replace("\\", "/")
-                da_path = f"DA/{rel_da_path}"
-
-                # Try to find a matching DAv2 file in DISPLAY_ASSETS_DIR
-                dav2_path = None
-                candidates = [
-                    f"DAv2_Bundle_Featured_{bundle_id}.json",
-                    f"DAv2_Featured_Bundle_{bundle_id}.json",
-                    f"DAv2_Bundle_{bundle_id}.json",
-                ]
-                if character_part:
-                    character_part_base = character_part.replace("_Athena_Commando", "")
-                    candidates.extend([
-                        f"DAv2_Character_{character_part}.json",
-                        f"DAv2_{character_part}_Character.json",
-                        f"DAv2_CID_{character_part}.json",
-                        f"DAv2_CID_{character_part_base}.json",
-                        f"DAv2_{character_part}_CID.json",
-                      f"DAv2_{character_part_base}_CID.json"
-                    ])
-                for cand in candidates:
-                    cand_lower = cand.lower()
-                    if cand_lower in dav2_files:
-                        dav2_path = f"DAv2/{dav2_files[cand_lower]}"
-                        break
-
-                bundle_entry = {
-                    "bundle_id": bundle_id,
-                    "bundle_name": bundle_name,
-                    "da_path": da_path,
+            banner_icon = ""
+            for item in props.get("DataList", []):
+                if item.get("LargeIcon", {}) != {}:
+                    banner_icon = item.get("LargeIcon").get("AssetPathName").split('/')[-1].split('.')[0]
+            if banner_icon == "":
+                for item in props.get("DataList", []):
+                    if item.get("Icon", {}) != {}:
+                        banner_icon = item.get("Icon").get("AssetPathName").split('/')[-1].split('.')[0]
+            set_id = get_set_id(props)
+
+            if set_id:
+                banner_entry = {
+                    "banner_id": banner_id,
+                    "banner_icon": banner_icon,
+                    "setID": set_id
                 }
-                if dav2_path:
-                    bundle_entry["dav2_path"] = dav2_path
 
-                index.append(bundle_entry)
-
-    return index
+                entries.append(banner_entry)
+    return entries
 
 def build_banner_index(index):
-    for root, _, files in os.walk(BANNER_ICONS_DIR):
-        for file in files:
-            if not file.endswith(".json"):
-                continue
-            file_path = os.path.join(root, file)
-            data = load_json(file_path)
-            if not data or not isinstance(data, list):
-                continue
-            for entry in data:
-                banner_id = entry.get("Name")
-                if entry.get("Type") == "FortHomebaseBannerIconItemDefinition":
-                    props = entry.get("Properties", {})
-
-                    banner_icon = ""
-                    for item in props.get("DataList", []):
-                        if item.get("LargeIcon", {}) != {}:
-                            banner_icon = item.get("LargeIcon").get("AssetPathName").split('/')[-1].split('.')[0]
-                    if banner_icon == "":
-                        for item in props.get("DataList", []):
-                            if item.get("Icon", {}) != {}:
-                                banner_icon = item.get("Icon").get("AssetPathName").split('/')[-1].split('.')[0]
-                    set_id = get_set_id(props)
-
-                    if set_id:
-                        banner_entry = {
-                            "banner_id": banner_id,
-                            "banner_icon": banner_icon,
-                            "setID": set_id
-                        }
-
-                        index.append(banner_entry)
+    for info in catalog_files(BANNER_ICONS_DIR):
+        if not info.name.endswith(".json"):
+            continue
+        index.extend(get_file_metadata("banner", info.path, get_banner_entries))
     return index
 
 def build_companion_style_index():
-    output = []
-    for file in os.listdir(COMPANION_VARIANT_TOKENS_DIR):
-        if not file.endswith('.json'):
-            continue
-        
-        path = os.path.join(COMPANION_VARIANT_TOKENS_DIR, file)
-        data = load_json(path)
-        if not is_valid_json(data):
-            continue
-
-        entry = {}
-        for check_entry in data:
-            if check_entry.get("Type") == "FortVariantTokenType":
-                entry = check_entry
-
-        props = entry.get("Properties", {})
-
-        variantID = entry.get("Name")
-        variantChannelTag = props.get("VariantChannelTag").get("TagName")
-        variantNameTag = props.get("VariantNameTag").get("TagName")
-
-        itemShortDescription = props.get("ItemShortDescription").get("LocalizedString")
-
-        if itemShortDescription == "Style":
-            output.append({
-                "ID": variantID,
-                "channelTag": variantChannelTag,
-                "nameTag": variantNameTag
-            })
-
-    return output
-
-index = build_index(COSMETICS_DIRS)
-jido_map = build_jido_map(FIGURE_COSMETICS_DIR)
-bean_map = build_bean_map(DT_BEAN_MAP_FILE, NEW_BEANSTALK_DEF_DIR)
-sets_map, localized_sets_map = build_sets_maps(SETS_JSON_FILE)
-tags = get_search_tags(SEARCH_TAGS_JSON_FILE)
-companion_style_index = build_companion_style_index()
-
-display_assets_files = {}
-for root, _, files in os.walk(DISPLAY_ASSETS_DIR):
-    for file in files:
-        if file.endswith(".json"):
-            rel_path = os.path.relpath(os.path.join(root, file), DISPLAY_ASSETS_DIR).replace("\\", "/")
-            display_assets_files.setdefault(file, []).append(rel_path)
-
-for entry in index:
-    cid = entry["id"]
-    if cid in jido_map:
-        entry["jido"] = jido_map[cid]
-    if cid in bean_map:
-        entry["beanid"] = bean_map[cid]
-
-    for key in (f"DAv2_{cid}.json", f"DAv2_{cid.replace('Shoes', 'Shoe')}.json", f"DAv2_{cid.replace('_Athena_Commando', '')}.json"):
-        if key in display_assets_files:
-            entry["dav2"] = f"DAv2/{display_assets_files[key][0]}"
-            break
-
-index = build_bundle_index(index)
-index = build_banner_index(index)
-
-index_json = json.dumps(index, indent=2, ensure_ascii=False, sort_keys=True)
-compressed_index = gzip.compress(index_json.encode('utf-8'), mtime=0)
-with open("index.json.gz", "wb") as f:
-    f.write(compressed_index)
-
-print(f"index.json.gz created with {len(index)} entries. "
-          f"{len(jido_map)} have JIDO values, "
-          f"{len(bean_map)} have BeanID values.")
-
-with open("CosmeticSets.json", 'w', encoding='utf-8') as f:
-    json.dump(sets_map, f, indent=2, ensure_ascii=False)
-
-print(f"CosmeticSets.json created with {len(sets_map)} sets.")
-
-with open("CosmeticSetLocalizations.json", 'w', encoding='utf-8') as f:
-    json.dump(localized_sets_map, f, indent=2, ensure_ascii=False)
-
-print(f"CosmeticSetLocalizations.json created with {len(localized_sets_map)} sets.")
-
-with open("CosmeticSearchTags.json", 'w', encoding='utf-8') as f:
-    json.dump(tags, f, indent=2, ensure_ascii=False)
-
-print(f"CosmeticSearchTags.json created with {len(tags)} tags.")
-
-with open("CompanionStyleVariantTokens.json", 'w', encoding='utf-8') as f:
-    json.dump(companion_style_index, f, indent=2, ensure_ascii=False)
+    return list(get_companion_token_index()["styles"])
+
+# Payload projection - rewrites the copied exports minified and, per asset
+# family, keeps only the property paths the tools read. Paths are taken inside
+# every export in a file (lists are stepped through), exports themselves are
+# never dropped since ItemVariants point at them by position. A file whose
+# projection would drop a name the tools' JavaScript mentions is written in
+# full instead. The report times parsing each projected payload only with
+# time_projected_parse on, as that parses every payload once more
+PROJECT_PAYLOADS = config.get("project_payloads", False)
+TIME_PROJECTED_PARSE = config.get("time_projected_parse", False)
+PROJECTION_OPTION_FIELDS = ["CustomizationVariantTag", "VariantName", "PreviewImage", "VariantMaterialParams"]
+PROJECTION_FAMILIES = {
+    "items": ["Type", "Name"] + [f"Properties.{field}" for field in (
+        "ItemName", "ItemDescription", "ItemShortDescription", "Rarity", "Series", "DataList",
+        "ItemVariants", "ProgressionRewards", "BuiltInEmote", "ItemRequiresLockIn", "ItemTypeTag",
+        "ItemDefClass", "AllowedCIDs", "Gender", "VariantChannelName", "VariantChannelTag",
+        "InlineVariant", "DefaultActiveVariantTag"
+    )] + [f"Properties.{options}.{field}" for options in (
+        "ParticleOptions", "PartOptions", "MaterialOptions", "MeshOptions", "GenericTagOptions",
+        "GenericPropertyOptions", "AdditivePoseOptions", "MorphTargetOptions", "ContextualAnimSceneEmoteOptions"
+    ) for field in PROJECTION_OPTION_FIELDS],
+    "dav2": ["Type", "Name", "Properties.ContextualPresentations"],
+    "da": ["Type", "Name", "Properties.DisplayName"],
+    "weapons": ["Type", "Name", "Properties.PrimaryFireAbility", "Properties.PrimaryFireAbility_InState",
+                "Properties.AssociatedTagVariant", "Properties.DataList"],
+    "banners": ["Type", "Name", "Properties.ItemName", "Properties.ItemDescription",
+                "Properties.ItemShortDescription", "Properties.Rarity", "Properties.DataList"],
+}
+TOOL_REFERENCE_RE = re.compile(r"\.([A-Z]\w*)|'([A-Z]\w*)'|\"([A-Z]\w*)\"")
+
+_PROJECTIONS = None
+_PROJECTED_BEFORE = set()
+_PROJECTION_REPORT = {}
+
+def build_projection_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        *parents, leaf = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+            if node is True:
+                break
+        else:
+            node[leaf] = True
+    return tree
 
-print(f"CompanionStyleVariantTokens.json created with {len(companion_style_index)} VTIDs.")
+def get_tool_references():
+    tools_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tools")
+    if not os.path.isdir(tools_dir):
+        return None
+    references = set()
+    for root, _, files in os.walk(tools_dir):
+        for file in files:
+            if file.endswith(".js"):
+                with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                    references.update("".join(names) for names in TOOL_REFERENCE_RE.findall(f.read()))
+    return frozenset(references)
+
+def get_projection(family):
+    # (family, allowlist tree, names the tools reference, signature) or None
+    global _PROJECTIONS
+    if not PROJECT_PAYLOADS or family is None:
+        return None
+    if _PROJECTIONS is None:
+        references = get_tool_references()
+        if references is None:
+            print("tools/ not found next to data/, payloads are copied without projection")
+            _PROJECTIONS = {}
+        else:
+            _PROJECTIONS = {
+                name: (name, build_projection_tree(paths), references,
+                       hash_bytes(json.dumps([paths, sorted(references)]).encode("utf-8")))
+                for name, paths in PROJECTION_FAMILIES.items()
+            }
+    return _PROJECTIONS.get(family)
+
+def project_value(value, tree, references, dropped):
+    if tree is True:
+        return value
+    if isinstance(value, list):
+        return [project_value(item, tree, references, dropped) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, item in value.items():
+        if key in tree:
+            projected[key] = project_value(item, tree[key], references, dropped)
+        elif key in references:
+            dropped.add(key)
+    return projected
+
+def dump_minified(value):
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass  # integers past 64 bits again
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def get_parse_time(raw):
+    start = time.perf_counter()
+    parse_json_bytes(raw)
+    return time.perf_counter() - start
+
+def project_payload(raw, projection):
+    family, tree, references, signature = projection
+    start = time.perf_counter()
+    data = parse_json_bytes(raw)
+    raw_parse = time.perf_counter() - start
+    dropped = set()
+    projected = project_value(data, tree, references, dropped)
+    payload = dump_minified(data if dropped else projected)
+    return payload, {
+        "family": family,
+        "signature": signature,
+        "full": sorted(dropped),
+        "raw": len(raw),
+        "size": len(payload),
+        "rawParse": raw_parse,
+        "parse": get_parse_time(payload) if TIME_PROJECTED_PARSE else 0.0
+    }
+
+def record_projection(stats):
+    report = _PROJECTION_REPORT.setdefault(stats["family"], {
+        "files": 0, "full": 0, "raw": 0, "size": 0, "rawParse": 0.0, "parse": 0.0, "fields": set()
+    })
+    report["files"] += 1
+    report["full"] += bool(stats["full"])
+    report["fields"].update(stats["full"])
+    for key in ("raw", "size", "rawParse", "parse"):
+        report[key] += stats[key]
+
+def print_projection_report():
+    for family, report in sorted(_PROJECTION_REPORT.items()):
+        saved = 1 - report["size"] / report["raw"] if report["raw"] else 0
+        print(f"Projected {family}: {report['files']} files, {report['raw'] / (1024 * 1024):.1f} MB -> "
+              f"{report['size'] / (1024 * 1024):.1f} MB ({saved:.0%} smaller), parse {report['rawParse']:.2f}s"
+              + (f" -> {report['parse']:.2f}s" if TIME_PROJECTED_PARSE else "")
+              + (f", {report['full']} kept in full for {', '.join(sorted(report['fields']))}" if report["full"] else ""))
+
+# Compression codecs - every .gz output is written with its family's codec
+# from the "compression" option, e.g. {"index": "gzip:6", "items": "zlib"}:
+# gzip, zlib or brotli, each with an optional level. Outputs keep their .gz
+# names whatever the codec, readers tell them apart by their first bytes. The
+# zlib codec uses a preset dictionary trained on a sample of the exported
+# asset JSON, published as dictionaries/<adler32>.dict so the id in a stream's
+# header names the file. The last build's codecs are kept in the build
+# manifest and a family whose codec changed is rewritten in full.
+# With dictionary_compression on, each family copied from the export also
+# gets a dictionary trained on its own files, and its files of up to
+# dictionary_max_file_size bytes are compressed against it with zlib, while
+# larger ones (which gain next to nothing from it) keep the family's codec.
+# Families without export folders of their own use one trained on the
+# cosmetics and DAv2. Dictionaries are kept between runs. The report only
+# times decompression with time_decompression on, as that decompresses every
+# output again
+COMPRESSION = config.get("compression", {})
+TIME_DECOMPRESSION = config.get("time_decompression", False)
+COMPRESSION_LEVELS = {"gzip": 9, "zlib": 9, "brotli": 11}
+DICTIONARY_COMPRESSION = config.get("dictionary_compression", False)
+DICTIONARY_MAX_FILE_SIZE = config.get("dictionary_max_file_size", 16384)
+DICTIONARY_DIR = os.path.join(OUTPUT_DIR, "dictionaries")
+DICTIONARY_SIZE = config.get("dictionary_size", 32768)
+DICTIONARY_SAMPLES = config.get("dictionary_samples", 2000)
+# one dictionary-compressed file in this many is also gzipped for the report
+DICTIONARY_REPORT_SAMPLE = 8
+RETRAIN_DICTIONARY = config.get("retrain_dictionary", False)
+DICTIONARY_SOURCES = {
+    "items": COSMETICS_DIRS,
+    "dav2": [DISPLAY_ASSETS_DIR],
+    "da": [BUNDLE_DISPLAY_ASSETS_DIR],
+    "weapons": [WEAPON_DEFINITIONS_DIR],
+    "banners": [BANNER_ICONS_DIR],
+    "variants": [CHARACTER_COLOR_SWATCHES_DIR, COMPANION_FILTER_SET_DIR],
+    "localization": [LOC_DIRECTORY],
+    "assets": COSMETICS_DIRS + [DISPLAY_ASSETS_DIR],
+}
+DEFAULT_CODEC = (None, "gzip", 9, None, None)
+
+_CODECS = {}
+_PREVIOUS_CODECS = {}
+_DICTIONARIES = {}
+_DICTIONARY_PATHS = {}
+_PREVIOUS_DICTIONARIES = {}
+_COMPRESSION_REPORT = {}
+
+def get_codec_signature(codec):
+    _, name, level, dictionary, small = codec
+    return (f"{name}:{level}" + (f":{os.path.basename(dictionary)}" if dictionary else "")
+            + (f"+{get_codec_signature(small)}@{DICTIONARY_MAX_FILE_SIZE}" if small else ""))
+
+def is_codec_changed(codec):
+    # builds from before the option existed wrote everything with gzip at 9
+    return _PREVIOUS_CODECS.get(codec[0], "gzip:9") != get_codec_signature(codec)
+
+def get_codec(family):
+    # (family, codec name, level, dictionary path, codec for small files) -
+    # plain values, so worker processes get it pickled
+    if family not in _CODECS:
+        name, _, level = str(COMPRESSION.get(family, COMPRESSION.get("default", "gzip"))).partition(":")
+        if name not in COMPRESSION_LEVELS:
+            print(f"Unknown compression codec {name} for {family}, using gzip")
+            name, level = "gzip", ""
+        elif name == "brotli" and brotli is None:
+            print(f"brotli is not installed, {family} outputs use gzip")
+            name, level = "gzip", ""
+        level = int(level) if level else COMPRESSION_LEVELS[name]
+        small = None
+        if DICTIONARY_COMPRESSION and name != "zlib" and family in DICTIONARY_SOURCES:
+            dictionary = get_dictionary(family)
+            if dictionary:
+                small = (family, "zlib", COMPRESSION_LEVELS["zlib"], dictionary, None)
+        _CODECS[family] = (family, name, level, get_dictionary(family) if name == "zlib" else None, small)
+    return _CODECS[family]
+
+def load_dictionary(path):
+    if path not in _DICTIONARIES:
+        with open(path, "rb") as f:
+            _DICTIONARIES[path] = f.read()
+    return _DICTIONARIES[path]
+
+def train_dictionary(paths, size):
+    # the lines (and the path prefixes in them) that recur across the most
+    # files, most valuable last since zlib reaches closer matches more cheaply
+    counts = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            fragments = set()
+            for line in f.read().splitlines():
+                line = line.strip()
+                if len(line) < 8:
+                    continue
+                fragments.add(line)
+                slash = line.rfind(b"/")
+                if slash > 8:
+                    fragments.add(line[:slash + 1])
+        for fragment in fragments:
+            counts[fragment] = counts.get(fragment, 0) + 1
+
+    chosen = []
+    total = 0
+    for fragment in sorted((f for f, n in counts.items() if n > 1), key=lambda f: (counts[f] * len(f), f), reverse=True):
+        if total + len(fragment) + 1 <= size:
+            chosen.append(fragment)
+            total += len(fragment) + 1
+    return b"\n".join(reversed(chosen))
+
+def get_dictionary(family):
+    key = family if family in DICTIONARY_SOURCES else "assets"
+    if key in _DICTIONARY_PATHS:
+        return _DICTIONARY_PATHS[key]
+    # keep the dictionary the last build used as long as it's still there
+    path = os.path.join(DICTIONARY_DIR, _PREVIOUS_DICTIONARIES[key]) if key in _PREVIOUS_DICTIONARIES else None
+    if RETRAIN_DICTIONARY or path is None or not os.path.exists(path):
+        path = None
+        samples = sorted(info.path for root in DICTIONARY_SOURCES[key] for info in catalog_files(root)
+                         if info.name.endswith(".json") and info.size <= DICTIONARY_MAX_FILE_SIZE)
+        samples = samples[::max(1, len(samples) // DICTIONARY_SAMPLES)][:DICTIONARY_SAMPLES]
+        dictionary = train_dictionary(samples, DICTIONARY_SIZE)
+        if dictionary:
+            os.makedirs(DICTIONARY_DIR, exist_ok=True)
+            path = os.path.join(DICTIONARY_DIR, f"{zlib.adler32(dictionary):08x}.dict")
+            with open(path, "wb") as f:
+                f.write(dictionary)
+            print(f"Trained a {format_size(len(dictionary))} compression dictionary for {key} on {len(samples)} files")
+    _DICTIONARY_PATHS[key] = path
+    return path
 
-def copy_and_gzip(src_root, dest_root, label, filename_pattern=None):
+def remove_unused_dictionaries(codecs):
+    if not os.path.isdir(DICTIONARY_DIR):
+        return
+    used = set(re.findall(r"[0-9a-f]{8}\.dict", " ".join(codecs.values())))
+    for file in os.listdir(DICTIONARY_DIR):
+        if file not in used:
+            os.remove(os.path.join(DICTIONARY_DIR, file))
+    if not os.listdir(DICTIONARY_DIR):
+        os.rmdir(DICTIONARY_DIR)
+
+def get_compressor(codec):
+    _, name, level, dictionary, _ = codec
+    if name == "brotli":
+        compressor = brotli.Compressor(quality=level)
+        return compressor.process, compressor.finish
+    if name == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    elif dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 15, zdict=load_dictionary(dictionary))
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 15)
+    return compressor.compress, compressor.flush
+
+def compress_bytes(raw, codec):
+    compress_chunk, finish = get_compressor(codec)
+    return compress_chunk(raw) + finish()
+
+def is_zlib_header(raw):
+    return len(raw) > 2 and raw[0] & 0x0F == 8 and raw[0] >> 4 <= 7 and (raw[0] << 8 | raw[1]) % 31 == 0
+
+def decompress_bytes(raw):
+    if raw[:2] == b"\x1f\x8b":
+        return gzip.decompress(raw)
+    if is_zlib_header(raw):
+        try:
+            if not raw[1] & 0x20:
+                return zlib.decompress(raw)
+            dictionary = load_dictionary(os.path.join(DICTIONARY_DIR, f"{raw[2:6].hex()}.dict"))
+            decompressor = zlib.decompressobj(zdict=dictionary)
+            return decompressor.decompress(raw) + decompressor.flush()
+        except (OSError, zlib.error):
+            if brotli is None:
+                raise
+    if brotli is None:
+        raise ValueError("not a gzip or zlib stream and brotli is not installed")
+    return brotli.decompress(raw)
+
+def record_compression(stats):
+    report = _COMPRESSION_REPORT.setdefault(stats["family"], {
+        "files": 0, "raw": 0, "size": 0, "compress": 0.0, "decompress": 0.0,
+        "dictionaryFiles": 0, "dictionarySize": 0, "sampleFiles": 0, "sampleSize": 0, "sampleGzip": 0
+    })
+    report["files"] += 1
+    for key in ("raw", "size", "compress", "decompress"):
+        report[key] += stats[key]
+    if stats.get("dictionary"):
+        report["dictionaryFiles"] += 1
+        report["dictionarySize"] += stats["size"]
+    if "gzip" in stats:
+        report["sampleFiles"] += 1
+        report["sampleSize"] += stats["size"]
+        report["sampleGzip"] += stats["gzip"]
+
+def format_size(size):
+    return f"{size / (1024 * 1024):.1f} MB" if abs(size) >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+def print_compression_report():
+    for family, report in sorted(_COMPRESSION_REPORT.items()):
+        ratio = report["size"] / report["raw"] if report["raw"] else 0
+        print(f"Compressed {family} with {get_codec_signature(_CODECS[family])}: {report['files']} files written, "
+              f"{format_size(report['raw'])} -> {format_size(report['size'])} ({ratio:.1%}), "
+              f"compress {report['compress']:.2f}s" + (f", decompress {report['decompress']:.2f}s" if TIME_DECOMPRESSION else ""))
+        if report["dictionaryFiles"]:
+            codec = _CODECS[family]
+            dictionary_size = os.path.getsize((codec[4] or codec)[3])
+            line = f"  {report['dictionaryFiles']} of them against a {format_size(dictionary_size)} dictionary"
+            if report["sampleSize"]:
+                gzip_size = report["dictionarySize"] * report["sampleGzip"] / report["sampleSize"]
+                saved = gzip_size - report["dictionarySize"]
+                line += (f": ~{format_size(gzip_size)} as plain gzip -> {format_size(report['dictionarySize'])} "
+                         f"({saved / gzip_size:.1%} smaller, ~{format_size(saved - dictionary_size)} saved after "
+                         f"fetching the dictionary once, estimated from {report['sampleFiles']} files)")
+            print(line)
+
+# Worker processes - shared by build_index and the compression stage. Every
+# compression stage calls wait_for_compression() before reporting, so the
+# printed counts still line up
+WORKERS = config.get("workers", config.get("compression_workers", os.cpu_count() or 1))
+WORKER_BATCH_SIZE = 64
+
+_worker_pool = None
+_compression_batch = []
+_compression_futures = []
+_compression_results = []
+
+def get_worker_pool():
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _worker_pool
+
+def compress_file(src_path, dest_path, remove_src=False, projection=None, codec=None, prune=None):
+    codec = codec or DEFAULT_CODEC
+    with open(src_path, "rb") as f_in:
+        raw = f_in.read()
+    stats = None
+    if projection is not None:
+        raw, stats = project_payload(raw, projection)
+    if prune is not None:
+        raw = prune_localization_payload(raw, prune[1])
+        stats = {"refs": prune[0], "size": len(raw)}
+    family, small = codec[0], codec[4]
+    if small is not None and len(raw) <= DICTIONARY_MAX_FILE_SIZE:
+        codec = small
+    start = time.perf_counter()
+    compressed = compress_bytes(raw, codec)
+    compressed_at = time.perf_counter()
+    decompress_time = 0.0
+    if TIME_DECOMPRESSION and family is not None:
+        decompress_bytes(compressed)
+        decompress_time = time.perf_counter() - compressed_at
+    compression = {"family": family, "raw": len(raw), "size": len(compressed),
+                   "compress": compressed_at - start, "decompress": decompress_time}
+    if codec[3] is not None:
+        compression["dictionary"] = True
+        # the plain gzip comparison in the report is estimated from a sample
+        if zlib.crc32(dest_path.encode("utf-8")) % DICTIONARY_REPORT_SAMPLE == 0:
+            compression["gzip"] = len(compress_bytes(raw, DEFAULT_CODEC))
+    with open(dest_path, "wb") as f_out:
+        f_out.write(compressed)
+    if remove_src:
+        os.remove(src_path)
+    return stats, compression
+
+def compress_batch(batch):
+    return [(job[0], *compress_file(*job)) for job in batch]
+
+def flush_compression_batch():
+    global _compression_batch
+    if not _compression_batch:
+        return
+    _compression_futures.append(get_worker_pool().submit(compress_batch, _compression_batch))
+    _compression_batch = []
+
+def submit_compression(src_path, dest_path, remove_src=False, projection=None, codec=None, prune=None):
+    if WORKERS <= 1:
+        _compression_results.append((src_path, *compress_file(src_path, dest_path, remove_src, projection, codec, prune)))
+        return
+    _compression_batch.append((src_path, dest_path, remove_src, projection, codec, prune))
+    if len(_compression_batch) >= WORKER_BATCH_SIZE:
+        flush_compression_batch()
+
+def wait_for_compression():
+    flush_compression_batch()
+    for future in _compression_futures:
+        _compression_results.extend(future.result())
+    _compression_futures.clear()
+    for src_path, stats, compression in _compression_results:
+        if stats is not None and "refs" in stats:
+            store_metadata("loc_prune", src_path, stats)
+            _PRUNED_SIZES[src_path] = stats["size"]
+        elif stats is not None:
+            store_metadata("projection", src_path, stats)
+            record_projection(stats)
+        if compression["family"] is not None:
+            record_compression(compression)
+    _compression_results.clear()
+
+def shutdown_workers():
+    global _worker_pool
+    wait_for_compression()
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
+
+def copy_and_gzip(src_root, dest_root, label, filename_pattern=None, family=None):
     count = 0
-    for subdir, _, files in os.walk(src_root):
-        if "Archive" in subdir or "Tandem" in subdir or "Datatables" in subdir or "TestItems" in subdir or "Abilities" in subdir or ("Localization" not in src_root and "Localization" in subdir) or "CosmeticVariantTokens" in subdir or "QuestAssets" in subdir or "Prototype" in subdir:
+    created_dirs = set()
+    projection = get_projection(family)
+    codec = get_codec(family)
+    for info in catalog_files(src_root):
+        if not info.name.endswith(".json"):
             continue
+        # Apply filename pattern filter if provided
+        if filename_pattern:
+            filename_no_ext = os.path.splitext(info.name)[0]
+            if not filename_pattern.search(filename_no_ext):
+                continue
 
         # Remove "Cosmetics" from the relative path if present
-        rel = os.path.relpath(subdir, src_root)
+        rel = os.path.relpath(info.parent, src_root)
         rel_parts = rel.split(os.sep)
         filtered_parts = [part for part in rel_parts if part != "Cosmetics"]
         rel = os.path.join(*filtered_parts) if filtered_parts else ""
 
         dest_dir = os.path.join(dest_root, rel)
-        os.makedirs(dest_dir, exist_ok=True)
-        
-        for file in files:
-            if not file.endswith(".json"):
-                continue
-            # Apply filename pattern filter if provided
-            if filename_pattern:
-                filename_no_ext = os.path.splitext(file)[0]
-                if not filename_pattern.search(filename_no_ext):
-                    continue
-            src_path = os.path.join(subdir, file)
-            dest_path = os.path.join(dest_dir, file + ".gz")
-            if not (config.get("ignore_same_gz", False) and os.path.exists(dest_path)):
-                with open(src_path, "rb") as f_in:
-                    raw = f_in.read()
-                    compressed = gzip.compress(raw, mtime=0)
-                    with open(dest_path, "wb") as f_out:
-                        f_out.write(compressed)
-            count += 1
+        if dest_dir not in created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            created_dirs.add(dest_dir)
+
+        dest_path = os.path.join(dest_dir, info.name + ".gz")
+        if projection is not None:
+            stored = get_stored_metadata("projection", info.path)
+            if stored is not None and stored["signature"] == projection[3] and is_output_current(info.path, dest_path, codec):
+                record_projection(stored)
+            else:
+                submit_compression(info.path, dest_path, projection=projection, codec=codec)
+        elif not is_output_current(info.path, dest_path, codec) or info.path in _PROJECTED_BEFORE:
+            # outputs projected on an earlier run are rewritten as full copies
+            submit_compression(info.path, dest_path, codec=codec)
+        record_output(info.path, dest_path)
+        count += 1
+    wait_for_compression()
     print(f"{count} JSON files compressed and saved as .gz in {label}")
 
-# Move and compress SPARKS_LOC_DIRECTORY
-if os.path.exists(SPARKS_LOC_DIRECTORY):
-    target_path = os.path.join(os.path.join(os.path.dirname(__file__), "localization"), "SparksCosmetics")
-    if os.path.exists(target_path):
-        shutil.rmtree(target_path)
-    shutil.copytree(SPARKS_LOC_DIRECTORY, target_path)
-
-    count = 0
-    for root, _, files in os.walk(target_path):
-        for file in files:
-            src_path = os.path.join(root, file)
-            if not file.endswith('.gz'):
-                dest_path = src_path + '.gz'
-                with open(src_path, "rb") as f_in:
-                    raw = f_in.read()
-                    compressed = gzip.compress(raw, mtime=0)
-                    with open(dest_path, "wb") as f_out:
-                        f_out.write(compressed)
-                        count += 1
-                os.remove(src_path)
-    
-    print(f"Moved and compressed {count} Sparks localization JSON files from SPARKS_LOC_DIRECTORY")
-
-# Move and compress RACING_LOC_DIRECTORY
-if os.path.exists(RACING_LOC_DIRECTORY):
-    target_path = os.path.join(os.path.join(os.path.dirname(__file__), "localization"), "VehicleCosmetics")
-    if os.path.exists(target_path):
-        shutil.rmtree(target_path)
-    shutil.copytree(RACING_LOC_DIRECTORY, target_path)
-
-    count = 0
-    for root, _, files in os.walk(target_path):
-        for file in files:
-            src_path = os.path.join(root, file)
-            if not file.endswith('.gz'):
-                dest_path = src_path + '.gz'
-                with open(src_path, "rb") as f_in:
-                    raw = f_in.read()
-                    compressed = gzip.compress(raw, mtime=0)
-                    with open(dest_path, "wb") as f_out:
-                        f_out.write(compressed)
-                        count += 1
-                os.remove(src_path)
-    
-    print(f"Moved and compressed {count} Racing localization JSON files from RACING_LOC_DIRECTORY")
-
-if os.path.exists(CHARACTER_COLOR_SWATCHES_DIR):
-    target_path = os.path.join(os.path.dirname(__file__), "cosmetics", "Characters", "ColorSwatches")
-    if os.path.exists(target_path):
-        shutil.rmtree(target_path)
-    shutil.copytree(CHARACTER_COLOR_SWATCHES_DIR, target_path)
-
-    count = 0
-    for root, _, files in os.walk(target_path):
-        for file in files:
-            src_path = os.path.join(root, file)
-            if not file.endswith('.gz'):
-                dest_path = src_path + '.gz'
-                with open(src_path, "rb") as f_in:
-                    raw = f_in.read()
-                    compressed = gzip.compress(raw, mtime=0)
-                    with open(dest_path, "wb") as f_out:
-                        f_out.write(compressed)
-                        count += 1
-                os.remove(src_path)
-
-    print(f"Moved and compressed {count} Character ColorSwatches")
+def mirror_and_compress(outputs, target_roots, family):
+    # outputs maps each .gz destination to its source file. Sources are read
+    # once and compressed straight into place, unchanged outputs are left
+    # alone and anything else under target_roots is a stale output
+    codec = get_codec(family)
+    created_dirs = set()
+    for dest_path, src_path in outputs.items():
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir not in created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            created_dirs.add(dest_dir)
+
+        if not is_output_current(src_path, dest_path, codec):
+            submit_compression(src_path, dest_path, codec=codec)
+        record_output(src_path, dest_path)
+    wait_for_compression()
+
+    removed = 0
+    for target_root in target_roots:
+        for root, dirs, files in os.walk(target_root, topdown=False):
+            for file in files:
+                path = os.path.join(root, file)
+                if path not in outputs:
+                    os.remove(path)
+                    removed += 1
+            if root != target_root and not os.listdir(root):
+                os.rmdir(root)
+    return removed
+
+def mirror_directory(src_root, target_root, label, family):
+    outputs = {}
+    for info in catalog_files(src_root, prune=False):
+        if info.name.endswith('.gz'):
+            continue
+        rel_path = os.path.relpath(info.path, src_root)
+        outputs[os.path.join(target_root, rel_path + '.gz')] = info.path
 
+    removed = mirror_and_compress(outputs, [target_root], family)
+    print(f"Moved and compressed {len(outputs)} {label}" + (f", removed {removed} stale files" if removed else ""))
 
 # Move and compress Companion ColorSwatches/MaterialParameterSets
 
 ## these directories does contain a lot more else - so be careful!
 COMPANION_COLORS_AND_MATERIALS_DIRS = [
-    os.path.join(BASE_DIR, r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Biped"),
-    os.path.join(BASE_DIR, r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Quadruped"),
-    os.path.join(BASE_DIR, r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Other")
+    export_path(r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Biped"),
+    export_path(r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Quadruped"),
+    export_path(r"Plugins\GameFeatures\CosmeticCompanions\Content\Assets\Other")
 ]
 def move_and_compress_companion_colors_and_materials(src_dirs):
-    count = 0
     base_target = os.path.join(
-        os.path.dirname(__file__),
+        OUTPUT_DIR,
         "cosmetics",
         "Companions"
     )
 
-    for sub in ("ColorSwatches", "MaterialParameterSets"):
-        target_path = os.path.join(base_target, sub)
-        if os.path.exists(target_path):
-            shutil.rmtree(target_path)
-        os.makedirs(target_path, exist_ok=True)
-
+    target_roots = [os.path.join(base_target, sub) for sub in ("ColorSwatches", "MaterialParameterSets")]
+    outputs = {}
     for src_root in src_dirs:
-        if not os.path.exists(src_root):
-            continue
-        
-        for root, dirs, files in os.walk(src_root):
-            folder_name = os.path.basename(root)
-            # treat Epic's mistakes as MaterialParameterSets
-            if folder_name == "MPS" or folder_name == "MaterialParameters" or folder_name == "MaterialParamaterSets" or folder_name == "MaterialParamSets" or folder_name == "MaterialParametrs" or folder_name == "MaterialParamSettings":
-                folder_name = "MaterialParameterSets"
-
-            if folder_name not in ("ColorSwatches", "MaterialParameterSets"):
+        for info in catalog_files(src_root, prune=False):
+            if not info.name.endswith('.json') or not (info.name.startswith('CS_') or info.name.startswith('MPS_')):
                 continue
-            
-            rel_path = os.path.relpath(root, src_root)
-            # get path *above* the ColorSwatches/MaterialParameterSets folder
-            parent_rel = os.path.dirname(rel_path)
-            target_path = os.path.join(base_target, folder_name, parent_rel)
-            os.makedirs(target_path, exist_ok=True)
 
-            for subroot, _, subfiles in os.walk(root):
-                inner_rel = os.path.relpath(subroot, root)
-                dest_subdir = os.path.join(target_path, inner_rel)
-                os.makedirs(dest_subdir, exist_ok=True)
+            # a file gets copied for every ColorSwatches/MaterialParameterSets folder above it
+            rel_parts = os.path.relpath(info.parent, src_root).split(os.sep)
+            for depth, folder_name in enumerate(rel_parts):
+                # treat Epic's mistakes as MaterialParameterSets
+                if folder_name == "MPS" or folder_name == "MaterialParameters" or folder_name == "MaterialParamaterSets" or folder_name == "MaterialParamSets" or folder_name == "MaterialParametrs" or folder_name == "MaterialParamSettings":
+                    folder_name = "MaterialParameterSets"
 
-                for file in subfiles:
-                    shutil.copy2(os.path.join(subroot, file), os.path.join(dest_subdir, file))
+                if folder_name not in ("ColorSwatches", "MaterialParameterSets"):
+                    continue
 
-    for root, _, files in os.walk(base_target):
-        for file in files:
-            if not file.endswith('.json') or not (file.startswith('CS_') or file.startswith('MPS_')):
-                continue
+                # keep the path *above* the ColorSwatches/MaterialParameterSets folder
+                parent_rel = os.path.join(*rel_parts[:depth]) if depth else ""
+                inner_rel = os.path.join(*rel_parts[depth + 1:]) if depth + 1 < len(rel_parts) else ""
+                dest_subdir = os.path.join(base_target, folder_name, parent_rel, inner_rel)
+                outputs[os.path.join(dest_subdir, info.name + '.gz')] = info.path
 
-            src_path = os.path.join(root, file)
-            dest_path = src_path + '.gz'
-            with open(src_path, "rb") as f_in, open(dest_path, "wb") as f_out:
-                f_out.write(gzip.compress(f_in.read(), mtime=0))
-            os.remove(src_path)
-            count += 1
+    mirror_and_compress(outputs, target_roots, "variants")
+    count = len(outputs)
 
     print(f"Moved and compressed {count} ColorSwatches/MaterialParameterSets for Companions")
 
 def move_and_compress_lego():
     jbp_count = 0
     prop_count = 0
-    juno_root = os.path.join(BASE_DIR, r"Plugins\GameFeatures\Juno")
-    target_decor = os.path.join(os.path.dirname(__file__), "LEGO", "Decor Bundles")
-    target_props = os.path.join(os.path.dirname(__file__), "LEGO", "CraftingFormulas")
-
+    juno_root = JUNO_DIR
+    target_decor = os.path.join(OUTPUT_DIR, "LEGO", "Decor Bundles")
+    target_props = os.path.join(OUTPUT_DIR, "LEGO", "CraftingFormulas")
     for target in (target_decor, target_props):
-        if os.path.exists(target):
-            shutil.rmtree(target)
         os.makedirs(target, exist_ok=True)
 
+    outputs = {}
     if os.path.exists(juno_root):
-        for root, _, files in os.walk(juno_root):
-            for file in files:
-                if not file.endswith(".json"):
-                    continue
+        for info in catalog_files(juno_root, prune=False):
+            if not info.name.endswith(".json"):
+                continue
 
-                if file.startswith("JBPID_"):
-                    src_path = os.path.join(root, file)
-                    dest_path = os.path.join(target_decor, file + ".gz")
-                    with open(src_path, "rb") as f_in:
-                        raw = f_in.read()
-                        compressed = gzip.compress(raw, mtime=0)
-                        with open(dest_path, "wb") as f_out:
-                            f_out.write(compressed)
-                    jbp_count += 1
-                    continue
+            if info.name.startswith("JBPID_"):
+                outputs[os.path.join(target_decor, info.name + ".gz")] = info.path
+                jbp_count += 1
+                continue
 
-                if "_CraftingFormulas.json" in file:
-                    src_path = os.path.join(root, file)
-                    dest_path = os.path.join(target_props, file + ".gz")
-                    with open(src_path, "rb") as f_in:
-                        raw = f_in.read()
-                        compressed = gzip.compress(raw, mtime=0)
-                        with open(dest_path, "wb") as f_out:
-                            f_out.write(compressed)
-                    prop_count += 1
+            if "_CraftingFormulas.json" in info.name:
+                outputs[os.path.join(target_props, info.name + ".gz")] = info.path
+                prop_count += 1
 
+    removed = mirror_and_compress(outputs, [target_decor, target_props], "lego")
     print(f"Moved and compressed {jbp_count} JBPID JSON files to LEGO/Decor Bundles")
-    print(f"Moved and compressed {prop_count} _CraftingFormulas JSON files to LEGO/CraftingFormulas")
+    print(f"Moved and compressed {prop_count} _CraftingFormulas JSON files to LEGO/CraftingFormulas"
+          + (f", removed {removed} stale files" if removed else ""))
 
 
 def build_jbpid_index():
-    juno_root = os.path.join(BASE_DIR, r"Plugins\GameFeatures\Juno")
-    out_dir = os.path.join(os.path.dirname(__file__), "LEGO")
+    juno_root = JUNO_DIR
+    out_dir = os.path.join(OUTPUT_DIR, "LEGO")
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, "jbpid_index.json")
 
     entries = []
 
     if os.path.exists(juno_root):
-        for root, _, files in os.walk(juno_root):
-            for file in files:
-                if not (file.endswith(".json") and file.startswith("JBPID_")):
-                    continue
+        for info in catalog_files(juno_root, prune=False):
+            if not (info.name.endswith(".json") and info.name.startswith("JBPID_")):
+                continue
 
-                data = load_json(os.path.join(root, file))
-                if not data or not isinstance(data, list):
-                    continue
+            data = load_json(info.path)
+            if not data or not isinstance(data, list):
+                continue
 
-                entry = next((e for e in data if e.get("Type") == "JunoBuildingPropAccountItemDefinition"), None)
-                if not entry:
-                    entry = data[0] if isinstance(data[0], dict) else None
-                if not entry:
-                    continue
+            entry = next((e for e in data if e.get("Type") == "JunoBuildingPropAccountItemDefinition"), None)
+            if not entry:
+                entry = data[0] if isinstance(data[0], dict) else None
+            if not entry:
+                continue
 
-                props = entry.get("Properties", {})
-                jbp_id = entry.get("Name")
-                name = props.get("ItemName", {}).get("LocalizedString")
+            props = entry.get("Properties", {})
+            jbp_id = entry.get("Name")
+            name = props.get("ItemName", {}).get("LocalizedString")
 
-                tag = ""
-                for dl in props.get("DataList", []):
-                    if isinstance(dl, dict) and isinstance(dl.get("Tags"), list) and dl.get("Tags"):
-                        tag = dl.get("Tags")[0]
-                        break
+            tag = ""
+            for dl in props.get("DataList", []):
+                if isinstance(dl, dict) and isinstance(dl.get("Tags"), list) and dl.get("Tags"):
+                    tag = dl.get("Tags")[0]
+                    break
 
-                if jbp_id and name:
-                    entries.append({"id": jbp_id, "name": name, "tag": tag})
+            if jbp_id and name:
+                entries.append({"id": jbp_id, "name": name, "tag": tag})
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2, ensure_ascii=False)
+    write_json(out_path, entries)
 
     print(f"jbpid_index.json created with {len(entries)} entries in LEGO/")
 
 
 def build_prop_indexes():
-    juno_root = os.path.join(BASE_DIR, r"Plugins\GameFeatures\Juno")
-    out_dir = os.path.join(os.path.dirname(__file__), "LEGO")
+    juno_root = JUNO_DIR
+    out_dir = os.path.join(OUTPUT_DIR, "LEGO")
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, "jbid_index.json")
 
     entries = []
 
     if os.path.exists(juno_root):
-        for root, _, files in os.walk(juno_root):
-            for file in files:
-                if not ("_CraftingFormulas.json" in file):
-                    continue
+        for info in catalog_files(juno_root, prune=False):
+            if not ("_CraftingFormulas.json" in info.name):
+                continue
 
-                data = load_json(os.path.join(root, file))
-                if not data or not isinstance(data, list):
-                    continue
+            data = load_json(info.path)
+            if not data or not isinstance(data, list):
+                continue
 
-                table = next((e for e in data if isinstance(e, dict) and e.get("Type") == "DataTable"), None)
-                if not table:
-                    table = data[0] if isinstance(data[0], dict) else None
-                if not table:
+            table = next((e for e in data if isinstance(e, dict) and e.get("Type") == "DataTable"), None)
+            if not table:
+                table = data[0] if isinstance(data[0], dict) else None
+            if not table:
+                continue
+
+            rows = table.get("Rows", {}) or {}
+            for row_id, row in rows.items():
+                if not isinstance(row, dict):
                     continue
 
-                rows = table.get("Rows", {}) or {}
-                for row_id, row in rows.items():
-                    if not isinstance(row, dict):
+                name = row.get("DisplayName", {}).get("LocalizedString") or row.get("DisplayName", {}).get("CultureInvariantString")
+                attribute_tags = row.get("AttributeTags", []) or []
+
+                reqs = []
+                req_map = {}
+                for ing in row.get("RequiredIngredients", []) or []:
+                    if not isinstance(ing, dict):
                         continue
+                    tags = ing.get("IngredientTags", []) or []
+                    count = ing.get("Count")
+                    if tags and count is not None:
+                        reqs.append({"tag": tags[0], "count": count})
+                        req_map[tags[0]] = count
+
+                if row_id and name:
+                    entries.append({
+                        "id": row_id,
+                        "name": name,
+                        "attributeTags": attribute_tags,
+                        "requiredIngredients": req_map
+                    })
 
-                    name = row.get("DisplayName", {}).get("LocalizedString") or row.get("DisplayName", {}).get("CultureInvariantString")
-                    attribute_tags = row.get("AttributeTags", []) or []
-
-                    reqs = []
-                    req_map = {}
-                    for ing in row.get("RequiredIngredients", []) or []:
-                        if not isinstance(ing, dict):
-                            continue
-                        tags = ing.get("IngredientTags", []) or []
-                        count = ing.get("Count")
-                        if tags and count is not None:
-                            reqs.append({"tag": tags[0], "count": count})
-                            req_map[tags[0]] = count
-
-                    if row_id and name:
-                        entries.append({
-                            "id": row_id,
-                            "name": name,
-                            "attributeTags": attribute_tags,
-                            "requiredIngredients": req_map
-                        })
-
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2, ensure_ascii=False)
+    write_json(out_path, entries)
 
     print(f"jbid_index.json created with {len(entries)} entries in LEGO/")
 
     filtered_entries = [e for e in entries if any(tag.lower().startswith("juno.accountitems.unlock.buildingprop.") for tag in e.get("attributeTags", []))]
     out_path_filtered = os.path.join(out_dir, "buildingprop_index.json")
-    with open(out_path_filtered, "w", encoding="utf-8") as f:
-        json.dump(filtered_entries, f, indent=2, ensure_ascii=False)
+    write_json(out_path_filtered, filtered_entries)
     
     print(f"buildingprop_index.json created with {len(filtered_entries)} entries in LEGO/")
 
-move_and_compress_lego()
 
-build_jbpid_index()
-build_prop_indexes()
+# Localization routes - which chunk folders under data/localization define
+# each namespace/key, so a lookup only has to fetch those chunks
+def get_localization_culture_files():
+    # (chunk, culture, path) for every per-culture file that gets mirrored
+    files = []
+    for info in catalog_files(LOC_DIRECTORY):
+        parts = os.path.relpath(info.path, LOC_DIRECTORY).split(os.sep)
+        if len(parts) == 3 and parts[2] == parts[0] + ".json":
+            files.append((parts[0], parts[1], info.path))
+
+    for loc_root in (SPARKS_LOC_DIRECTORY, RACING_LOC_DIRECTORY):
+        if not os.path.exists(loc_root):
+            continue
+        chunk = os.path.basename(loc_root)
+        for info in catalog_files(loc_root, prune=False):
+            parts = os.path.relpath(info.path, loc_root).split(os.sep)
+            if len(parts) == 2 and parts[1] == chunk + ".json":
+                files.append((chunk, parts[0], info.path))
+    return files
+
+def get_localization_keys(data):
+    if not isinstance(data, dict):
+        return {}
+    return {namespace: sorted(entries) for namespace, entries in data.items() if isinstance(entries, dict)}
+
+def build_localization_routes(culture_files, referenced_keys=None):
+    # with pruning on, a chunk under LOC_DIRECTORY only routes the keys its
+    # pruned output still has
+    chunks = sorted({chunk for chunk, _, _ in culture_files})
+    chunk_ids = {chunk: i for i, chunk in enumerate(chunks)}
+
+    routes = {}
+    for chunk, _, path in culture_files:
+        pruned = referenced_keys is not None and path.startswith(LOC_DIRECTORY + os.sep)
+        for namespace, keys in get_file_metadata("loc_keys", path, get_localization_keys).items():
+            namespace_routes = routes.setdefault(namespace, {})
+            for key in keys:
+                if pruned and (namespace, key) not in referenced_keys:
+                    continue
+                key_chunks = namespace_routes.setdefault(key, [])
+                if chunk_ids[chunk] not in key_chunks:
+                    key_chunks.append(chunk_ids[chunk])
+
+    for namespace_routes in routes.values():
+        for key_chunks in namespace_routes.values():
+            key_chunks.sort()
+
+    return {"version": 1, "chunks": chunks, "routes": routes}
+
+def write_localization_routes(culture_files, referenced_keys=None):
+    routes_path = os.path.join(OUTPUT_DIR, "localization", "routes.json.gz")
+    os.makedirs(os.path.dirname(routes_path), exist_ok=True)
+    loc_routes = build_localization_routes(culture_files, referenced_keys)
+    write_json(routes_path, loc_routes, compress=True, sort_keys=True, minify=True)
+
+    key_count = sum(len(namespace_routes) for namespace_routes in loc_routes["routes"].values())
+    print(f"localization/routes.json.gz created with {key_count} keys across {len(loc_routes['chunks'])} chunks")
+    return key_count
+
+# Pruned localization - with "prune_localization" on, data/localization only
+# keeps the keys referenced by the files the site reads (cosmetics, sets,
+# bundles, display assets, banners, weapons and tokens) instead of every string
+PRUNE_LOCALIZATION = config.get("prune_localization", False)
+
+# source path -> bytes kept, filled in as pruned files come back from the workers
+_PRUNED_SIZES = {}
+
+def get_localization_refs(data):
+    refs = set()
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            if isinstance(value.get("Key"), str) and ("SourceString" in value or "LocalizedString" in value):
+                refs.add((value.get("Namespace") or "", value["Key"]))
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return sorted(refs)
+
+def collect_localization_refs():
+    sources = []
+    for directory in COSMETICS_DIRS:
+        sources.extend((info.path, VALID_TYPE_MARKER) for info in catalog_files(directory) if info.name.endswith(".json"))
+    for directory in (DISPLAY_ASSETS_DIR, BANNER_ICONS_DIR, WEAPON_DEFINITIONS_DIR, COMPANION_FILTER_SET_DIR):
+        sources.extend((info.path, None) for info in catalog_files(directory) if info.name.endswith(".json"))
+    for info in catalog_files(BUNDLE_DISPLAY_ASSETS_DIR):
+        if info.name.endswith(".json") and bundle_re.search(os.path.splitext(info.name)[0]):
+            sources.append((info.path, None))
+    sources.extend((info.path, None) for info in list_catalog_dir(COMPANION_VARIANT_TOKENS_DIR) if info.name.endswith(".json"))
+    sources.extend((path, None) for path in (SETS_JSON_FILE, SEARCH_TAGS_JSON_FILE) if os.path.exists(path))
+
+    refs = set()
+    for path, prefilter in sources:
+        for namespace, key in get_file_metadata("loc_refs", path, get_localization_refs, prefilter=prefilter):
+            refs.add((namespace, key))
+    return refs
+
+def copy_pruned_localization(referenced_keys):
+    dest_root = os.path.join(OUTPUT_DIR, "localization")
+    refs_hash = hash_bytes(json.dumps(sorted(referenced_keys), ensure_ascii=False).encode("utf-8"))
+    culture_paths = {path for _, _, path in get_localization_culture_files()}
+    codec = get_codec("localization")
+
+    count = 0
+    source_bytes = 0
+    kept_bytes = 0
+    created_dirs = set()
+    for info in catalog_files(LOC_DIRECTORY):
+        if not info.name.endswith(".json"):
+            continue
+        dest_path = os.path.join(dest_root, os.path.relpath(info.path, LOC_DIRECTORY) + ".gz")
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir not in created_dirs:
+            os.makedirs(dest_dir, exist_ok=True)
+            created_dirs.add(dest_dir)
+        count += 1
+
+        # chunk metadata files are copied whole
+        if info.path not in culture_paths:
+            if not is_output_current(info.path, dest_path, codec):
+                submit_compression(info.path, dest_path, codec=codec)
+            record_output(info.path, dest_path)
+            continue
+
+        stored = get_stored_metadata("loc_prune", info.path)
+        if stored is not None and stored["refs"] == refs_hash and is_output_current(info.path, dest_path, codec):
+            store_metadata("loc_prune", info.path, stored)
+            _PRUNED_SIZES[info.path] = stored["size"]
+        else:
+            # workers get just this file's referenced keys, not the whole set
+            keep = [(namespace, key) for namespace, keys in get_file_metadata("loc_keys", info.path, get_localization_keys).items()
+                    for key in keys if (namespace, key) in referenced_keys]
+            submit_compression(info.path, dest_path, codec=codec, prune=(refs_hash, keep))
+        record_output(info.path, dest_path)
+        source_bytes += info.size
+    wait_for_compression()
+    kept_bytes = sum(_PRUNED_SIZES.values())
+
+    print(f"{count} JSON files compressed and saved as .gz in localization, pruned to {len(referenced_keys)} referenced keys "
+          f"({(source_bytes - kept_bytes) / (1024 * 1024):.1f} of {source_bytes / (1024 * 1024):.1f} MB of strings removed)")
+
+def prune_localization_payload(raw, keep):
+    keep = set(keep)
+    data = parse_json_bytes(raw)
+    pruned = {}
+    if isinstance(data, dict):
+        for namespace, entries in data.items():
+            if not isinstance(entries, dict):
+                continue
+            kept_entries = {key: text for key, text in entries.items() if (namespace, key) in keep}
+            if kept_entries:
+                pruned[namespace] = kept_entries
+    return json.dumps(pruned, indent=2, ensure_ascii=False).encode("utf-8")
+
+def forget_pruned_localization():
+    # outputs pruned on an earlier run must not pass for current full copies
+    dest_root = os.path.join(OUTPUT_DIR, "localization")
+    for path in get_stored_paths("loc_prune"):
+        forget_output(os.path.join(dest_root, os.path.relpath(path, LOC_DIRECTORY) + ".gz"))
+
+# Localization key shards - every culture's text for a key in one small file.
+# Keys are spread over power-of-two buckets by crc32 of "namespace\0key" (the
+# same hash loadLocalizationKey in tools/jsondata.js uses). Where several
+# chunks define a key, the first chunk by name wins. Cultures keep the chunk's
+# CompiledCultures order, which is the order the translator lists them in
+LOC_KEYS_PER_SHARD = config.get("loc_keys_per_shard", 256)
+
+def get_localization_bucket(namespace, key, bucket_count):
+    return zlib.crc32(f"{namespace}\0{key}".encode("utf-8")) & (bucket_count - 1)
+
+def get_chunk_info_path(culture_path):
+    # <chunk>/<culture>/<chunk>.json sits under the chunk's <chunk>/<chunk>.json
+    return os.path.join(os.path.dirname(os.path.dirname(culture_path)), os.path.basename(culture_path))
+
+def get_compiled_cultures(info_path):
+    data = load_json(info_path) if os.path.exists(info_path) else None
+    cultures = data.get("CompiledCultures") if isinstance(data, dict) else None
+    return cultures if isinstance(cultures, list) else []
+
+def write_localization_key_shards(culture_files, key_count, referenced_keys=None):
+    keys_dir = os.path.join(OUTPUT_DIR, "localization", "keys")
+    manifest_path = os.path.join(keys_dir, "manifest.json")
+    if referenced_keys is not None:
+        # only the referenced keys some culture file actually defines get rows
+        present = set()
+        for _, _, path in culture_files:
+            for namespace, keys in get_file_metadata("loc_keys", path, get_localization_keys).items():
+                present.update((namespace, key) for key in keys if (namespace, key) in referenced_keys)
+        key_count = len(present)
+    bucket_count = 1
+    while bucket_count * LOC_KEYS_PER_SHARD < key_count:
+        bucket_count *= 2
+
+    culture_files = sorted(culture_files)
+    manifest = {
+        "version": 2,
+        "hash": "crc32",
+        "buckets": bucket_count,
+        "cultures": sorted({culture for _, culture, _ in culture_files}),
+        "files": [f"{chunk}/{culture}" for chunk, culture, _ in culture_files]
+    }
+    if referenced_keys is not None:
+        manifest["pruned"] = hash_bytes(json.dumps(sorted(referenced_keys), ensure_ascii=False).encode("utf-8"))
+
+    info_paths = {chunk: get_chunk_info_path(path) for chunk, _, path in culture_files}
+    sources = [path for _, _, path in culture_files] + [path for path in info_paths.values() if os.path.exists(path)]
+    unchanged = [is_source_unchanged(path) for path in sources]
+    if all(unchanged) and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                print("Localization key shards are up to date")
+                return
+
+    # the inverted tables are far bigger than memory for the full export, so
+    # rows go through a temporary on-disk database and come back by bucket
+    db = sqlite3.connect("")
+    db.execute("CREATE TABLE entries (bucket INTEGER, namespace TEXT, key TEXT, culture TEXT, text TEXT, chunk INTEGER, position INTEGER)")
+    chunk_ranks = {}
+    compiled_cultures = {}
+    for chunk, culture, path in culture_files:
+        chunk_ranks.setdefault(chunk, len(chunk_ranks))
+        if chunk not in compiled_cultures:
+            compiled_cultures[chunk] = get_compiled_cultures(info_paths[chunk])
+        cultures = compiled_cultures[chunk]
+        position = cultures.index(culture) if culture in cultures else len(cultures)
+        data = load_json(path)
+        if not isinstance(data, dict):
+            continue
+        rows = []
+        for namespace, entries in data.items():
+            if not isinstance(entries, dict):
+                continue
+            for key, text in entries.items():
+                if referenced_keys is not None and (namespace, key) not in referenced_keys:
+                    continue
+                rows.append((get_localization_bucket(namespace, key, bucket_count), namespace, key, culture, text, chunk_ranks[chunk], position))
+        db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+    db.execute("CREATE INDEX entries_bucket ON entries (bucket, namespace, key, chunk, position)")
+
+    os.makedirs(keys_dir, exist_ok=True)
+    written = set()
+
+    def write_shard(bucket, shard):
+        shard_path = os.path.join(keys_dir, f"{bucket:x}.json.gz")
+        write_json(shard_path, shard, compress=True, minify=True)
+        written.add(shard_path)
+
+    current_bucket = None
+    shard = {}
+    for bucket, namespace, key, culture, text in db.execute(
+        "SELECT bucket, namespace, key, culture, text FROM entries ORDER BY bucket, namespace, key, chunk, position, culture"
+    ):
+        if bucket != current_bucket:
+            if shard:
+                write_shard(current_bucket, shard)
+            current_bucket = bucket
+            shard = {}
+        shard.setdefault(namespace, {}).setdefault(key, {}).setdefault(culture, text)
+    if shard:
+        write_shard(current_bucket, shard)
+    db.close()
+
+    for file in os.listdir(keys_dir):
+        path = os.path.join(keys_dir, file)
+        if file.endswith(".json.gz") and path not in written:
+            os.remove(path)
+
+    write_json(manifest_path, manifest)
+    print(f"{len(written)} localization key shards created for {key_count} keys in {len(manifest['cultures'])} cultures")
+
+# Index shards - the same entries as index.json.gz split by record kind, with
+# cosmetics split again by type (the first folder of their path), so a tool
+# can fetch just the slice it needs. manifest.json lists every shard
+def get_index_record_kind(entry):
+    if "bundle_id" in entry:
+        return "bundles"
+    if "banner_id" in entry:
+        return "banners"
+    if entry.get("companionEmote"):
+        return "companionEmotes"
+    return "cosmetics"
+
+def describe_file(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return {"size": len(raw), "hash": hashlib.sha256(raw).hexdigest()}
+
+def write_index_shards(index):
+    shards = {}
+    for entry in index:
+        kind = get_index_record_kind(entry)
+        cosmetic_type = None
+        if kind == "cosmetics":
+            path = entry.get("path", "")
+            cosmetic_type = path.split("/")[0] if "/" in path else "Other"
+        shard_name = f"{kind}/{cosmetic_type}" if cosmetic_type else kind
+        shards.setdefault(shard_name, (kind, cosmetic_type, []))[2].append(entry)
+
+    manifest = {"version": 1, "entries": len(index), "shards": {}}
+    written = set()
+    for shard_name, (kind, cosmetic_type, entries) in sorted(shards.items()):
+        shard_path = os.path.join(OUTPUT_DIR, INDEX_SHARD_DIR, *shard_name.split("/")) + ".json.gz"
+        os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+        write_json(shard_path, entries, compress=True, sort_keys=True)
+        written.add(os.path.normpath(shard_path))
+
+        shard = {"kind": kind}
+        if cosmetic_type:
+            shard["type"] = cosmetic_type
+        shard["path"] = f"{INDEX_SHARD_DIR}/{shard_name}.json.gz"
+        shard["entries"] = len(entries)
+        shard.update(describe_file(shard_path))
+        manifest["shards"][shard_name] = shard
+
+    # drop shards for kinds or types that no longer exist
+    for root, _, files in os.walk(os.path.join(OUTPUT_DIR, INDEX_SHARD_DIR)):
+        for file in files:
+            path = os.path.normpath(os.path.join(root, file))
+            if file.endswith(".json.gz") and path not in written:
+                os.remove(path)
+
+    write_json(os.path.join(OUTPUT_DIR, INDEX_SHARD_DIR, "manifest.json"), manifest)
+    total_size = sum(shard["size"] for shard in manifest["shards"].values())
+    print(f"{INDEX_SHARD_DIR}/manifest.json created with {len(shards)} index shards ({total_size / 1024:.0f} KB)")
+
+# Compact index - index.json.gz stored by column instead of by record. Paths
+# are split into a shared folder prefix and a file name, set IDs and car body
+# tags point into the same string table and identical search tag lists are
+# stored once. decodeCompactIndex in tools/jsondata.js turns it back into the
+# index.json records
+COMPACT_PATH_KEYS = ("path", "dav2", "da_path", "dav2_path", "weaponDefinition")
+COMPACT_STRING_KEYS = ("setID", "carBodyTag")
+COMPACT_TAG_LIST_KEYS = ("generatedSearchTagIndexes",)
+
+def build_compact_index(index):
+    strings = []
+    string_ids = {}
+    tag_lists = []
+    tag_list_ids = {}
+
+    def intern_string(value):
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    def intern_tag_list(value):
+        key = tuple(value)
+        if key not in tag_list_ids:
+            tag_list_ids[key] = len(tag_lists)
+            tag_lists.append(value)
+        return tag_list_ids[key]
+
+    columns = {}
+    for key in sorted({key for entry in index for key in entry}):
+        values = [entry.get(key) for entry in index]
+        if key in COMPACT_PATH_KEYS:
+            prefixes = []
+            names = []
+            for value in values:
+                if value is None:
+                    prefixes.append(None)
+                    names.append(None)
+                    continue
+                split = value.rfind("/") + 1
+                prefixes.append(intern_string(value[:split]))
+                names.append(value[split:])
+            columns[key] = {"encoding": "path", "prefixes": prefixes, "names": names}
+        elif key in COMPACT_STRING_KEYS:
+            columns[key] = {"encoding": "string", "values": [None if value is None else intern_string(value) for value in values]}
+        elif key in COMPACT_TAG_LIST_KEYS:
+            columns[key] = {"encoding": "tagList", "values": [None if value is None else intern_tag_list(value) for value in values]}
+        else:
+            columns[key] = {"encoding": "raw", "values": values}
+
+    return {
+        "version": 1,
+        "count": len(index),
+        "strings": strings,
+        "tagLists": tag_lists,
+        "columns": columns
+    }
+
+def write_compact_index(index):
+    compact_path = os.path.join(OUTPUT_DIR, COMPACT_INDEX_FILE)
+    write_json(compact_path, build_compact_index(index), compress=True, minify=True)
+    full_size = os.path.getsize(os.path.join(OUTPUT_DIR, INDEX_FILE))
+    compact_size = os.path.getsize(compact_path)
+    print(f"{COMPACT_INDEX_FILE} created ({compact_size / 1024:.0f} KB, "
+          f"{100 * compact_size / max(full_size, 1):.0f}% of index.json.gz)")
+
+# Search index - what the generator tools need to suggest cosmetics by name or
+# ID without the full index. Names and IDs are split into lowercase tokens,
+# each token has a posting list of the documents using it (stored as gaps),
+# token trigrams find tokens containing a typed fragment, and one and two
+# character inputs get their top results ranked ahead of time. Scores match
+# the tools' own suggestion scoring
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")
+SEARCH_RESULT_LIMIT = 10
+
+def get_search_score(query, name, cosmetic_id):
+    score = 0
+    if name == query:
+        score += 100
+    elif name.startswith(query):
+        score += 75
+    elif query in name:
+        score += 50
+
+    if cosmetic_id == query:
+        score += 40
+    elif cosmetic_id.startswith(query):
+        score += 25
+    elif query in cosmetic_id:
+        score += 10
+    return score
+
+def build_search_index(index):
+    ids = []
+    names = []
+    rows = []
+    for row, entry in enumerate(index):
+        if get_index_record_kind(entry) not in ("cosmetics", "companionEmotes"):
+            continue
+        if not entry.get("name") or not entry.get("id"):
+            continue
+        ids.append(entry["id"])
+        names.append(entry["name"])
+        rows.append(row)
+
+    token_docs = {}
+    short_scores = {}
+    for doc, (cosmetic_id, name) in enumerate(zip(ids, names)):
+        lower_id = cosmetic_id.lower()
+        lower_name = name.lower()
+        for token in set(SEARCH_TOKEN_RE.findall(lower_name) + SEARCH_TOKEN_RE.findall(lower_id)):
+            token_docs.setdefault(token, []).append(doc)
+
+        fragments = set()
+        for text in (lower_name, lower_id):
+            for start in range(len(text)):
+                fragments.add(text[start:start + 1])
+                fragments.add(text[start:start + 2])
+        for fragment in fragments:
+            # inputs are trimmed before they are looked up
+            if fragment != fragment.strip():
+                continue
+            short_scores.setdefault(fragment, []).append((get_search_score(fragment, lower_name, lower_id), -doc))
+
+    tokens = sorted(token_docs)
+    postings = []
+    for token in tokens:
+        previous = 0
+        gaps = []
+        for doc in token_docs[token]:
+            gaps.append(doc - previous)
+            previous = doc
+        postings.append(gaps)
+
+    trigrams = {}
+    for token_id, token in enumerate(tokens):
+        for start in range(len(token) - 2):
+            token_ids = trigrams.setdefault(token[start:start + 3], [])
+            if not token_ids or token_ids[-1] != token_id:
+                token_ids.append(token_id)
+
+    short = {}
+    for fragment, scores in short_scores.items():
+        short[fragment] = [-doc for score, doc in heapq.nlargest(SEARCH_RESULT_LIMIT, scores)]
+
+    return {
+        "version": 1,
+        "docs": {"ids": ids, "names": names, "rows": rows},
+        "tokens": tokens,
+        "postings": postings,
+        "trigrams": trigrams,
+        "short": short
+    }
+
+def write_search_index(index):
+    search_index = build_search_index(index)
+    search_path = os.path.join(OUTPUT_DIR, SEARCH_INDEX_FILE)
+    write_json(search_path, search_index, compress=True, sort_keys=True, minify=True)
+    print(f"{SEARCH_INDEX_FILE} created with {len(search_index['docs']['ids'])} searchable entries "
+          f"and {len(search_index['tokens'])} tokens ({os.path.getsize(search_path) / 1024:.0f} KB)")
+
+# Relationship indexes - set -> members, search tag -> cosmetics and bundle ->
+# contents, bucketed by the crc32 of the key so a page fetches the one small
+# file holding what it needs instead of filtering the whole index
+RELATION_DIR = "relations"
+RELATION_KEYS_PER_SHARD = config.get("relation_keys_per_shard", 64)
+
+def get_relation_record(entry):
+    return {field: value for field, value in entry.items() if field != "generatedSearchTagIndexes"}
+
+# the properties of a bundle's DA/DAv2 exports that list what the offer grants.
+# Other properties (tooltips, related items...) can name cosmetics that aren't
+# part of the bundle, so only these are read
+BUNDLE_GRANT_PROPERTIES = ("ItemGrants", "GrantedItems", "Items")
+
+def get_granted_item_id(reference):
+    # "AthenaCharacter:CID_X", "AthenaCharacterItemDefinition'CID_X'",
+    # "/BRCosmetics/.../CID_X.CID_X" and ".../CID_X.0" all grant CID_X
+    if "'" in reference:
+        reference = reference.split("'")[1]
+    elif ":" in reference and "/" not in reference:
+        reference = reference.split(":", 1)[1]
+    return reference.rsplit("/", 1)[-1].split(".")[0].lower()
+
+def get_bundle_grants(data):
+    grants = set()
+
+    def walk(value):
+        if isinstance(value, dict):
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, str) and value:
+            grants.add(get_granted_item_id(value))
+
+    if isinstance(data, list):
+        for export in data:
+            if not isinstance(export, dict):
+                continue
+            props = export.get("Properties") or {}
+            for prop in BUNDLE_GRANT_PROPERTIES:
+                walk(props.get(prop))
+    return sorted(grants)
+
+def get_bundle_contents(entry, cosmetics_by_id):
+    references = []
+    for key, source_dir in (("da_path", BUNDLE_DISPLAY_ASSETS_DIR), ("dav2_path", DISPLAY_ASSETS_DIR)):
+        if entry.get(key):
+            path = os.path.join(source_dir, entry[key].split("/", 1)[1])
+            if os.path.exists(path):
+                references.extend(get_file_metadata("bundle_grants", path, get_bundle_grants))
+
+    # character bundles don't always grant their outfit by name, so also try
+    # the character part of the DA's file name as an outfit ID
+    m = bundle_re.search(os.path.splitext(os.path.basename(entry.get("da_path", "")))[0])
+    character_part = m and (m.group(2) or m.group(4))
+    if character_part:
+        references.extend(f"{prefix}_{character_part}".lower() for prefix in ("CID", "Character"))
+
+    contents = {}
+    for reference in references:
+        if reference in cosmetics_by_id:
+            position, cosmetic = cosmetics_by_id[reference]
+            contents[position] = get_relation_record(cosmetic)
+    return [contents[position] for position in sorted(contents)]
+
+def build_relations(index):
+    cosmetics_by_id = {}
+    for position, entry in enumerate(index):
+        if get_index_record_kind(entry) == "cosmetics" and entry.get("id"):
+            cosmetics_by_id.setdefault(entry["id"].lower(), (position, entry))
+
+    sets = {}
+    search_tags = {}
+    bundles = {}
+    for entry in index:
+        if entry.get("setID"):
+            sets.setdefault(entry["setID"], []).append(get_relation_record(entry))
+        # every cosmetic has several tags, so tag lists keep only what a tag
+        # lookup shows rather than the whole record
+        if entry.get("id"):
+            for tag_index in entry.get("generatedSearchTagIndexes") or []:
+                search_tags.setdefault(str(tag_index), []).append(
+                    {field: entry[field] for field in ("id", "name", "path") if field in entry})
+        if get_index_record_kind(entry) == "bundles":
+            bundles[entry["bundle_id"]] = {
+                "bundle": entry,
+                "cosmetics": get_bundle_contents(entry, cosmetics_by_id)
+            }
+
+    return {"sets": sets, "searchTags": search_tags, "bundles": bundles}
+
+def write_relation(name, relation):
+    relation_dir = os.path.join(OUTPUT_DIR, RELATION_DIR, name)
+    os.makedirs(relation_dir, exist_ok=True)
+    bucket_count = 1
+    while bucket_count * RELATION_KEYS_PER_SHARD < len(relation):
+        bucket_count *= 2
+
+    shards = {}
+    for key, value in relation.items():
+        bucket = zlib.crc32(key.encode("utf-8")) & (bucket_count - 1)
+        shards.setdefault(bucket, {})[key] = value
+
+    written = set()
+    for bucket, shard in shards.items():
+        file = f"{bucket:x}.json.gz"
+        write_json(os.path.join(relation_dir, file), shard, compress=True, sort_keys=True, minify=True)
+        written.add(file)
+    for file in os.listdir(relation_dir):
+        if file.endswith(".json.gz") and file not in written:
+            os.remove(os.path.join(relation_dir, file))
+
+    write_json(os.path.join(relation_dir, "manifest.json"),
+               {"version": 1, "hash": "crc32", "buckets": bucket_count, "keys": len(relation)})
+    return len(written)
+
+def load_relation(name):
+    relation = {}
+    relation_dir = os.path.join(OUTPUT_DIR, RELATION_DIR, name)
+    if not os.path.isdir(relation_dir):
+        return relation
+    for file in os.listdir(relation_dir):
+        if file.endswith(".json.gz"):
+            with open(os.path.join(relation_dir, file), "rb") as f:
+                relation.update(json.loads(decompress_bytes(f.read())))
+    return relation
+
+def check_bundle_relation(previous, bundles):
+    # the bundle page fills its cosmetics from the published relation, so any
+    # bundle that now resolves differently is listed for a look before deploying
+    get_ids = lambda contents: [cosmetic.get("id") for cosmetic in contents["cosmetics"]]
+    compared = [bundle_id for bundle_id in bundles if bundle_id in previous]
+    changed = sorted(bundle_id for bundle_id in compared if get_ids(previous[bundle_id]) != get_ids(bundles[bundle_id]))
+    if changed:
+        print(f"{RELATION_DIR}/bundles: {len(changed)} of {len(compared)} bundles resolve to different cosmetics than "
+              f"the published relation: {', '.join(changed[:10])}" + (", ..." if len(changed) > 10 else ""))
+    elif compared:
+        print(f"{RELATION_DIR}/bundles matches the published relation for all {len(compared)} bundles")
+
+def write_relations(index):
+    relations = build_relations(index)
+    previous_bundles = load_relation("bundles")
+    for name, relation in relations.items():
+        shard_count = write_relation(name, relation)
+        print(f"{RELATION_DIR}/{name} created with {len(relation)} keys in {shard_count} shards")
+    check_bundle_relation(previous_bundles, relations["bundles"])
+
+# Pack files - with pack_outputs on, the compressed outputs of each family
+# are concatenated into a few packs/<family>/<hash>.pack files, each member
+# still its own compressed stream, and packs/<family>.json.gz maps every logical path
+# to its pack, offset, length and crc32. Pack boundaries fall after paths whose
+# crc32 is a multiple of pack_members, so a new file only rewrites its own
+# pack. Packed members are taken out of the loose tree; until a pack absorbs
+# them, new and changed outputs are written loose as before
+PACK_OUTPUTS = config.get("pack_outputs", False)
+PACK_MEMBERS = config.get("pack_members", 512)
+PACK_FAMILIES = ["cosmetics", "DAv2", "DA", "banners", "localization"]
+PACK_DIR = os.path.join(OUTPUT_DIR, "packs")
+
+# logical path -> (pack file, offset, length, crc32) from the last build
+_PACKED_OUTPUTS = {}
+
+def normalize_output_key(key):
+    return re.sub(r"/{2,}", "/", key).lstrip("/")
+
+def get_output_path(key):
+    return os.path.join(OUTPUT_DIR, normalize_output_key(key))
+
+def load_pack_indexes():
+    if not PACK_OUTPUTS:
+        return
+    for family in PACK_FAMILIES:
+        index_path = os.path.join(PACK_DIR, f"{family}.json.gz")
+        if not os.path.exists(index_path):
+            continue
+        with open(index_path, "rb") as f:
+            pack_index = parse_json_bytes(gzip.decompress(f.read()))
+        for key, (pack, offset, length, crc) in pack_index["members"].items():
+            pack_path = os.path.join(OUTPUT_DIR, pack_index["packs"][pack]["path"])
+            _PACKED_OUTPUTS[key] = (pack_path, offset, length, crc)
+
+def forget_output(output_path):
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    _PACKED_OUTPUTS.pop(output_key(output_path), None)
+
+def read_output(key):
+    # the compressed bytes of an output, from the loose tree or its pack
+    path = get_output_path(key)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    member = _PACKED_OUTPUTS.get(normalize_output_key(key))
+    if member is None:
+        return None
+    pack_path, offset, length, _ = member
+    with open(pack_path, "rb") as f:
+        f.seek(offset)
+        return f.read(length)
+
+def read_output_json(key):
+    raw = read_output(key)
+    return None if raw is None else parse_json_bytes(decompress_bytes(raw))
+
+def get_output_stat(key):
+    try:
+        st = os.stat(get_output_path(key))
+        return [st.st_size, st.st_mtime_ns]
+    except OSError:
+        member = _PACKED_OUTPUTS.get(normalize_output_key(key))
+        return None if member is None else [member[2], member[3]]
+
+def write_packs():
+    if not PACK_OUTPUTS:
+        if os.path.isdir(PACK_DIR):
+            shutil.rmtree(PACK_DIR)
+        return
+
+    produced = sorted({output for record in _CURRENT_SOURCES.values() for output in record["outputs"]})
+    packed = {}
+    for family in PACK_FAMILIES:
+        family_dir = os.path.join(PACK_DIR, family)
+        os.makedirs(family_dir, exist_ok=True)
+        packs = []
+        members = {}
+        chunk = []
+
+        def flush():
+            if not chunk:
+                return
+            data = b"".join(raw for _, raw in chunk)
+            pack = f"packs/{family}/{get_content_hash(data)}.pack"
+            pack_path = os.path.join(OUTPUT_DIR, pack)
+            if not os.path.exists(pack_path):
+                with open(pack_path, "wb") as f:
+                    f.write(data)
+            offset = 0
+            for key, raw in chunk:
+                members[key] = [len(packs), offset, len(raw), zlib.crc32(raw)]
+                packed[key] = (pack_path, offset, len(raw), zlib.crc32(raw))
+                offset += len(raw)
+            packs.append({"path": pack, "size": len(data)})
+            chunk.clear()
+
+        for key in produced:
+            if not key.startswith(family + "/"):
+                continue
+            raw = read_output(key)
+            if raw is None:
+                continue
+            chunk.append((key, raw))
+            if zlib.crc32(key.encode("utf-8")) % PACK_MEMBERS == 0:
+                flush()
+        flush()
+
+        write_json(os.path.join(PACK_DIR, f"{family}.json.gz"), {"version": 1, "packs": packs, "members": members},
+                   compress=True, sort_keys=True, minify=True)
+        current = {os.path.basename(pack["path"]) for pack in packs}
+        for file in os.listdir(family_dir):
+            if file not in current:
+                os.remove(os.path.join(family_dir, file))
+
+        # the packs hold them now
+        for key in members:
+            path = get_output_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+        family_root = os.path.join(OUTPUT_DIR, family)
+        for root, _, _ in os.walk(family_root, topdown=False):
+            if root != family_root and not os.listdir(root):
+                os.rmdir(root)
+        print(f"{len(members)} {family} outputs packed into {len(packs)} pack files "
+              f"({sum(pack['size'] for pack in packs) / (1024 * 1024):.1f} MB)")
+
+    _PACKED_OUTPUTS.clear()
+    _PACKED_OUTPUTS.update(packed)
+
+# Page bundles - every data file cosmetic-page-generator.js reads to render
+# one cosmetic (the cosmetic itself, its weapon definition and DAv2, colour
+# swatches, material parameter sets, the variant filter set, decals and reward
+# items) in a single file, keyed by the path the generator requests each under
+PAGE_BUNDLES = config.get("page_bundles", False)
+PAGE_BUNDLE_DIR = os.path.join(OUTPUT_DIR, "pages")
+
+COMPANION_SWATCH_RE = re.compile(r"CosmeticCompanions/Assets/(?:Quadruped|Biped|Other)/([^/]*)/ColorSwatches/")
+COMPANION_MPS_RE = re.compile(r"CosmeticCompanions/Assets/(?:Quadruped|Biped|Other)/([^/]*)/(?:MaterialParameterSets|MaterialParamaterSets|MaterialParameters|MPS|MaterialParamSets|MaterialParametrs|MaterialParamSettings)/")
+CHARACTER_SWATCH_RE = re.compile(r"(?:Game|BRCosmetics)/Characters/CharacterColorSwatches/(?:Misc)/")
+
+# these follow the path rewrites in cosmetic-page-generator.js exactly, stray
+# slashes included, so the keys match what it asks loadGzJson for
+def get_color_swatch_key(asset_path):
+    path = asset_path.split(".")[0].replace("/VehicleCosmetics/Mutable/Bodies/", "cosmetics/Racing/Bodies/", 1)
+    path = COMPANION_SWATCH_RE.sub(lambda m: f"cosmetics/Companions/ColorSwatches/{m.group(1)}/", path, count=1)
+    path = COMPANION_MPS_RE.sub(lambda m: f"cosmetics/Companions/MaterialParameterSets/{m.group(1)}/", path, count=1)
+    path = CHARACTER_SWATCH_RE.sub("cosmetics/Characters/ColorSwatches/", path, count=1)
+    return path + ".json.gz"
+
+def get_material_parameters_key(object_path):
+    path = COMPANION_MPS_RE.sub(lambda m: f"cosmetics/Companions/MaterialParameterSets/{m.group(1)}/", object_path.split(".")[0], count=1) + ".json"
+    path = COMPANION_SWATCH_RE.sub(lambda m: f"cosmetics/Companions/ColorSwatches/{m.group(1)}/", path, count=1)
+    return path + ".gz"
+
+def get_filter_set_key(asset_path):
+    path = asset_path.split(".")[0].replace("/CosmeticCompanions/Data/VariantFilterSet/", "cosmetics/Companions/VariantFilterSets/", 1)
+    return path.replace("/BRCosmetics/Athena/Items/Cosmetics", "cosmetics", 1) + ".json.gz"
+
+def get_page_bundle_keys(entry, data, decals_by_tag, cosmetics_by_id):
+    keys = [f"cosmetics/{entry['path']}.gz"]
+    for field in ("weaponDefinition", "dav2"):
+        if entry.get(field):
+            keys.append(f"{entry[field]}.gz")
+
+    def walk(value):
+        if isinstance(value, list):
+            for item in value:
+                walk(item)
+            return
+        if not isinstance(value, dict):
+            return
+        for field, item in value.items():
+            if field == "ColorSwatchForChoices" and isinstance(item, dict) and item.get("AssetPathName"):
+                keys.append(get_color_swatch_key(item["AssetPathName"]))
+            elif field == "MaterialParameterSetChoices" and isinstance(item, dict) and item.get("ObjectPath"):
+                keys.append(get_material_parameters_key(item["ObjectPath"]))
+            elif field == "SharedFilterSet" and isinstance(item, dict) and item.get("AssetPathName"):
+                keys.append(get_filter_set_key(item["AssetPathName"]))
+            elif field == "Tags" and isinstance(item, list):
+                for tag in item:
+                    if isinstance(tag, str) and tag.lower().startswith("vehiclecosmetics.body"):
+                        keys.extend(f"cosmetics/{path}.gz" for path in decals_by_tag.get(tag, []))
+            elif field == "PrimaryAssetName" and isinstance(item, str):
+                reward = cosmetics_by_id.get(item.lower())
+                if reward and reward.get("path"):
+                    keys.append(f"cosmetics/{reward['path']}.gz")
+            else:
+                walk(item)
+
+    walk(data)
+    return list(dict.fromkeys(keys))
+
+def write_page_bundles(index):
+    manifest_path = os.path.join(PAGE_BUNDLE_DIR, "manifest.json")
+    if not PAGE_BUNDLES:
+        # bundles left from an earlier run would serve data that has moved on
+        if os.path.isdir(PAGE_BUNDLE_DIR):
+            shutil.rmtree(PAGE_BUNDLE_DIR)
+        return
+
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("pages", {})
+
+    cosmetics_by_id = {}
+    decals_by_tag = {}
+    for entry in index:
+        if entry.get("id"):
+            cosmetics_by_id.setdefault(entry["id"].lower(), entry)
+        if entry.get("carBodyTag") and entry.get("path") and not entry.get("id", "").lower().startswith(("carbody_", "body_")):
+            decals_by_tag.setdefault(entry["carBodyTag"], []).append(entry["path"])
+
+    pages = {}
+    written = 0
+    for entry in index:
+        if get_index_record_kind(entry) != "cosmetics" or not entry.get("path"):
+            continue
+        page = f"{entry['path']}.gz"
+        page_path = os.path.join(PAGE_BUNDLE_DIR, page)
+        entry_hash = hash_bytes(json.dumps(entry, sort_keys=True).encode("utf-8"))
+
+        # a bundle only seeds the generator's cache, so it is current as long
+        # as the entry and every file in it are - files it could now also hold
+        # are simply fetched by the page
+        record = previous.get(page)
+        if (record and record["entry"] == entry_hash and os.path.exists(page_path)
+                and all(get_output_stat(key) == stat for key, stat in record["files"].items())):
+            pages[page] = record
+            continue
 
-move_and_compress_companion_colors_and_materials(COMPANION_COLORS_AND_MATERIALS_DIRS)
+        cosmetic = read_output_json(f"cosmetics/{page}")
+        if cosmetic is None:
+            continue
+        files = {}
+        stats = {}
+        for key in get_page_bundle_keys(entry, cosmetic, decals_by_tag, cosmetics_by_id):
+            stat = get_output_stat(key)
+            if stat is None:
+                continue
+            files[key] = read_output_json(key)
+            stats[key] = stat
 
-copy_and_gzip(BR_COSMETICS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics"), "cosmetics")
-copy_and_gzip(OLD_BR_COSMETICS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics"), "cosmetics (old FortniteGame/Content/Athena/Items/Cosmetics folder)")
-copy_and_gzip(KICKS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics", "Shoes"), "cosmetics/Shoes")
-copy_and_gzip(FESTIVAL_COSMETICS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics", "Festival"), "cosmetics/Festival")
-copy_and_gzip(RACING_COSMETICS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics", "Racing"), "cosmetics/Racing")
-copy_and_gzip(COMPANIONS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics", "Companions"), "cosmetics/Companions")
-copy_and_gzip(LOC_DIRECTORY, os.path.join(os.path.dirname(__file__), "localization"), "localization")
-copy_and_gzip(DISPLAY_ASSETS_DIR, os.path.join(os.path.dirname(__file__), "DAv2"), "DAv2")
-copy_and_gzip(BUNDLE_DISPLAY_ASSETS_DIR, os.path.join(os.path.dirname(__file__), "DA"), "DA (Bundle)", bundle_re)
-copy_and_gzip(WEAPON_DEFINITIONS_DIR, os.path.join(os.path.dirname(__file__), "cosmetics/Weapons"), "cosmetics/Weapons")
-copy_and_gzip(BANNER_ICONS_DIR, os.path.join(os.path.dirname(__file__), "banners"), "banners")
-copy_and_gzip(COMPANION_FILTER_SET_DIR, os.path.join(os.path.dirname(__file__), "cosmetics", "Companions", "VariantFilterSets"), "cosmetics/Companions/VariantFilterSets")
-print(f"Completed in {time.time() - t0:.2f}s")
+        os.makedirs(os.path.dirname(page_path), exist_ok=True)
+        write_json(page_path, {"version": 1, "files": files}, compress=True, minify=True)
+        pages[page] = {"entry": entry_hash, "files": stats}
+        written += 1
 
-input("\nPress Enter to exit...")
+    removed = 0
+    for root, _, files in os.walk(PAGE_BUNDLE_DIR, topdown=False):
+        for file in files:
+            rel = os.path.relpath(os.path.join(root, file), PAGE_BUNDLE_DIR).replace("\\", "/")
+            if rel.endswith(".json.gz") and rel not in pages:
+                os.remove(os.path.join(root, file))
+                removed += 1
+        if root != PAGE_BUNDLE_DIR and not os.listdir(root):
+            os.rmdir(root)
+
+    write_json(manifest_path, {"version": 1, "pages": pages}, minify=True)
+    print(f"{len(pages)} page bundles in pages/ ({written} written, {len(pages) - written} unchanged, {removed} removed)")
+
+# Index patches - the keyed difference between the previously published
+# index.json.gz and the new one, chained by the files' content hashes so a
+# client holding any recent index can patch its way to the latest. The same
+# difference is written out as a readable summary of the update
+INDEX_PATCH_HISTORY = config.get("index_patch_history", 20)
+
+def get_index_record_keys(index):
+    keys = []
+    seen = {}
+    for entry in index:
+        kind = get_index_record_kind(entry)
+        id_field = {"bundles": "bundle_id", "banners": "banner_id"}.get(kind, "id")
+        key = f"{kind}:{entry.get(id_field) or ''}"
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        keys.append(f"{key}#{occurrence}" if occurrence else key)
+    return keys
+
+def load_published_index():
+    index_path = os.path.join(OUTPUT_DIR, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return None, None
+    try:
+        with open(index_path, "rb") as f:
+            raw = f.read()
+        return get_content_hash(raw), parse_json_bytes(decompress_bytes(raw))
+    except (OSError, ValueError, EOFError, zlib.error):
+        print("The published index.json.gz is unreadable, no index patch this time")
+        return None, None
+
+def build_index_patch(old_index, new_index):
+    old_keys = get_index_record_keys(old_index)
+    new_keys = get_index_record_keys(new_index)
+    old_by_key = dict(zip(old_keys, old_index))
+    new_key_set = set(new_keys)
+
+    # patches only insert, drop and edit records - if the records both indexes
+    # share changed their order, clients have to take the full index
+    if [key for key in old_keys if key in new_key_set] != [key for key in new_keys if key in old_by_key]:
+        return None
+
+    added = []
+    changed = {}
+    for position, (key, entry) in enumerate(zip(new_keys, new_index)):
+        old = old_by_key.get(key)
+        if old is None:
+            added.append([position, entry])
+            continue
+        if old == entry:
+            continue
+        change = {}
+        set_fields = {field: value for field, value in entry.items() if field not in old or old[field] != value}
+        unset_fields = sorted(field for field in old if field not in entry)
+        if set_fields:
+            change["set"] = set_fields
+        if unset_fields:
+            change["unset"] = unset_fields
+        changed[key] = change
+
+    return {
+        "removed": [key for key in old_keys if key not in new_key_set],
+        "added": added,
+        "changed": changed
+    }
+
+def describe_index_record(entry):
+    name = entry.get("name") or entry.get("bundle_name") or entry.get("banner_icon") or ""
+    record_id = entry.get("id") or entry.get("bundle_id") or entry.get("banner_id") or ""
+    return f"{name} ({record_id})" if name else record_id
+
+def build_index_update_summary(old_index, new_index, patch):
+    def get_section(entry):
+        kind = get_index_record_kind(entry)
+        if kind == "cosmetics":
+            path = entry.get("path", "")
+            return path.split("/")[0] if "/" in path else "Other"
+        return kind
+
+    old_by_key = dict(zip(get_index_record_keys(old_index), old_index))
+    new_by_key = dict(zip(get_index_record_keys(new_index), new_index))
+    lines = [f"index.json: {len(patch['added'])} added, {len(patch['removed'])} removed, {len(patch['changed'])} changed"]
+    for title, entries in (("Added", [entry for _, entry in patch["added"]]),
+                           ("Removed", [old_by_key[key] for key in patch["removed"]])):
+        if not entries:
+            continue
+        lines.append("")
+        lines.append(f"{title}:")
+        sections = {}
+        for entry in entries:
+            sections.setdefault(get_section(entry), []).append(describe_index_record(entry))
+        for section, names in sorted(sections.items()):
+            lines.append(f"  {section} ({len(names)}): " + ", ".join(names))
+    if patch["changed"]:
+        lines.append("")
+        lines.append("Changed:")
+        for key, change in patch["changed"].items():
+            fields = sorted(list(change.get("set", {})) + change.get("unset", []))
+            lines.append(f"  {describe_index_record(new_by_key[key])}: {', '.join(fields)}")
+    return "\n".join(lines) + "\n"
+
+def write_index_patch(old_hash, old_index, new_index):
+    with open(os.path.join(OUTPUT_DIR, INDEX_FILE), "rb") as f:
+        new_hash = get_content_hash(f.read())
+
+    patch_dir = os.path.join(OUTPUT_DIR, INDEX_PATCH_DIR)
+    chain_path = os.path.join(patch_dir, "chain.json")
+    chain = {"version": 1, "latest": new_hash, "patches": []}
+    if os.path.exists(chain_path):
+        with open(chain_path, "r", encoding="utf-8") as f:
+            chain["patches"] = json.load(f).get("patches", [])
+
+    if old_index is None or old_hash == new_hash:
+        if old_index is not None:
+            print("index.json.gz is unchanged, no index patch needed")
+        os.makedirs(patch_dir, exist_ok=True)
+        write_json(chain_path, chain)
+        return
+
+    patch = build_index_patch(old_index, new_index)
+    os.makedirs(patch_dir, exist_ok=True)
+    if patch is None:
+        print("index.json.gz records were reordered, index patch chain restarted")
+        chain["patches"] = []
+    else:
+        patch_file = f"{old_hash}-{new_hash}.json.gz"
+        write_json(os.path.join(patch_dir, patch_file), {"version": 1, "from": old_hash, "to": new_hash, **patch},
+                   compress=True, sort_keys=True, minify=True)
+        chain["patches"].append({
+            "from": old_hash,
+            "to": new_hash,
+            "path": f"{INDEX_PATCH_DIR}/{patch_file}",
+            "size": os.path.getsize(os.path.join(patch_dir, patch_file))
+        })
+        chain["patches"] = chain["patches"][-INDEX_PATCH_HISTORY:]
+
+        summary = build_index_update_summary(old_index, new_index, patch)
+        with open(os.path.join(patch_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+        print(summary.splitlines()[0] + f" (patch {chain['patches'][-1]['size']} bytes, summary in {INDEX_PATCH_DIR}/summary.txt)")
+
+    kept = {os.path.basename(entry["path"]) for entry in chain["patches"]}
+    for file in os.listdir(patch_dir):
+        if file.endswith(".json.gz") and file not in kept:
+            os.remove(os.path.join(patch_dir, file))
+    write_json(chain_path, chain)
+
+# Content manifest - a short content hash for every published data file, so
+# jsondata.js can request versioned URLs and keep decoded files in IndexedDB
+# until their content changes. Hashes are grouped by folder (two levels deep)
+# into manifest/<group>.json.gz and manifest.json only lists each group's
+# hash, so a returning visitor only refetches the groups that changed
+def get_content_hash(raw):
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+def read_content_hash(path):
+    with open(path, "rb") as f:
+        return get_content_hash(f.read())
+
+def get_content_group(logical_path):
+    parts = logical_path.split("/")
+    if len(parts) > 2:
+        return "/".join(parts[:2])
+    if len(parts) == 2:
+        return parts[0]
+    return "_root"
+
+def get_required_content():
+    # the index and the files derived from it are what the tools most need
+    # versioned, so a manifest without them is an error rather than a gap
+    required = [INDEX_FILE, f"{INDEX_SHARD_DIR}/manifest.json", COMPACT_INDEX_FILE, SEARCH_INDEX_FILE,
+                f"{INDEX_PATCH_DIR}/chain.json"]
+    required.extend(f"{RELATION_DIR}/{name}/manifest.json" for name in ("sets", "searchTags", "bundles"))
+    return required
+
+def write_content_manifest():
+    manifest_dir = os.path.join(OUTPUT_DIR, CONTENT_MANIFEST_DIR)
+
+    groups = {}
+    for root, dirs, files in os.walk(OUTPUT_DIR):
+        if root == OUTPUT_DIR:
+            dirs[:] = [d for d in dirs if d != CONTENT_MANIFEST_DIR and not d.startswith((".", "__"))]
+        for file in files:
+            if not file.endswith((".json", ".json.gz")) or file.startswith("mt_") or (root == OUTPUT_DIR and file == CONTENT_MANIFEST_FILE):
+                continue
+            path = os.path.join(root, file)
+            content_hash = get_stored_metadata("content_hash", path)
+            if content_hash is None:
+                content_hash = read_content_hash(path)
+                store_metadata("content_hash", path, content_hash)
+            logical_path = os.path.relpath(path, OUTPUT_DIR).replace("\\", "/")
+            groups.setdefault(get_content_group(logical_path), {})[logical_path] = content_hash
+
+    listed = {logical_path for hashes in groups.values() for logical_path in hashes}
+    missing = [logical_path for logical_path in get_required_content() if logical_path not in listed]
+    if missing:
+        raise FileNotFoundError(f"{CONTENT_MANIFEST_FILE} not written, {', '.join(missing)} missing from {OUTPUT_DIR}")
+
+    written = set()
+    root_manifest = {"version": 1, "groups": {}}
+    for group, hashes in sorted(groups.items()):
+        group_path = os.path.join(manifest_dir, *group.split("/")) + ".json.gz"
+        os.makedirs(os.path.dirname(group_path), exist_ok=True)
+        write_json(group_path, hashes, compress=True, sort_keys=True, minify=True)
+        written.add(group_path)
+        root_manifest["groups"][group] = read_content_hash(group_path)
+
+    for root, _, files in os.walk(manifest_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            if path not in written:
+                os.remove(path)
+
+    write_json(os.path.join(OUTPUT_DIR, CONTENT_MANIFEST_FILE), root_manifest, sort_keys=True)
+    print(f"{CONTENT_MANIFEST_FILE} created with {sum(len(hashes) for hashes in groups.values())} files in {len(groups)} groups")
+
+def main():
+    _PREVIOUS_SOURCES.update(load_build_manifest())
+    load_pack_indexes()
+    build_file_catalog()
+    open_metadata_store()
+    if not PROJECT_PAYLOADS:
+        _PROJECTED_BEFORE.update(get_stored_paths("projection"))
+
+    index = build_index(COSMETICS_DIRS)
+    jido_map = build_jido_map(FIGURE_COSMETICS_DIR)
+    bean_map = build_bean_map(DT_BEAN_MAP_FILE, NEW_BEANSTALK_DEF_DIR)
+    sets_map, localized_sets_map = build_sets_maps(SETS_JSON_FILE)
+    tags = get_search_tags(SEARCH_TAGS_JSON_FILE)
+    companion_style_index = build_companion_style_index()
+
+    display_assets_files = {}
+    for info in catalog_files(DISPLAY_ASSETS_DIR):
+        if info.name.endswith(".json"):
+            rel_path = os.path.relpath(info.path, DISPLAY_ASSETS_DIR).replace("\\", "/")
+            display_assets_files.setdefault(info.name, []).append(rel_path)
+
+    for entry in index:
+        cid = entry["id"]
+        if cid in jido_map:
+            entry["jido"] = jido_map[cid]
+        if cid in bean_map:
+            entry["beanid"] = bean_map[cid]
+
+        for key in (f"DAv2_{cid}.json", f"DAv2_{cid.replace('Shoes', 'Shoe')}.json", f"DAv2_{cid.replace('_Athena_Commando', '')}.json"):
+            if key in display_assets_files:
+                entry["dav2"] = f"DAv2/{display_assets_files[key][0]}"
+                break
+
+    index = build_bundle_index(index)
+    index = build_banner_index(index)
+
+    published_hash, published_index = load_published_index()
+    write_json(os.path.join(OUTPUT_DIR, INDEX_FILE), index, compress=True, sort_keys=True, codec=get_codec("index"))
+    write_index_patch(published_hash, published_index, index)
+    write_index_shards(index)
+    write_compact_index(index)
+    write_search_index(index)
+    write_relations(index)
+
+    print(f"index.json.gz created with {len(index)} entries. "
+              f"{len(jido_map)} have JIDO values, "
+              f"{len(bean_map)} have BeanID values.")
+
+    write_json(os.path.join(OUTPUT_DIR, "CosmeticSets.json"), sets_map)
+
+    print(f"CosmeticSets.json created with {len(sets_map)} sets.")
+
+    write_json(os.path.join(OUTPUT_DIR, "CosmeticSetLocalizations.json"), localized_sets_map)
+
+    print(f"CosmeticSetLocalizations.json created with {len(localized_sets_map)} sets.")
+
+    write_json(os.path.join(OUTPUT_DIR, "CosmeticSearchTags.json"), tags)
+
+    print(f"CosmeticSearchTags.json created with {len(tags)} tags.")
+
+    write_json(os.path.join(OUTPUT_DIR, "CompanionStyleVariantTokens.json"), companion_style_index)
+
+    print(f"CompanionStyleVariantTokens.json created with {len(companion_style_index)} VTIDs.")
+
+    # Move and compress SPARKS_LOC_DIRECTORY
+    if os.path.exists(SPARKS_LOC_DIRECTORY):
+        mirror_directory(SPARKS_LOC_DIRECTORY, os.path.join(os.path.join(OUTPUT_DIR, "localization"), "SparksCosmetics"), "Sparks localization JSON files from SPARKS_LOC_DIRECTORY", "localization")
+
+    # Move and compress RACING_LOC_DIRECTORY
+    if os.path.exists(RACING_LOC_DIRECTORY):
+        mirror_directory(RACING_LOC_DIRECTORY, os.path.join(os.path.join(OUTPUT_DIR, "localization"), "VehicleCosmetics"), "Racing localization JSON files from RACING_LOC_DIRECTORY", "localization")
+
+    if os.path.exists(CHARACTER_COLOR_SWATCHES_DIR):
+        mirror_directory(CHARACTER_COLOR_SWATCHES_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Characters", "ColorSwatches"), "Character ColorSwatches", "variants")
+
+    move_and_compress_lego()
+
+    build_jbpid_index()
+    build_prop_indexes()
+
+    move_and_compress_companion_colors_and_materials(COMPANION_COLORS_AND_MATERIALS_DIRS)
+
+    copy_and_gzip(BR_COSMETICS_DIR, os.path.join(OUTPUT_DIR, "cosmetics"), "cosmetics", family="items")
+    copy_and_gzip(OLD_BR_COSMETICS_DIR, os.path.join(OUTPUT_DIR, "cosmetics"), "cosmetics (old FortniteGame/Content/Athena/Items/Cosmetics folder)", family="items")
+    copy_and_gzip(KICKS_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Shoes"), "cosmetics/Shoes", family="items")
+    copy_and_gzip(FESTIVAL_COSMETICS_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Festival"), "cosmetics/Festival", family="items")
+    copy_and_gzip(RACING_COSMETICS_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Racing"), "cosmetics/Racing", family="items")
+    copy_and_gzip(COMPANIONS_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Companions"), "cosmetics/Companions", family="items")
+    loc_refs = None
+    if PRUNE_LOCALIZATION:
+        loc_refs = collect_localization_refs()
+        copy_pruned_localization(loc_refs)
+    else:
+        forget_pruned_localization()
+        copy_and_gzip(LOC_DIRECTORY, os.path.join(OUTPUT_DIR, "localization"), "localization", family="localization")
+    culture_files = get_localization_culture_files()
+    loc_key_count = write_localization_routes(culture_files, loc_refs)
+    write_localization_key_shards(culture_files, loc_key_count, loc_refs)
+    copy_and_gzip(DISPLAY_ASSETS_DIR, os.path.join(OUTPUT_DIR, "DAv2"), "DAv2", family="dav2")
+    copy_and_gzip(BUNDLE_DISPLAY_ASSETS_DIR, os.path.join(OUTPUT_DIR, "DA"), "DA (Bundle)", bundle_re, family="da")
+    copy_and_gzip(WEAPON_DEFINITIONS_DIR, os.path.join(OUTPUT_DIR, "cosmetics/Weapons"), "cosmetics/Weapons", family="weapons")
+    copy_and_gzip(BANNER_ICONS_DIR, os.path.join(OUTPUT_DIR, "banners"), "banners", family="banners")
+    copy_and_gzip(COMPANION_FILTER_SET_DIR, os.path.join(OUTPUT_DIR, "cosmetics", "Companions", "VariantFilterSets"), "cosmetics/Companions/VariantFilterSets", family="variants")
+
+    shutdown_workers()
+    save_build_manifest()
+    write_packs()
+    write_page_bundles(index)
+    write_content_manifest()
+    close_metadata_store()
+    print_json_cache_stats()
+    print_projection_report()
+    print_compression_report()
+    print(f"Completed in {time.time() - t0:.2f}s")
+
+    if config.get("pause_on_exit", True):
+        input("\nPress Enter to exit...")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,486 @@
+# Benchmark for dataSetup.py - generates a synthetic FModel export with the
+# same layout dataSetup.py reads (cosmetics, display assets, localization,
+# Juno, companions, the Bean DataTable...), runs the whole pipeline on it in a
+# temporary folder without any prompts, and reports wall time, peak RSS,
+# files/sec and bytes written for every stage.
+#
+#   python dataSetupBenchmark.py --scale 4 --runs 3 --config '{"pack_outputs": true}'
+#
+# The first run is a cold build, later runs are incremental after --touch of
+# the cosmetics were edited. Nothing is written outside the temporary folder.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import importlib
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCHMARK_RESULTS_FILE = "mt_benchmark.json"
+
+# dataSetup.py functions main() calls, timed one by one. Calls made from inside
+# another timed stage are counted in that stage. main()'s own write_json calls
+# are a handful of small files, so they fall under "(not in a stage)"
+STAGES = [
+    "load_build_manifest", "build_file_catalog", "open_metadata_store", "build_index", "build_jido_map",
+    "build_bean_map", "build_sets_maps", "get_search_tags", "build_companion_style_index",
+    "build_bundle_index", "build_banner_index", "load_published_index", "write_index_patch",
+    "write_index_shards", "write_compact_index", "write_search_index", "write_relations", "mirror_directory",
+    "move_and_compress_lego", "build_jbpid_index", "build_prop_indexes",
+    "move_and_compress_companion_colors_and_materials", "copy_and_gzip", "collect_localization_refs",
+    "copy_pruned_localization", "forget_pruned_localization", "write_localization_routes",
+    "write_localization_key_shards", "shutdown_workers", "save_build_manifest", "write_packs",
+    "write_page_bundles", "write_content_manifest", "close_metadata_store"
+]
+
+# Synthetic export
+
+COSMETIC_CATEGORIES = [
+    ("Characters", "AthenaCharacterItemDefinition", "CID"),
+    ("Backpacks", "AthenaBackpackItemDefinition", "BID"),
+    ("Pickaxes", "AthenaPickaxeItemDefinition", "Pickaxe_ID"),
+    ("Dances", "AthenaDanceItemDefinition", "EID"),
+    ("Gliders", "AthenaGliderItemDefinition", "Glider_ID"),
+    ("ItemWraps", "AthenaItemWrapDefinition", "Wrap"),
+    ("LoadingScreens", "AthenaLoadingScreenItemDefinition", "LSID"),
+    ("MusicPacks", "AthenaMusicPackItemDefinition", "MusicPack"),
+    ("Contrails", "AthenaSkyDiveContrailItemDefinition", "Trails"),
+    ("Sprays", "AthenaSprayItemDefinition", "SPID"),
+    ("Pets", "AthenaPetCarrierItemDefinition", "PetCarrier"),
+    ("Toys", "AthenaToyItemDefinition", "Toy")
+]
+FESTIVAL_INSTRUMENTS = ["Bass", "Drum", "Guitar", "Keyboard", "Mic"]
+CULTURES = ["ar", "de", "en", "es", "fr", "ja", "pt-BR", "zh-Hans"]
+
+def dump(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def localized(rng, text, namespace=""):
+    key = "".join(rng.choice("0123456789ABCDEF") for _ in range(32))
+    return {"Namespace": namespace, "Key": key, "SourceString": text, "LocalizedString": text}
+
+def item_definition(rng, item_type, name, package, sets, extra_props=None, extra_data=None, default=False):
+    tags = ["Cosmetics.Source.ItemShop"]
+    if default:
+        tags.append("Cosmetics.Source.DefaultItem")
+    if sets and rng.random() < 0.6:
+        tags.append("Cosmetics.Set." + rng.choice(sets))
+    props = {
+        "ItemName": localized(rng, name.split("_")[-1] + " Name"),
+        "ItemDescription": localized(rng, "Description of " + name),
+        "ItemShortDescription": localized(rng, item_type),
+        "Rarity": rng.choice(["EFortRarity::Uncommon", "EFortRarity::Rare", "EFortRarity::Epic", "EFortRarity::Legendary"]),
+        "DataList": [
+            {"MinLevel": 1, "MaxLevel": 1},
+            {"Icon": {"AssetPathName": f"/BRCosmetics/Athena/UI/Icons/T-{name}.T-{name}", "SubPathString": ""}},
+            {"Tags": tags}
+        ]
+    }
+    if rng.random() < 0.8:
+        props["DataList"].append({"GeneratedTagsIndexes": rng.sample(range(3000), rng.randint(3, 30))})
+    if extra_data:
+        props["DataList"].extend(extra_data)
+    if extra_props:
+        props.update(extra_props)
+    return [{"Type": item_type, "Name": name, "Flags": "RF_Public", "Class": f"UScriptClass'{item_type}'",
+             "Package": package, "Properties": props}]
+
+def other_asset(rng, name):
+    # the meshes, materials and animations the cosmetic folders are mostly made of
+    asset_type = rng.choice(["MaterialInstanceConstant", "SkeletalMesh", "AnimSequence", "Texture2D"])
+    return [{"Type": asset_type, "Name": name, "Properties": {"Values": [rng.random() for _ in range(rng.randint(5, 60))]}}]
+
+def generate_export(ds, scale, seed):
+    # writes under the folders dataSetup.py resolved from its config, returns
+    # the paths written
+    rng = random.Random(seed)
+    count = lambda n: max(1, int(n * scale))
+    sets = [f"Set{i:03d}" for i in range(count(40))]
+    loc_keys = {}
+    written = []
+
+    def write(path, data):
+        dump(path, data)
+        written.append(path)
+
+    cids = []
+    for category, item_type, prefix in COSMETIC_CATEGORIES:
+        for i in range(count(60)):
+            name = f"{prefix}_{i:03d}_Synth{category}"
+            extra = None
+            if item_type == "AthenaPickaxeItemDefinition":
+                extra = {"WeaponDefinition": {"ObjectName": f"AthenaWeaponItemDefinition'WID_{name}'",
+                                              "ObjectPath": f"/BRCosmetics/Athena/Items/Weapons/Pickaxes/WID_{name}.0"}}
+                write(os.path.join(ds.WEAPON_DEFINITIONS_DIR, "Pickaxes", f"WID_{name}.json"),
+                      [{"Type": "AthenaWeaponItemDefinition", "Name": f"WID_{name}",
+                        "Properties": {"WeaponStatHandle": {"RowName": "Pickaxe"}}}])
+            data = item_definition(rng, item_type, name, f"/BRCosmetics/Athena/Items/Cosmetics/{category}/{name}",
+                                   sets, extra, default=(i == 0))
+            write(os.path.join(ds.BR_COSMETICS_DIR, category, name + ".json"), data)
+            for field in ("ItemName", "ItemDescription"):
+                loc_keys[data[0]["Properties"][field]["Key"]] = data[0]["Properties"][field]["SourceString"]
+            if item_type == "AthenaCharacterItemDefinition":
+                cids.append(name)
+        for i in range(count(120)):
+            write(os.path.join(ds.BR_COSMETICS_DIR, category, "Meshes", f"M_{category}_{i}.json"), other_asset(rng, f"M_{category}_{i}"))
+        # folders dataSetup.py skips
+        write(os.path.join(ds.BR_COSMETICS_DIR, category, "Archive", f"{prefix}_Old.json"), item_definition(rng, item_type, f"{prefix}_Old", "", sets))
+        write(os.path.join(ds.BR_COSMETICS_DIR, category, "Tandem", f"{prefix}_Tandem.json"), item_definition(rng, item_type, f"{prefix}_Tandem", "", sets))
+
+    for i in range(count(20)):
+        write(os.path.join(ds.CHARACTER_COLOR_SWATCHES_DIR, f"CS_Char_{i}.json"),
+              [{"Type": "FortColorSwatch", "Name": f"CS_Char_{i}", "Properties": {"ColorPairs": [{"ColorName": "A", "ColorValue": {"R": rng.random()}}]}}])
+
+    for i in range(count(30)):
+        name = f"EID_{i:03d}_OldSynth"
+        write(os.path.join(ds.OLD_BR_COSMETICS_DIR, "Dances", name + ".json"), item_definition(rng, "AthenaDanceItemDefinition", name, "", sets))
+    rows = {s: {"DisplayName": localized(rng, f"{s} Set", "CosmeticSets"), "Tag": "Cosmetics.Set." + s} for s in sets}
+    for row in rows.values():
+        loc_keys[row["DisplayName"]["Key"]] = row["DisplayName"]["SourceString"]
+    write(ds.SETS_JSON_FILE, [{"Type": "DataTable", "Name": "CosmeticSets", "Rows": rows}])
+    write(ds.SEARCH_TAGS_JSON_FILE, [{"Type": "FortSearchTagData", "Properties": {
+        "LocalizedTags": [localized(rng, f"tag{i}") for i in range(count(300))]}}])
+
+    for i in range(count(30)):
+        name = f"Shoes_{i:03d}_Synth"
+        write(os.path.join(ds.KICKS_DIR, name + ".json"), item_definition(rng, "CosmeticShoesItemDefinition", name, "", sets))
+
+    for instrument in FESTIVAL_INSTRUMENTS:
+        for i in range(count(20)):
+            name = f"Sparks_{instrument}_{i:03d}"
+            write(os.path.join(ds.FESTIVAL_COSMETICS_DIR, "Cosmetics", instrument, name + ".json"),
+                  item_definition(rng, f"Sparks{instrument}ItemDefinition", name, "", sets))
+    for i in range(count(40)):
+        write(os.path.join(ds.FESTIVAL_COSMETICS_DIR, "Meshes", f"SM_Sparks_{i}.json"), other_asset(rng, f"SM_Sparks_{i}"))
+
+    for i in range(count(20)):
+        body = f"Body_{i:03d}"
+        write(os.path.join(ds.RACING_COSMETICS_DIR, "Bodies", body + ".json"),
+              item_definition(rng, "FortVehicleCosmeticsItemDefinition_Body", body, "", sets,
+                              extra_data=[{"Tags": [f"VehicleCosmetics.Body.Car{i}"]}]))
+        skin = f"Skin_{i:03d}"
+        write(os.path.join(ds.RACING_COSMETICS_DIR, "Skins", skin + ".json"),
+              item_definition(rng, "FortVehicleCosmeticsItemDefinition_Skin", skin, "", sets, extra_props={
+                  "RestrictionDefinitions": [{"RequiredTagQuery": {"TagDictionary": [{"TagName": f"VehicleCosmetics.Body.Car{i}"}]}}]}))
+
+    for i in range(count(25)):
+        name = f"Companion_Synth{i:03d}"
+        data = item_definition(rng, "CosmeticCompanionItemDefinition", name, "", sets)
+        options = [{
+            "ContextualAnimSceneEmote": {"AssetPathName": "" if j == 2 else f"/CosmeticCompanions/Emotes/E_{i}_{j}.E_{i}_{j}"},
+            "VariantName": localized(rng, f"Emote {i}-{j}"),
+            "CustomizationVariantTag": {"TagName": f"Companion.Variant.{i}.Emote{j}"}
+        } for j in range(3)]
+        data.append({"Type": "FortCosmeticContextualAnimSceneEmoteVariant", "Name": "EmoteVariant",
+                     "Properties": {"ContextualAnimSceneEmoteOptions": options}})
+        write(os.path.join(ds.COMPANIONS_DIR, name + ".json"), data)
+        for j in range(4):
+            tag = f"Companion.Variant.{i}.Emote{j}" if j < 3 else f"Companion.Variant.{i}.Style{j}"
+            write(os.path.join(ds.COMPANION_VARIANT_TOKENS_DIR, f"VTID_{name}_{j}.json"), [{
+                "Type": "FortVariantTokenType", "Name": f"VTID_{name}_{j}",
+                "Properties": {
+                    "cosmetic_item": {"ObjectName": f"CosmeticCompanionItemDefinition'{name}'",
+                                      "ObjectPath": f"/CosmeticCompanions/Assets/Items/{name}.0"},
+                    "VariantChannelTag": {"TagName": "Cosmetics.Variant.Channel.Style"},
+                    "VariantNameTag": {"TagName": tag},
+                    "ItemName": localized(rng, f"Token {i}-{j}"),
+                    "ItemShortDescription": localized(rng, "Style" if j == 3 else "Emote")
+                }
+            }])
+    for companion_root in ds.COMPANION_COLORS_AND_MATERIALS_DIRS:
+        group = os.path.basename(companion_root)
+        for i in range(count(5)):
+            folder = os.path.join(companion_root, f"Companion{i}")
+            write(os.path.join(folder, "ColorSwatches", f"CS_{group}_{i}.json"), [{"Type": "FortColorSwatch", "Name": f"CS_{group}_{i}"}])
+            # one of the misspelt folder names dataSetup.py treats as MaterialParameterSets
+            write(os.path.join(folder, "MPS" if i % 2 else "MaterialParameterSets", f"MPS_{group}_{i}.json"),
+                  [{"Type": "FortCosmeticMaterialParameterSet", "Name": f"MPS_{group}_{i}"}])
+            write(os.path.join(folder, "Meshes", f"SK_{group}_{i}.json"), other_asset(rng, f"SK_{group}_{i}"))
+    for i in range(count(5)):
+        write(os.path.join(ds.COMPANION_FILTER_SET_DIR, f"VFS_{i}.json"), [{"Type": "FortVariantFilterSet", "Name": f"VFS_{i}"}])
+
+    for cid in cids[:len(cids) // 2]:
+        write(os.path.join(ds.FIGURE_COSMETICS_DIR, "Characters", f"JIDO_{cid}.json"), [{
+            "Type": "JunoAthenaCharacterItemOverrideDefinition", "Name": f"JIDO_{cid}",
+            "Properties": {"BaseAthenaCharacterItemDefinition": {"AssetPathName": f"/BRCosmetics/Athena/Items/Cosmetics/Characters/{cid}.{cid}"}}
+        }])
+    for i in range(count(40)):
+        write(os.path.join(ds.JUNO_DIR, "BuildingProps", f"JBPID_Synth{i:03d}.json"), [{
+            "Type": "JunoBuildingPropAccountItemDefinition", "Name": f"JBPID_Synth{i:03d}",
+            "Properties": {"ItemName": localized(rng, f"Prop {i}"), "DataList": [{"Tags": [f"Juno.Prop.{i}"]}]}
+        }])
+    for i in range(count(4)):
+        formulas = {f"Row{i}_{j}": {
+            "DisplayName": localized(rng, f"Formula {i}-{j}"),
+            "AttributeTags": ["Juno.AccountItems.Unlock.BuildingProp.Synth" if j % 2 else "Juno.Other"],
+            "RequiredIngredients": [{"IngredientTags": [f"Juno.Ingredient.{j}"], "Count": j + 1}]
+        } for j in range(count(20))}
+        write(os.path.join(ds.JUNO_DIR, "Crafting", f"Set{i}_CraftingFormulas.json"),
+              [{"Type": "DataTable", "Name": f"Set{i}_CraftingFormulas", "Rows": formulas}])
+
+    write(ds.DT_BEAN_MAP_FILE, [{"Type": "DataTable", "Rows": {
+        cid: {"Definition": {"AssetPathName": f"/BeanstalkCosmetics/Cosmetics/BeanCID_{cid}.BeanCID_{cid}"}} for cid in cids[::3]
+    }}])
+    for cid in cids[1::3]:
+        write(os.path.join(ds.NEW_BEANSTALK_DEF_DIR, f"BIDO_{cid}.json"), [{
+            "Type": "BeanAthenaCharacterItemDefinitionOverride", "Name": f"BIDO_{cid}",
+            "Properties": {
+                "BaseAthenaCharacterItemDefinition": {"AssetPathName": f"/BRCosmetics/Athena/Items/Cosmetics/Characters/{cid}.{cid}"},
+                "BeanAthenaCharacterItemDefinitionOverride": {"AssetPathName": f"/BeanstalkCosmetics/Cosmetics/BeanNew_{cid}.BeanNew_{cid}"}
+            }
+        }])
+
+    for cid in cids:
+        write(os.path.join(ds.DISPLAY_ASSETS_DIR, "Characters", f"DAv2_{cid}.json"), [{
+            "Type": "AthenaItemShopOfferDisplayData", "Name": f"DAv2_{cid}",
+            "Properties": {"ContextualPresentations": [{"RenderImage": {"AssetPathName": f"/OfferCatalog/Textures/T_{cid}.T_{cid}"}}]}
+        }])
+    for i, cid in enumerate(cids[:count(30)]):
+        short = cid.split("_", 1)[-1]
+        write(os.path.join(ds.BUNDLE_DISPLAY_ASSETS_DIR, f"DA_Character_{short}.json"), [{
+            "Type": "FortMtxOfferData", "Name": f"DA_Character_{short}", "Properties": {"DisplayName": localized(rng, f"Bundle {short}")}
+        }])
+        if i % 3 == 0:
+            write(os.path.join(ds.DISPLAY_ASSETS_DIR, "Bundles", f"DAv2_Bundle_Featured_DA_Character_{short}.json"),
+                  [{"Type": "AthenaItemShopOfferDisplayData", "Name": f"DAv2_Bundle_Featured_DA_Character_{short}", "Properties": {}}])
+    for i in range(count(10)):
+        write(os.path.join(ds.BUNDLE_DISPLAY_ASSETS_DIR, f"DA_Featured_Pack{i}_Bundle.json"), [{
+            "Type": "FortMtxOfferData", "Name": f"DA_Featured_Pack{i}_Bundle", "Properties": {"DisplayName": localized(rng, f"Pack {i}")}
+        }])
+        write(os.path.join(ds.BUNDLE_DISPLAY_ASSETS_DIR, f"DA_Random_{i}.json"), [{"Type": "FortMtxOfferData", "Name": f"DA_Random_{i}", "Properties": {}}])
+
+    for i in range(count(30)):
+        icon = {"LargeIcon": {"AssetPathName": f"/BRCosmetics/UI/Banners/T_Banner{i}-L.T_Banner{i}-L"}} if i % 2 else \
+            {"Icon": {"AssetPathName": f"/BRCosmetics/UI/Banners/T_Banner{i}.T_Banner{i}"}}
+        write(os.path.join(ds.BANNER_ICONS_DIR, f"BRS_Synth{i}.json"), [{
+            "Type": "FortHomebaseBannerIconItemDefinition", "Name": f"BRS_Synth{i}",
+            "Properties": {"ItemName": localized(rng, "Banner Icon", "FortHomebaseTypes:BannerIcons"),
+                           "DataList": [icon, {"Tags": ["Cosmetics.Set." + rng.choice(sets)] if i % 3 else []}]}
+        }])
+
+    key_items = sorted(loc_keys.items())
+    chunks = ["Fortnite"] + [f"Fortnite_locchunk{c}" for c in range(10, 10 + count(6))]
+    for chunk_index, chunk in enumerate(chunks):
+        write(os.path.join(ds.LOC_DIRECTORY, chunk, chunk + ".json"),
+              {"NativeCulture": "en", "NativeLocRes": f"en/{chunk}.locres", "CompiledCultures": CULTURES, "bIsUGC": False})
+        chunk_keys = key_items[chunk_index::len(chunks)]
+        unused = [(localized(rng, "")["Key"], f"Unused string {chunk_index}-{j}") for j in range(count(200))]
+        for culture in CULTURES:
+            write(os.path.join(ds.LOC_DIRECTORY, chunk, culture, chunk + ".json"), {
+                "": {key: f"[{culture}] {text}" for key, text in chunk_keys + unused},
+                "CosmeticSets": {key: f"[{culture}] {text}" for key, text in chunk_keys if text.endswith(" Set")}
+            })
+    for directory in (ds.SPARKS_LOC_DIRECTORY, ds.RACING_LOC_DIRECTORY):
+        chunk = os.path.basename(directory)
+        write(os.path.join(directory, chunk + ".json"), {"NativeCulture": "en", "CompiledCultures": CULTURES})
+        for culture in CULTURES:
+            write(os.path.join(directory, culture, chunk + ".json"),
+                  {"": {localized(rng, "")["Key"]: f"{chunk} {culture} {j}" for j in range(count(30))}})
+    return written
+
+def touch_export(paths, fraction, seed):
+    # edits a share of the cosmetic definitions the way a game update would
+    rng = random.Random(seed)
+    candidates = sorted(path for path in paths if "Synth" in os.path.basename(path) and os.sep + "Meshes" + os.sep not in path)
+    touched = rng.sample(candidates, min(len(candidates), int(len(candidates) * fraction)))
+    for path in touched:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        properties = data[0].setdefault("Properties", {})
+        properties["BenchmarkRevision"] = properties.get("BenchmarkRevision", 0) + 1
+        dump(path, data)
+    return len(touched)
+
+# Instrumented run - runs in a fresh process per build, so dataSetup.py's
+# module state and the peak RSS belong to that build alone
+
+def get_peak_rss(children=False):
+    if resource is None:
+        return 0
+    # kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def snapshot(root):
+    files = {}
+    for current, dirs, names in os.walk(root):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        for name in names:
+            path = os.path.join(current, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files[path] = (st.st_size, st.st_mtime_ns)
+    return files
+
+def get_stage_label(name, args):
+    if name in ("copy_and_gzip", "mirror_directory") and len(args) > 2:
+        return f"{name} {args[2]}"
+    return name
+
+def run_instrumented(results_path):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    ds = importlib.import_module("dataSetup")
+    output_dir = ds.OUTPUT_DIR
+    stages = []
+    state = {"depth": 0, "files": snapshot(output_dir), "overhead": 0.0, "outsideFiles": 0, "outsideBytes": 0}
+
+    def take_snapshot():
+        # files written since the last snapshot. The walk itself is taken off
+        # the wall time
+        start = time.perf_counter()
+        before, after = state["files"], snapshot(output_dir)
+        state["files"] = after
+        written = [path for path, stat in after.items() if before.get(path) != stat]
+        state["overhead"] += time.perf_counter() - start
+        return len(written), sum(after[path][0] for path in written)
+
+    def count_outside_writes():
+        files, size = take_snapshot()
+        state["outsideFiles"] += files
+        state["outsideBytes"] += size
+
+    def instrument(name, function):
+        def timed(*args, **kwargs):
+            if state["depth"]:
+                return function(*args, **kwargs)
+            count_outside_writes()
+            state["depth"] += 1
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                state["depth"] -= 1
+                files, size = take_snapshot()
+                stages.append({
+                    "stage": get_stage_label(name, args),
+                    "seconds": seconds,
+                    "files": files,
+                    "bytes": size,
+                    "peakRss": get_peak_rss()
+                })
+        return timed
+
+    for name in STAGES:
+        setattr(ds, name, instrument(name, getattr(ds, name)))
+
+    start = time.perf_counter()
+    ds.main()
+    wall = time.perf_counter() - start
+    count_outside_writes()
+
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "wall": wall - state["overhead"],
+            "peakRss": get_peak_rss(),
+            "workerPeakRss": get_peak_rss(children=True),
+            "stages": stages,
+            "outside": {"files": state["outsideFiles"], "bytes": state["outsideBytes"]}
+        }, f, indent=2)
+
+# Report
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+def print_run(label, result):
+    print(f"\n{label}: {result['wall']:.2f}s wall, peak RSS {format_bytes(result['peakRss'])} "
+          f"(workers {format_bytes(result['workerPeakRss'])})")
+    print(f"  {'stage':<64} {'seconds':>8} {'files':>7} {'files/s':>9} {'written':>10} {'peak RSS':>10}")
+    timed = 0.0
+    for stage in result["stages"]:
+        timed += stage["seconds"]
+        rate = f"{stage['files'] / stage['seconds']:.0f}" if stage["files"] and stage["seconds"] > 0 else "-"
+        print(f"  {stage['stage'][:64]:<64} {stage['seconds']:>8.3f} {stage['files']:>7} {rate:>9} "
+              f"{format_bytes(stage['bytes']):>10} {format_bytes(stage['peakRss']):>10}")
+    outside = result["outside"]
+    print(f"  {'(not in a stage)':<64} {result['wall'] - timed:>8.3f} {outside['files']:>7} {'-':>9} "
+          f"{format_bytes(outside['bytes']):>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dataSetup.py on a synthetic FModel export")
+    parser.add_argument("--scale", type=float, default=1.0, help="size of the export, 1 is about 3000 asset files")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=2, help="builds to time, the first one cold")
+    parser.add_argument("--touch", type=float, default=0.01, help="share of the cosmetics edited before each later build")
+    parser.add_argument("--config", default="{}", help="extra mt_config.json options as JSON")
+    parser.add_argument("--workdir", help="folder to use instead of a new temporary one")
+    parser.add_argument("--keep", action="store_true", help="keep the export and outputs afterwards")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="show dataSetup.py's own output")
+    parser.add_argument("--instrumented-run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.instrumented_run:
+        run_instrumented(args.instrumented_run)
+        return
+
+    output_file = os.path.abspath(args.output) if args.output else None
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="dataSetup-benchmark-"))
+    export_dir = os.path.join(workdir, "export")
+    output_dir = os.path.join(workdir, "data")
+    os.makedirs(output_dir, exist_ok=True)
+    config = {"fmodel_exports_dir": export_dir, "output_dir": output_dir, "pause_on_exit": False}
+    config.update(json.loads(args.config))
+    with open(os.path.join(output_dir, "mt_config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+
+    # dataSetup.py reads its config from the working directory, so the export
+    # lands exactly where its constants point
+    os.chdir(output_dir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    ds = importlib.import_module("dataSetup")
+    start = time.perf_counter()
+    export_files = generate_export(ds, args.scale, args.seed)
+    export_bytes = sum(os.path.getsize(path) for path in export_files)
+    print(f"Generated {len(export_files)} export files ({format_bytes(export_bytes)}) in "
+          f"{time.perf_counter() - start:.2f}s under {export_dir}")
+
+    results = {"scale": args.scale, "seed": args.seed, "config": config,
+               "export": {"files": len(export_files), "bytes": export_bytes}, "runs": []}
+    try:
+        for run in range(args.runs):
+            touched = touch_export(export_files, args.touch, args.seed + run) if run else 0
+            results_path = os.path.join(workdir, BENCHMARK_RESULTS_FILE)
+            log_path = os.path.join(workdir, f"run{run + 1}.log")
+            with open(log_path, "w", encoding="utf-8") as log:
+                process = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--instrumented-run", results_path],
+                    cwd=output_dir, stdin=subprocess.DEVNULL,
+                    stdout=None if args.verbose else log, stderr=subprocess.STDOUT
+                )
+            if process.returncode:
+                print(f"Run {run + 1} failed" + ("" if args.verbose else f", see {log_path}"))
+                sys.exit(process.returncode)
+            with open(results_path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            result["touched"] = touched
+            results["runs"].append(result)
+            print_run(f"Run {run + 1} ({f'incremental, {touched} files edited' if run else 'cold'})", result)
+    finally:
+        if output_file:
+            with open(output_file, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        os.chdir(os.path.dirname(workdir))
+        if args.keep or args.workdir:
+            print(f"\nExport and outputs kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import { loadGzJson } from '../../../tools/jsondata.js';
+import { loadGzJson, loadRelation } from '../../../tools/jsondata.js';
 import { TYPE_MAP, INSTRUMENTS_TYPE_MAP, SERIES_CONVERSION, characterBundlePattern, lockerBundlePattern, articleFor, forceTitleCase, getFormattedReleaseDate, getItemShopHistoryDate, getSeasonReleased, ensureVbucksTemplate, getMostUpToDateImage, normalizeCosmeticType, pageExists } from '../../../tools/utils.js';
 import { initSourceReleaseControls, getSourceReleaseSettings } from '../../../tools/source-release.js';
 
@@ -96,11 +96,32 @@ function updateBundleSuggestions() {
 				document.getElementById('locker-bundle-fields').style.display = 'none';
 			}
 			sugDiv.innerHTML = '';
+			await fillBundleCosmetics(entry.bundle_id);
 		};
 		sugDiv.appendChild(div);
 	});
 }
 
+// Fill the cosmetic entries with what relations/bundles resolved for the
+// bundle, unless some have already been picked by hand
+async function fillBundleCosmetics(bundleID) {
+	if (cosmeticsEntries.some(e => e.hiddenId.value)) return;
+	const contents = await loadRelation(DATA_BASE_PATH, 'bundles', bundleID);
+	if (!contents || !contents.cosmetics.length) return;
+
+	while (cosmeticsEntries.length < contents.cosmetics.length) createCosmeticEntry(false);
+	contents.cosmetics.forEach((cosmetic, i) => {
+		const { input, hiddenId, hiddenName } = cosmeticsEntries[i];
+		input.value = `${cosmetic.name} (${cosmetic.id})`;
+		hiddenId.value = cosmetic.id;
+		hiddenName.value = cosmetic.name;
+	});
+
+	if (contents.cosmetics.some(cosmetic => cosmetic.path && cosmetic.path.startsWith('Racing'))) {
+		document.getElementById('rocket-league-field').style.display = 'block';
+	}
+}
+
 // Create a new cosmetic entry DOM and hook up suggestion behavior
 function createCosmeticEntry(focus = true) {
 	const list = document.getElementById('cosmetics-list');
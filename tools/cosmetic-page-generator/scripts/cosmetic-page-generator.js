@@ -1,4 +1,4 @@
-import { loadGzJson } from '../../../tools/jsondata.js';
+import { loadGzJson, loadSearchIndex, loadPageBundle } from '../../../tools/jsondata.js';
 import { TYPE_MAP, INSTRUMENTS_TYPE_MAP, SERIES_CONVERSION, characterBundlePattern, lockerBundlePattern, articleFor, forceTitleCase, getSeasonReleased, getMostUpToDateImage, pageExists, normalizeCosmeticType } from '../../../tools/utils.js';
 import { generateUnlockedParameter, generateCostParameter, generateReleaseParameter, generateArticleIntro } from '../../article-utils.js';
 import { initSourceReleaseControls, getSourceReleaseSettings, validateSourceSettings } from '../../../tools/source-release.js';
@@ -52,14 +52,19 @@ async function loadJamTrackNames() {
 	jamTrackNames = Object.values(jamTrackData);
 }
 
-function updateSuggestions() {
-	const input = document.getElementById("cosmetic-display").value.trim().toLowerCase();
-	const sugDiv = document.getElementById("suggestions");
-	sugDiv.innerHTML = "";
-	if (!input) return;
+let searchIndex = null;
+let searchIndexRequested = false;
 
-	if (!Array.isArray(index) || index.length === 0) return;
+// search.json.gz is only fetched once someone starts typing
+function requestSearchIndex() {
+	if (searchIndexRequested) return;
+	searchIndexRequested = true;
+	loadSearchIndex(DATA_BASE_PATH)
+		.then(loaded => { searchIndex = loaded; })
+		.catch(error => console.warn('Search index unavailable, scanning the full index', error));
+}
 
+function scanSuggestions(input) {
 	// Exclude bundle entries and entries missing name/id
 	const candidateIndex = index.filter(e => {
 		if (typeof e.bundle_id === 'string' || typeof e.bundle_name === 'string') return false;
@@ -67,7 +72,7 @@ function updateSuggestions() {
 		return e.name && e.id;
 	});
 
-	const scoredMatches = candidateIndex
+	return candidateIndex
 		.map(e => {
 		const name = (e.name || '').toLowerCase();
 		const id = (e.id || '').toLowerCase();
@@ -86,6 +91,20 @@ function updateSuggestions() {
 		.filter(item => item.score > 0)
 		.sort((a, b) => b.score - a.score)
 		.slice(0, 10);
+}
+
+function updateSuggestions() {
+	const input = document.getElementById("cosmetic-display").value.trim().toLowerCase();
+	const sugDiv = document.getElementById("suggestions");
+	sugDiv.innerHTML = "";
+	if (!input) return;
+
+	if (!Array.isArray(index) || index.length === 0) return;
+
+	requestSearchIndex();
+	const scoredMatches = searchIndex
+		? searchIndex.search(input).map(result => ({ entry: index[result.row] || result }))
+		: scanSuggestions(input);
 
 	scoredMatches.forEach(({ entry }) => {
 		const div = document.createElement("div");
@@ -235,6 +254,8 @@ async function searchCosmetic(input) {
 		if (!entryMeta.path) {
 			return { data: null, allData: null, entryMeta };
 		}
+		// one request for everything the page reads, when page bundles are built
+		await loadPageBundle(DATA_BASE_PATH, entryMeta.path);
 		const cosmeticData = await loadGzJson(`${DATA_BASE_PATH}cosmetics/${entryMeta.path}`);
 		if (!cosmeticData || !Array.isArray(cosmeticData) || cosmeticData.length === 0) {
 			return { data: null, allData: null, entryMeta };
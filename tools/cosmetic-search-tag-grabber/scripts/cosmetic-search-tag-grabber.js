@@ -1,12 +1,19 @@
-import { loadGzJson } from '../../../tools/jsondata.js';
+import { loadGzJson, loadRelation } from '../../../tools/jsondata.js';
 
 const DATA_BASE_PATH = '../../../data/';
 
 let index = [];
+let indexPromise = null;
 let searchTags = [];
 
-async function loadIndex() {
-    index = await loadGzJson(DATA_BASE_PATH + 'index.json');
+// the full index is only fetched once something needs it - cosmetic
+// suggestions, generating tags, or a tag lookup the relation shards can't answer
+function loadIndex() {
+    if (!indexPromise) {
+        indexPromise = loadGzJson(DATA_BASE_PATH + 'index.json').then(data => { index = data; });
+        indexPromise.catch(() => { indexPromise = null; });
+    }
+    return indexPromise;
 }
 
 async function loadSearchTags() {
@@ -19,6 +26,10 @@ function updateSuggestions() {
     const sugDiv = document.getElementById("suggestions");
     sugDiv.innerHTML = "";
     if (!input) return;
+    if (!indexPromise) {
+        loadIndex().then(updateSuggestions, console.error);
+        return;
+    }
     if (!Array.isArray(index) || index.length === 0) return;
 
     const candidateIndex = index.filter(e => {
@@ -111,6 +122,7 @@ function setupEvents() {
             return;
         }
 
+        await loadIndex();
         const entry = index.find(e => e.id === id);
         const tags = entry.generatedSearchTagIndexes.map(i => {
                 const rawTag = searchTags[i];
@@ -137,7 +149,11 @@ function setupEvents() {
         }
 
         showStatus("Searching cosmetics...", "loading");
-        const matches = index.filter(e => e.generatedSearchTagIndexes?.includes(tagIndex));
+        let matches = await loadRelation(DATA_BASE_PATH, 'searchTags', tagIndex);
+        if (!matches) {
+            await loadIndex();
+            matches = index.filter(e => e.generatedSearchTagIndexes?.includes(tagIndex));
+        }
 
         const output = document.getElementById("output");
 
@@ -166,7 +182,6 @@ function setupEvents() {
 }
 
 window.addEventListener("DOMContentLoaded", async () => {
-    await loadIndex();
     await loadSearchTags();
     setupEvents();
 });
@@ -1,4 +1,4 @@
-import { loadGzJson } from '../../../tools/jsondata.js';
+import { loadGzJson, loadSearchIndex, loadLocalizationKey } from '../../../tools/jsondata.js';
 import { TYPE_MAP } from '../../../tools/utils.js';
 
 const DATA_BASE_PATH = '../../../data/';
@@ -32,13 +32,20 @@ async function loadIndex() {
   index = await loadGzJson(DATA_BASE_PATH + 'index.json');
 }
 
-function updateSuggestions() {
-  const input = document.getElementById("cosmetic-display").value.trim().toLowerCase();
-  const sugDiv = document.getElementById("suggestions");
-  sugDiv.innerHTML = "";
-  if (!input) return;
+let searchIndex = null;
+let searchIndexRequested = false;
 
-  const scoredMatches = (Array.isArray(index) ? index : [])
+// search.json.gz is only fetched once someone starts typing
+function requestSearchIndex() {
+  if (searchIndexRequested) return;
+  searchIndexRequested = true;
+  loadSearchIndex(DATA_BASE_PATH)
+    .then(loaded => { searchIndex = loaded; })
+    .catch(error => console.warn('Search index unavailable, scanning the full index', error));
+}
+
+function scanSuggestions(input) {
+  return (Array.isArray(index) ? index : [])
     .filter(e => {
       if (typeof e.bundle_id === 'string' || typeof e.bundle_name === 'string') return false;
       if (typeof e.banner_id === 'string' || typeof e.banner_icon === 'string') return false;
@@ -62,6 +69,18 @@ function updateSuggestions() {
     .filter(item => item.score > 0)
     .sort((a, b) => b.score - a.score)
     .slice(0, 10);
+}
+
+function updateSuggestions() {
+  const input = document.getElementById("cosmetic-display").value.trim().toLowerCase();
+  const sugDiv = document.getElementById("suggestions");
+  sugDiv.innerHTML = "";
+  if (!input) return;
+
+  requestSearchIndex();
+  const scoredMatches = searchIndex
+    ? searchIndex.search(input).map(entry => ({ entry }))
+    : scanSuggestions(input);
 
   scoredMatches.forEach(({ entry }) => {
     const div = document.createElement("div");
@@ -96,6 +115,20 @@ async function getPakChunkFolders() {
   }
 }
 
+// Keep only the folders that localization/routes.json says define one of the keys
+async function routeFolders(folders, keys) {
+  try {
+    const { chunks, routes } = await loadGzJson("../../data/localization/routes.json");
+    const routed = new Set();
+    for (const key of keys) {
+      for (const chunkId of routes[""]?.[key] || []) routed.add(chunks[chunkId]);
+    }
+    return folders.filter(folder => routed.has(folder));
+  } catch {
+    return folders;
+  }
+}
+
 async function search() {
   const input = document.getElementById("cosmetic-input").value.trim().toLowerCase();
   const output = document.getElementById("output");
@@ -146,16 +179,23 @@ async function translateKeys(nameKey, descriptionKey) {
   const output = document.getElementById("output");
   
   let folders = null;
+  let nameTexts = null;
+  let descriptionTexts = null;
   if (nameKey || descriptionKey) {
     output.value = "Getting translations...";
-    folders = await getPakChunkFolders();
+    // the key shards hold every culture for a key, so the chunk folders are
+    // only probed for keys the shards don't have
+    if (nameKey) nameTexts = await loadLocalizationKey("../../data/", "", nameKey);
+    if (descriptionKey) descriptionTexts = await loadLocalizationKey("../../data/", "", descriptionKey);
+    const shardsHaveKeys = (!nameKey || nameTexts) && (!descriptionKey || descriptionTexts);
+    folders = shardsHaveKeys ? [] : await routeFolders(await getPakChunkFolders(), [nameKey, descriptionKey]);
   } else {
     output.value = "Couldn't figure out a localization key for both name and description of this cosmetic.";
     return;
   }
   
-  const nameTranslations = {};
-  const descriptionTranslations = {};
+  const nameTranslations = { ...nameTexts };
+  const descriptionTranslations = { ...descriptionTexts };
 
   for (const folder of folders) {
     try {
@@ -1,4 +1,4 @@
-import { loadGzJson } from '../../jsondata.js';
+import { loadIndex } from '../../jsondata.js';
 
 import { initSourceReleaseControls, getSourceReleaseSettings, validateSourceSettings } from '../../source-release.js';
 import { initBundleControls, getBundleEntries, removeBundleEntry, setupBundleControls } from '../../bundle-controls.js';
@@ -32,7 +32,7 @@ async function loadBuildingPropIndex() {
 
 async function loadCosmeticIndex() {
 	try {
-		cosmeticIndex = await loadGzJson(DATA_BASE_PATH + 'index.json');
+		cosmeticIndex = await loadIndex(DATA_BASE_PATH, { kinds: ['bundles'] });
 	} catch (e) {
 		console.error('Failed to load cosmetic index', e);
 		cosmeticIndex = [];
@@ -1,4 +1,4 @@
-import { loadGzJson } from '../../jsondata.js';
+import { loadIndex } from '../../jsondata.js';
 import { decryptMidi, extractFormattedProVocalsSentences } from './midi-utils.js';
 import { getSeasonReleased, pageExists } from '../../utils.js';
 import { generateUnlockedParameter, generateCostParameter, generateReleaseParameter, generateArticleIntro } from '../../article-utils.js';
@@ -62,7 +62,7 @@ async function loadTrackOverrides() {
 
 async function loadCosmeticIndex() {
 	try {
-		return await loadGzJson(DATA_BASE_PATH + 'index.json');
+		return await loadIndex(DATA_BASE_PATH, { kinds: ['cosmetics', 'bundles'] });
 	} catch (error) {
 		console.error('Error loading cosmetic index:', error);
 		return [];
@@ -19,6 +19,231 @@ async function loadPako() {
   });
 }
 
+// IndexedDB copy of decoded files, keyed by their path under data/ and kept
+// until the content manifest gives that path a new hash
+let dataDbPromise = null;
+function openDataDb() {
+  if (!dataDbPromise) {
+    dataDbPromise = new Promise(resolve => {
+      if (typeof indexedDB === 'undefined') return resolve(null);
+      const req = indexedDB.open('fortnite-wiki-data', 1);
+      req.onupgradeneeded = () => req.result.createObjectStore('files');
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => resolve(null);
+    });
+  }
+  return dataDbPromise;
+}
+
+async function getStoredFile(key) {
+  const db = await openDataDb();
+  if (!db) return undefined;
+  return new Promise(resolve => {
+    try {
+      const req = db.transaction('files').objectStore('files').get(key);
+      req.onsuccess = () => resolve(req.result);
+      req.onerror = () => resolve(undefined);
+    } catch {
+      resolve(undefined);
+    }
+  });
+}
+
+async function storeFile(key, value) {
+  const db = await openDataDb();
+  if (!db) return;
+  try {
+    // put() copies the value straight away, so callers can modify theirs
+    db.transaction('files', 'readwrite').objectStore('files').put(value, key);
+  } catch {}
+}
+
+// Content manifest written by dataSetup.py - manifest.json lists a hash per
+// folder group, manifest/<group>.json.gz a hash per file
+const contentManifests = new Map();
+const contentGroups = new Map();
+
+function splitDataPath(fullPath) {
+  const match = fullPath.match(/^(.*?(?:^|\/)data\/)(.*)$/);
+  if (!match) return null;
+  return { root: match[1], logical: match[2].replace(/^\/+/, '').replace(/\/{2,}/g, '/') };
+}
+
+function getContentGroup(logical) {
+  const parts = logical.split('/');
+  if (parts.length > 2) return parts.slice(0, 2).join('/');
+  if (parts.length === 2) return parts[0];
+  return '_root';
+}
+
+async function getContentHash(root, logical) {
+  if (!contentManifests.has(root)) {
+    contentManifests.set(root, fetch(root + 'manifest.json', { cache: 'no-cache' })
+      .then(resp => (resp.ok ? resp.json() : null))
+      .catch(() => null));
+  }
+  const manifest = await contentManifests.get(root);
+  const group = getContentGroup(logical);
+  const groupHash = manifest?.groups?.[group];
+  if (!groupHash) return null;
+
+  const groupKey = root + group;
+  if (!contentGroups.has(groupKey)) {
+    const groupFile = `manifest/${group}.json.gz`;
+    contentGroups.set(groupKey, fetchGzJson(root + groupFile, groupHash, groupFile).catch(() => null));
+  }
+  const hashes = await contentGroups.get(groupKey);
+  return hashes?.[logical] || null;
+}
+
+// dataSetup.py's "compression" option can write outputs with other codecs
+// under the same .gz names. gzip and zlib streams have recognisable headers,
+// anything else is brotli. A zlib stream with a preset dictionary carries the
+// dictionary's adler32, published as dictionaries/<adler32>.dict. A family's
+// dictionary is shared by all its small files, so it is fetched once and kept
+const dictionaries = new Map();
+
+function isZlibHeader(bytes) {
+  return bytes.length > 2 && (bytes[0] & 0x0f) === 8 && (bytes[0] >> 4) <= 7 && ((bytes[0] << 8) | bytes[1]) % 31 === 0;
+}
+
+async function loadDictionary(root, id) {
+  const dictionaryKey = root + id;
+  if (!dictionaries.has(dictionaryKey)) {
+    dictionaries.set(dictionaryKey, (async () => {
+      // the name is the content's checksum, so a stored copy never goes stale
+      const storedKey = `dictionaries/${id}.dict`;
+      const stored = await getStoredFile(storedKey);
+      if (stored && stored.version === id) return stored.data;
+      const resp = await fetch(root + storedKey);
+      if (!resp.ok) {
+        throw new Error(`Failed to fetch dictionary ${id}: ${resp.status}`);
+      }
+      const data = new Uint8Array(await resp.arrayBuffer());
+      await storeFile(storedKey, { version: id, data });
+      return data;
+    })());
+    dictionaries.get(dictionaryKey).catch(() => dictionaries.delete(dictionaryKey));
+  }
+  return dictionaries.get(dictionaryKey);
+}
+
+// Browsers without native brotli in DecompressionStream get a JS decoder,
+// loaded the first time a brotli file turns up
+const BROTLI_DECODER_URL = 'https://cdn.jsdelivr.net/npm/brotli@1.3.3/decompress.js/+esm';
+let brotliDecoderPromise = null;
+
+function loadBrotliDecoder() {
+  if (!brotliDecoderPromise) {
+    brotliDecoderPromise = import(BROTLI_DECODER_URL).then(module => module.default);
+    brotliDecoderPromise.catch(() => { brotliDecoderPromise = null; });
+  }
+  return brotliDecoderPromise;
+}
+
+async function decompressBrotli(bytes) {
+  let stream = null;
+  try {
+    stream = new DecompressionStream('brotli');
+  } catch {
+    // no native brotli, or no DecompressionStream at all
+  }
+  if (stream) {
+    return new Response(new Blob([bytes]).stream().pipeThrough(stream)).text();
+  }
+  const decompress = await loadBrotliDecoder();
+  return new TextDecoder().decode(decompress(bytes));
+}
+
+async function decompressData(bytes, root) {
+  await loadPako(); // Ensure pako is loaded before using it
+  if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+    return pako.ungzip(bytes, { to: "string" });
+  }
+  if (isZlibHeader(bytes)) {
+    const dictionary = bytes[1] & 0x20
+      ? await loadDictionary(root, Array.from(bytes.subarray(2, 6), b => b.toString(16).padStart(2, '0')).join(''))
+      : undefined;
+    try {
+      return pako.inflate(bytes, { to: "string", dictionary });
+    } catch {
+      // a brotli stream that happens to start like a zlib header
+    }
+  }
+  return decompressBrotli(bytes);
+}
+
+async function fetchGzJson(fullPath, version, key) {
+  if (version) {
+    const stored = await getStoredFile(key);
+    if (stored && stored.version === version) return stored.data;
+  }
+  // the hash makes the URL change whenever the content does
+  const resp = await fetch(version ? `${fullPath}?v=${version}` : fullPath);
+  if (!resp.ok) {
+    throw new Error(`Failed to fetch ${fullPath}: ${resp.status}`);
+  }
+  const buf = await resp.arrayBuffer();
+  const decompressed = await decompressData(new Uint8Array(buf), splitDataPath(fullPath)?.root || '');
+  const data = JSON.parse(decompressed);
+  if (version) await storeFile(key, { version, data });
+  return data;
+}
+
+// Pack files written by dataSetup.py with pack_outputs on - packs/<family>.json.gz
+// maps each logical path of the family to [pack, offset, length, crc32], and
+// every member is a compressed file of its own fetched with a range request
+const PACK_FAMILIES = ['cosmetics', 'DAv2', 'DA', 'banners', 'localization'];
+const PACK_MERGE_GAP = 65536;
+const packIndexes = new Map();
+const packBuffers = new Map();
+
+async function getPackedMember(root, logical) {
+  const family = logical.split('/')[0];
+  if (!PACK_FAMILIES.includes(family)) return null;
+  const indexKey = root + family;
+  if (!packIndexes.has(indexKey)) {
+    const indexFile = `packs/${family}.json.gz`;
+    packIndexes.set(indexKey, (async () => {
+      const manifest = await contentManifests.get(root);
+      const version = await getContentHash(root, indexFile);
+      // with a content manifest, a family it doesn't list isn't packed
+      if (!version && manifest) return null;
+      return fetchGzJson(root + indexFile, version, indexFile);
+    })().catch(() => null));
+  }
+  const packIndex = await packIndexes.get(indexKey);
+  const member = packIndex?.members[logical];
+  if (!member) return null;
+  const [pack, offset, length, crc] = member;
+  return { root, url: root + packIndex.packs[pack].path, offset, length, version: `pack-${crc}`, key: logical };
+}
+
+async function fetchPackRange(url, offset, length) {
+  if (packBuffers.has(url)) return packBuffers.get(url).subarray(offset, offset + length);
+  const resp = await fetch(url, { headers: { Range: `bytes=${offset}-${offset + length - 1}` } });
+  if (!resp.ok) {
+    throw new Error(`Failed to fetch ${url}: ${resp.status}`);
+  }
+  const buf = new Uint8Array(await resp.arrayBuffer());
+  if (resp.status === 206) return buf;
+  // the server ignored the range and sent the whole pack, so keep it for the other members
+  packBuffers.set(url, buf);
+  return buf.subarray(offset, offset + length);
+}
+
+async function decodePackedMember(member, bytes) {
+  const data = JSON.parse(await decompressData(bytes, member.root));
+  await storeFile(member.key, { version: member.version, data });
+  return data;
+}
+
+async function fetchPackedMember(member) {
+  const stored = await getStoredFile(member.key);
+  if (stored && stored.version === member.version) return stored.data;
+  return decodePackedMember(member, await fetchPackRange(member.url, member.offset, member.length));
+}
+
 // Shared loadGzJson function with global cache
 export async function loadGzJson(path) {
   const fullPath = path.endsWith('.gz') ? path : path + '.gz';
@@ -26,14 +251,16 @@ export async function loadGzJson(path) {
     return globalJsonCache.get(fullPath);
   }
   try {
-    await loadPako(); // Ensure pako is loaded before using it
-    const resp = await fetch(fullPath);
-    if (!resp.ok) {
-      throw new Error(`Failed to fetch ${fullPath}: ${resp.status}`);
+    const dataPath = splitDataPath(fullPath);
+    const member = dataPath ? await getPackedMember(dataPath.root, dataPath.logical) : null;
+    if (member) {
+      const data = await fetchPackedMember(member);
+      globalJsonCache.set(fullPath, data);
+      return data;
     }
-    const buf = await resp.arrayBuffer();
-    const decompressed = pako.ungzip(new Uint8Array(buf), { to: "string" });
-    const data = JSON.parse(decompressed);
+    const version = dataPath ? await getContentHash(dataPath.root, dataPath.logical) : null;
+    const data = (dataPath?.logical === 'index.json.gz' && version && await loadPatchedIndex(dataPath.root, version))
+      || await fetchGzJson(fullPath, version, dataPath?.logical);
     globalJsonCache.set(fullPath, data);
     return data;
   } catch (error) {
@@ -41,3 +268,402 @@ export async function loadGzJson(path) {
     throw error;
   }
 }
+
+// Load several files at once. Packed members that sit close together in the
+// same pack come back in one range request, everything else goes through
+// loadGzJson. Failed files are returned as null
+export async function loadGzJsonMany(paths) {
+  const fullPaths = paths.map(path => (path.endsWith('.gz') ? path : path + '.gz'));
+  const pending = new Map();
+  for (const fullPath of fullPaths) {
+    if (globalJsonCache.has(fullPath) || pending.has(fullPath)) continue;
+    const dataPath = splitDataPath(fullPath);
+    const member = dataPath ? await getPackedMember(dataPath.root, dataPath.logical).catch(() => null) : null;
+    if (!member) continue;
+    const stored = await getStoredFile(member.key);
+    if (stored && stored.version === member.version) {
+      globalJsonCache.set(fullPath, stored.data);
+      continue;
+    }
+    pending.set(fullPath, member);
+  }
+
+  const byPack = new Map();
+  for (const [fullPath, member] of pending) {
+    if (!byPack.has(member.url)) byPack.set(member.url, []);
+    byPack.get(member.url).push({ fullPath, member });
+  }
+  const requests = [];
+  for (const [url, members] of byPack) {
+    members.sort((a, b) => a.member.offset - b.member.offset);
+    let run = [];
+    const flush = () => {
+      if (!run.length) return;
+      const group = run;
+      const start = group[0].member.offset;
+      const last = group[group.length - 1].member;
+      requests.push(fetchPackRange(url, start, last.offset + last.length - start).then(bytes => Promise.all(
+        group.map(async ({ fullPath, member }) => {
+          const data = await decodePackedMember(member, bytes.subarray(member.offset - start, member.offset - start + member.length));
+          globalJsonCache.set(fullPath, data);
+        })
+      )).catch(error => console.warn(`Failed to fetch members of ${url}`, error)));
+      run = [];
+    };
+    for (const item of members) {
+      const previous = run[run.length - 1]?.member;
+      if (previous && item.member.offset - (previous.offset + previous.length) > PACK_MERGE_GAP) flush();
+      run.push(item);
+    }
+    flush();
+  }
+  await Promise.all(requests);
+
+  return Promise.all(fullPaths.map(fullPath => loadGzJson(fullPath).catch(() => null)));
+}
+
+// Keys dataSetup.py gives index.json records in its patches - kind and id,
+// with a #n suffix from the second record sharing both onwards
+function getIndexRecordKeys(index) {
+  const seen = new Map();
+  return index.map(entry => {
+    const kind = getIndexRecordKind(entry);
+    const idField = kind === 'bundles' ? 'bundle_id' : kind === 'banners' ? 'banner_id' : 'id';
+    const key = `${kind}:${entry[idField] || ''}`;
+    const occurrence = seen.get(key) || 0;
+    seen.set(key, occurrence + 1);
+    return occurrence ? `${key}#${occurrence}` : key;
+  });
+}
+
+export function applyIndexPatch(index, patch) {
+  const removed = new Set(patch.removed);
+  const changed = patch.changed || {};
+  const keys = getIndexRecordKeys(index);
+  const kept = [];
+  keys.forEach((key, i) => {
+    if (removed.has(key)) return;
+    const change = changed[key];
+    if (!change) return kept.push(index[i]);
+    const entry = { ...index[i], ...change.set };
+    for (const field of change.unset || []) delete entry[field];
+    kept.push(entry);
+  });
+
+  // added positions are in the new index, so merge them in ascending order
+  const result = new Array(kept.length + patch.added.length);
+  let next = 0;
+  let position = 0;
+  for (const [at, entry] of patch.added) {
+    while (position < at) result[position++] = kept[next++];
+    result[position++] = entry;
+  }
+  while (next < kept.length) result[position++] = kept[next++];
+  return result;
+}
+
+// Bring a stored index.json up to the given hash with the patches listed in
+// patches/index/chain.json. Returns null when there is no stored index or no
+// unbroken chain to the hash, so the caller fetches the full file instead
+async function loadPatchedIndex(root, version) {
+  const stored = await getStoredFile('index.json.gz');
+  if (!stored || stored.version === version) return null;
+  try {
+    const resp = await fetch(root + 'patches/index/chain.json', { cache: 'no-cache' });
+    if (!resp.ok) return null;
+    const chain = await resp.json();
+    const patches = new Map(chain.patches.map(patch => [patch.from, patch]));
+
+    let current = stored.version;
+    const steps = [];
+    while (current !== version) {
+      const step = patches.get(current);
+      if (!step || steps.includes(step)) return null;
+      steps.push(step);
+      current = step.to;
+    }
+
+    let index = stored.data;
+    for (const step of steps) {
+      // patch files never change once written, so they skip the content manifest
+      index = applyIndexPatch(index, await fetchGzJson(root + step.path, null, null));
+    }
+    await storeFile('index.json.gz', { version, data: index });
+    return index;
+  } catch (error) {
+    console.warn('Could not patch the stored index, loading the full index', error);
+    return null;
+  }
+}
+
+// Turn the column-wise index.compact.json written by dataSetup.py back into
+// the same records index.json holds
+export function decodeCompactIndex(compact) {
+  const { count, strings, tagLists, columns } = compact;
+  const rows = new Array(count);
+  for (let i = 0; i < count; i++) rows[i] = {};
+
+  for (const [key, column] of Object.entries(columns)) {
+    if (column.encoding === 'path') {
+      const { prefixes, names } = column;
+      for (let i = 0; i < count; i++) {
+        if (prefixes[i] !== null) rows[i][key] = strings[prefixes[i]] + names[i];
+      }
+      continue;
+    }
+
+    const values = column.values;
+    const table = column.encoding === 'string' ? strings : column.encoding === 'tagList' ? tagLists : null;
+    for (let i = 0; i < count; i++) {
+      const value = values[i];
+      if (value !== null) rows[i][key] = table ? table[value] : value;
+    }
+  }
+  return rows;
+}
+
+// Load the compact index and decode it, or fall back to index.json.gz
+export async function loadCompactIndex(basePath) {
+  try {
+    return decodeCompactIndex(await loadGzJson(basePath + 'index.compact.json'));
+  } catch (error) {
+    console.warn('Compact index unavailable, loading index.json', error);
+    return loadGzJson(basePath + 'index.json');
+  }
+}
+
+// Kind of an index.json entry, matching the shard kinds dataSetup.py writes
+export function getIndexRecordKind(entry) {
+  if (entry.bundle_id !== undefined) return 'bundles';
+  if (entry.banner_id !== undefined) return 'banners';
+  if (entry.companionEmote) return 'companionEmotes';
+  return 'cosmetics';
+}
+
+// Load only the index shards listed in index/manifest.json that match the
+// given kinds and cosmetic types (null means all of them). Falls back to
+// filtering the full index.json.gz when there is no manifest
+export async function loadIndex(basePath, { kinds = null, types = null } = {}) {
+  const wanted = (kind, type) =>
+    (!kinds || kinds.includes(kind)) && (kind !== 'cosmetics' || !types || types.includes(type));
+
+  let manifest = null;
+  try {
+    const resp = await fetch(basePath + 'index/manifest.json');
+    if (resp.ok) manifest = await resp.json();
+  } catch (error) {
+    console.warn('Index manifest unavailable, loading the full index', error);
+  }
+
+  if (!manifest) {
+    const index = await loadGzJson(basePath + 'index.json');
+    if (!kinds && !types) return index;
+    return index.filter(entry => {
+      const path = entry.path || '';
+      return wanted(getIndexRecordKind(entry), path.includes('/') ? path.split('/')[0] : 'Other');
+    });
+  }
+
+  const shards = Object.values(manifest.shards).filter(shard => wanted(shard.kind, shard.type));
+  const parts = await Promise.all(shards.map(shard => loadGzJson(basePath + shard.path)));
+  return parts.flat();
+}
+
+// Suggestion search over search.json written by dataSetup.py. Scores the same
+// way the tools' own index scans do (name exact/prefix/substring, then ID), so
+// results match scanning index.json while only touching the few documents
+// that share tokens with the input
+const SEARCH_TOKEN_RE = /[\p{L}\p{N}]+/gu;
+
+function getSearchScore(query, name, id) {
+  let score = 0;
+  if (name === query) score += 100;
+  else if (name.startsWith(query)) score += 75;
+  else if (name.includes(query)) score += 50;
+
+  if (id === query) score += 40;
+  else if (id.startsWith(query)) score += 25;
+  else if (id.includes(query)) score += 10;
+  return score;
+}
+
+export function createSearchIndex(data) {
+  const { ids, names, rows } = data.docs;
+  const { tokens, postings, trigrams, short } = data;
+  const lowerNames = names.map(name => name.toLowerCase());
+  const lowerIds = ids.map(id => id.toLowerCase());
+  const tokenDocs = new Map();
+
+  function docsForToken(tokenId) {
+    let docs = tokenDocs.get(tokenId);
+    if (!docs) {
+      // postings are stored as gaps between document numbers
+      let doc = 0;
+      docs = postings[tokenId].map(gap => (doc += gap));
+      tokenDocs.set(tokenId, docs);
+    }
+    return docs;
+  }
+
+  function tokensContaining(term) {
+    if (term.length < 3) {
+      const matches = [];
+      for (let i = 0; i < tokens.length; i++) {
+        if (tokens[i].includes(term)) matches.push(i);
+      }
+      return matches;
+    }
+    let candidates = null;
+    for (let i = 0; i + 3 <= term.length; i++) {
+      const list = trigrams[term.slice(i, i + 3)];
+      if (!list) return [];
+      if (!candidates) candidates = list;
+      else {
+        const set = new Set(list);
+        candidates = candidates.filter(tokenId => set.has(tokenId));
+      }
+    }
+    return candidates.filter(tokenId => tokens[tokenId].includes(term));
+  }
+
+  function docsForTokens(tokenIds) {
+    if (tokenIds.length === 1) return docsForToken(tokenIds[0]);
+    const docs = new Set();
+    for (const tokenId of tokenIds) {
+      for (const doc of docsForToken(tokenId)) docs.add(doc);
+    }
+    return [...docs];
+  }
+
+  function toResult(doc) {
+    return { id: ids[doc], name: names[doc], row: rows[doc] };
+  }
+
+  function search(input, limit = 10) {
+    const query = input.trim().toLowerCase();
+    if (!query) return [];
+    if (query.length <= 2) return (short[query] || []).slice(0, limit).map(toResult);
+
+    // every document containing the query has each of its words inside one of
+    // its tokens, so the documents of the rarest word are enough candidates -
+    // scoring checks the rest
+    let candidates = null;
+    let candidateCount = Infinity;
+    for (const term of query.match(SEARCH_TOKEN_RE) || []) {
+      const tokenIds = tokensContaining(term);
+      const count = tokenIds.reduce((sum, tokenId) => sum + postings[tokenId].length, 0);
+      if (count < candidateCount) {
+        candidates = tokenIds;
+        candidateCount = count;
+      }
+    }
+    candidates = candidates ? docsForTokens(candidates) : ids.map((_, doc) => doc);
+
+    const matches = [];
+    for (const doc of candidates) {
+      const score = getSearchScore(query, lowerNames[doc], lowerIds[doc]);
+      if (score > 0) matches.push({ doc, score });
+    }
+    return matches
+      .sort((a, b) => b.score - a.score || a.doc - b.doc)
+      .slice(0, limit)
+      .map(item => toResult(item.doc));
+  }
+
+  return { search };
+}
+
+// Load search.json.gz once and wrap it in a search index
+let searchIndexPromise = null;
+export function loadSearchIndex(basePath) {
+  if (!searchIndexPromise) {
+    searchIndexPromise = loadGzJson(basePath + 'search.json').then(createSearchIndex);
+    searchIndexPromise.catch(() => { searchIndexPromise = null; });
+  }
+  return searchIndexPromise;
+}
+
+// Every culture's text for one localization key, from the key shards under
+// localization/keys written by dataSetup.py. Resolves to null when the shards
+// are missing or don't have the key
+const CRC32_TABLE = (() => {
+  const table = new Uint32Array(256);
+  for (let n = 0; n < 256; n++) {
+    let c = n;
+    for (let k = 0; k < 8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+    table[n] = c >>> 0;
+  }
+  return table;
+})();
+
+function crc32(text) {
+  let crc = 0xFFFFFFFF;
+  for (const byte of new TextEncoder().encode(text)) {
+    crc = CRC32_TABLE[(crc ^ byte) & 0xFF] ^ (crc >>> 8);
+  }
+  return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+let localizationKeyManifest = null;
+export async function loadLocalizationKey(basePath, namespace, key) {
+  try {
+    if (!localizationKeyManifest) {
+      localizationKeyManifest = fetch(basePath + 'localization/keys/manifest.json').then(resp => {
+        if (!resp.ok) throw new Error(`Failed to fetch localization key manifest: ${resp.status}`);
+        return resp.json();
+      });
+      localizationKeyManifest.catch(() => { localizationKeyManifest = null; });
+    }
+    const manifest = await localizationKeyManifest;
+    const bucket = crc32(`${namespace}\0${key}`) & (manifest.buckets - 1);
+    const shard = await loadGzJson(`${basePath}localization/keys/${bucket.toString(16)}.json`);
+    return shard[namespace]?.[key] || null;
+  } catch {
+    return null;
+  }
+}
+
+// Look up one key of a relationship index written by dataSetup.py - "sets"
+// (set ID -> index records), "searchTags" (tag index -> cosmetics) or
+// "bundles" (bundle ID -> bundle record and its cosmetics). Returns null when
+// the key or the relation is missing
+const relationManifests = new Map();
+export async function loadRelation(basePath, relation, key) {
+  try {
+    const manifestPath = `${basePath}relations/${relation}/manifest.json`;
+    if (!relationManifests.has(manifestPath)) {
+      relationManifests.set(manifestPath, fetch(manifestPath).then(resp => {
+        if (!resp.ok) throw new Error(`Failed to fetch ${manifestPath}: ${resp.status}`);
+        return resp.json();
+      }));
+      relationManifests.get(manifestPath).catch(() => relationManifests.delete(manifestPath));
+    }
+    const manifest = await relationManifests.get(manifestPath);
+    const bucket = crc32(String(key)) & (manifest.buckets - 1);
+    const shard = await loadGzJson(`${basePath}relations/${relation}/${bucket.toString(16)}.json`);
+    return shard[key] ?? null;
+  } catch {
+    return null;
+  }
+}
+
+// Seed the cache with a page bundle written by dataSetup.py - the data files
+// one cosmetic page reads, keyed by the path under data/ the generator asks
+// for. Only fetched when the content manifest lists it, since the bundles are
+// optional
+export async function loadPageBundle(basePath, cosmeticPath) {
+  try {
+    const fullPath = `${basePath}pages/${cosmeticPath}.gz`;
+    const dataPath = splitDataPath(fullPath);
+    const version = dataPath ? await getContentHash(dataPath.root, dataPath.logical) : null;
+    if (!version) return false;
+    const bundle = await fetchGzJson(fullPath, version, dataPath.logical);
+    for (const [key, data] of Object.entries(bundle.files)) {
+      if (!globalJsonCache.has(basePath + key)) globalJsonCache.set(basePath + key, data);
+    }
+    return true;
+  } catch (error) {
+    console.warn(`Page bundle for ${cosmeticPath} unavailable`, error);
+    return false;
+  }
+}
@@ -83,7 +83,7 @@ async function getFirstBundleFromCategory(categoryName) {
 	}
 	return { bundleName: null, bundleCost: null };
 }
-import { loadGzJson } from '../../../tools/jsondata.js';
+import { loadGzJson, loadGzJsonMany, loadLocalizationKey, loadRelation } from '../../../tools/jsondata.js';
 import { TYPE_MAP, INSTRUMENTS_TYPE_MAP, SERIES_CONVERSION, ensureVbucksTemplate, stripVbucksTemplate } from '../../../tools/utils.js';
 
 const DATA_BASE_PATH = '../../../data/';
@@ -153,7 +153,7 @@ function updateSetSuggestions() {
 			// Check for banners in this set and prompt for names if found
 			(async () => {
 				const setIdShort = id.replace('Cosmetics.Set.', '');
-				const banners = index.filter(e => e.setID === setIdShort && (e.banner_id || e.banner_icon));
+				const banners = (await getSetMembers(setIdShort)).filter(e => e.banner_id || e.banner_icon);
 
 				// remove any previous banner UI
 				const existing = document.getElementById('banner-config');
@@ -293,9 +293,14 @@ function updateSetSuggestions() {
 	});
 }
 
-// Find all cosmetics in a set using setID field in index.json
-function findCosmeticsInSet(setId) {
-	return index.filter(e => e.setID === setId && !(e.banner_id || e.banner_icon));
+// Everything in a set, from relations/sets or the setID field in index.json
+async function getSetMembers(setId) {
+	return await loadRelation(DATA_BASE_PATH, 'sets', setId) || index.filter(e => e.setID === setId);
+}
+
+// Find all cosmetics in a set
+async function findCosmeticsInSet(setId) {
+	return (await getSetMembers(setId)).filter(e => !(e.banner_id || e.banner_icon));
 }
 
 async function fetchTranslations(translationKey) {
@@ -308,18 +313,29 @@ async function fetchTranslations(translationKey) {
 		const meta = await loadGzJson(metaPath);
 		const compiledLangs = Array.isArray(meta.CompiledCultures) ? meta.CompiledCultures : [];
 
-		for (const lang of compiledLangs) {
-			const alreadyHasTranslation = translations[lang] !== undefined;
+		// the key shards hold every culture, so the per-culture files are only
+		// needed when they don't have the key
+		const setTexts = await loadLocalizationKey(DATA_BASE_PATH, "CosmeticSets", translationKey);
+		const emptyTexts = await loadLocalizationKey(DATA_BASE_PATH, "", translationKey);
+		if (setTexts || emptyTexts) {
+			for (const lang of compiledLangs) {
+				const translationText = setTexts?.[lang] || emptyTexts?.[lang];
+				if (translationText) translations[lang] = translationText;
+			}
+		} else {
+			for (const lang of compiledLangs) {
+				const alreadyHasTranslation = translations[lang] !== undefined;
 
-			if (alreadyHasTranslation) continue;
+				if (alreadyHasTranslation) continue;
 			
-			const locPath = `${DATA_BASE_PATH}localization/${localizationFolder}/${lang}/${localizationFolder}.json`;
-			try {
-				const loc = await loadGzJson(locPath);
+				const locPath = `${DATA_BASE_PATH}localization/${localizationFolder}/${lang}/${localizationFolder}.json`;
+				try {
+					const loc = await loadGzJson(locPath);
 
-				const translationText = loc["CosmeticSets"]?.[translationKey] || loc[""]?.[translationKey];
-				if (translationText) translations[lang] = translationText;
-			} catch {}
+					const translationText = loc["CosmeticSets"]?.[translationKey] || loc[""]?.[translationKey];
+					if (translationText) translations[lang] = translationText;
+				} catch {}
+			}
 		}
 	} catch {}
 
@@ -421,7 +437,7 @@ async function generateSetPage(setId, setName, cosmetics, seasonName, isUnreleas
 		if (cosmeticType === 'Outfit') outfitCosmetics.push(props);
 	}
 
-	const bannerEntries = index.filter(e => e.setID === setId && (e.banner_id || e.banner_icon));
+	const bannerEntries = (await getSetMembers(setId)).filter(e => e.banner_id || e.banner_icon);
 	if (bannerEntries.length) {
 		bannerEntries.forEach((bEntry, idx) => {
 			const key = bEntry.banner_id;
@@ -600,13 +616,14 @@ async function handleGenerate() {
 	const bundleNameInput = document.getElementById('bundle-name-input');
 
 	showStatus('Finding cosmetics in set...', 'loading');
-	const setEntries = findCosmeticsInSet(setId);
+	const setEntries = await findCosmeticsInSet(setId);
 	if (!setEntries.length) {
 		showStatus('No cosmetics found in this set.', 'error');
 		return;
 	}
 	showStatus('Loading cosmetic data for set...', 'loading');
-	// Fetch full JSONs for each cosmetic in the set
+	// Fetch full JSONs for each cosmetic in the set, packed ones in as few requests as possible
+	await loadGzJsonMany(setEntries.map(entryMeta => `${DATA_BASE_PATH}/cosmetics/${entryMeta.path}`));
 	const cosmetics = [];
 	for (const entryMeta of setEntries) {
 		try {